@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'medical',
@@ -129,6 +130,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Archivos subidos y generados (PDFs de citas)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -136,10 +141,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # REDIS CACHE CONFIGURATION
+REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/1')
+
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': config('REDIS_URL', default='redis://localhost:6379/1'),
+        'LOCATION': REDIS_URL,
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
             'SOCKET_CONNECT_TIMEOUT': 5,
@@ -187,14 +194,63 @@ OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
 OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-4o-mini')
 
+# Cliente HTTP compartido por proceso (conexiones keep-alive con la API)
+OPENAI_CLIENT_CONFIG = {
+    'timeout': config('OPENAI_TIMEOUT', default=60, cast=float),  # Segundos por petición
+    'connect_timeout': 5,
+    'max_connections': config('OPENAI_MAX_CONNECTIONS', default=20, cast=int),
+    'max_keepalive_connections': 10,
+    'keepalive_expiry': 60,  # Segundos que una conexión ociosa se mantiene abierta
+    'max_retries': 2,
+}
+
+# Backend del modelo de lenguaje (ver medical/services/llm_backend.py)
+#   'openai':    llamadas reales
+#   'grabacion': llamadas reales que se guardan en archivo_grabaciones
+#   'replay':    respuestas desde archivo_grabaciones (o respuesta_stub) sin red,
+#                con la latencia simulada, para pruebas de carga
+LLM_CONFIG = {
+    'backend': config('LLM_BACKEND', default='openai'),
+    'archivo_grabaciones': config('LLM_GRABACIONES', default=str(BASE_DIR / 'grabaciones_llm.jsonl')),
+    'respuesta_stub': 'Entiendo. ¿Podrías contarme un poco más sobre tus síntomas y desde cuándo los tienes?',
+    'latencia': {
+        'distribucion': config('LLM_LATENCIA_DISTRIBUCION', default='lognormal'),  # fija, uniforme, normal, lognormal, grabada
+        'mediana_ms': config('LLM_LATENCIA_MEDIANA_MS', default=1200, cast=float),
+        'sigma': 0.4,
+        'min_ms': 100,
+        'max_ms': 10000,
+    },
+    'fraccion_primer_token': 0.3,  # Parte de la latencia antes del primer fragmento en streaming
+}
+
 # Configuraciones del asistente virtual
 ASISTENTE_CONFIG = {
     'max_tokens': 800,
     'temperature': 0.7,
-    'max_historial_mensajes': 20,  # Número máximo de mensajes a enviar como contexto
+    'max_historial_mensajes': 60,  # Máximo de mensajes recientes que se leen de Redis por turno
+    'max_tokens_historial': 2000,  # Presupuesto de tokens para el historial (y su resumen) en el prompt
+    'max_tokens_resumen': 300,  # Longitud máxima del resumen de los turnos antiguos
+    'cache_respuestas_turnos': 1,  # Turnos iniciales cuyas respuestas se cachean
+    'cache_respuestas_ttl': 86400,  # 24 horas en segundos
+    'cache_respuestas_max': 1000,  # Entradas máximas (se desalojan las menos usadas)
     'timeout_conversacion': 1800,  # 30 minutos en segundos
 }
 
+# Configuración de citas
+CITAS_CONFIG = {
+    'reserva_ttl': 300,  # Segundos que un horario queda apartado mientras se confirma la cita
+    'max_citas_masivas': 500,  # Máximo de citas por petición a /api/citas/masivas/
+    'hilos_notificaciones': 4,  # Hilos por worker de notificaciones (manage.py procesar_notificaciones)
+    'reintentos_notificaciones': 3,  # Intentos por email antes de pasarlo a notificaciones:fallidas
+    'max_notificaciones_fallidas': 1000,  # Mensajes que conserva notificaciones:fallidas (los más recientes)
+    'lista_espera_ttl': 3600,  # Segundos que un paciente de la lista de espera tiene para aceptar un horario
+    'pdf_renderer': 'plantilla',  # 'plantilla' (canvas sobre una plantilla fija) o 'platypus'
+    'procesos_pdf': None,  # Procesos para generar agendas en lote con manage.py generar_agendas (None: uno por CPU)
+    'hilos_pdf': 2,  # Hilos compartidos por todas las peticiones a /api/agendas/pdf/ en cada proceso del servidor
+    'pdf_sendfile': config('PDF_SENDFILE', default=''),  # '', 'x-sendfile' (Apache/lighttpd) o 'x-accel-redirect' (nginx)
+    'pdf_sendfile_prefijo': config('PDF_SENDFILE_PREFIJO', default='/protegido/'),  # Location internal de nginx para MEDIA_ROOT
+}
+
 
 # RESEND EMAIL CONFIGURATION
 RESEND_API_KEY = config('RESEND_API_KEY', default='')
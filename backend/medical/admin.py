@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Paciente, Medico, HorarioMedico, Cita, HistorialMedico, Consulta, Diagnostico,
-    Medicamento, Prescripcion, ConversacionIA, MensajeIA, Archivo
+    Medicamento, Prescripcion, ConversacionIA, MensajeIA, Archivo, ListaEspera
 )
 
 
@@ -220,7 +220,19 @@ class CitaAdmin(admin.ModelAdmin):
     marcar_como_completada.short_description = 'Marcar como completada'
     
     def cancelar_citas(self, request, queryset):
-        updated = queryset.filter(estado='AGENDADA').update(estado='CANCELADA')
-        self.message_user(request, f'{updated} cita(s) cancelada(s).')
+        # Guardar una por una: las señales actualizan la disponibilidad y ofrecen
+        # los horarios a la lista de espera (update() no emite señales)
+        citas = list(queryset.filter(estado='AGENDADA'))
+        for cita in citas:
+            cita.estado = 'CANCELADA'
+            cita.save(update_fields=['estado', 'fecha_actualizacion'])
+        self.message_user(request, f'{len(citas)} cita(s) cancelada(s).')
     cancelar_citas.short_description = 'Cancelar citas seleccionadas'
 
+
+@admin.register(ListaEspera)
+class ListaEsperaAdmin(admin.ModelAdmin):
+    list_display = ['paciente', 'medico', 'especialidad_normalizada', 'fecha_desde', 'fecha_hasta', 'estado', 'fecha_registro']
+    list_filter = ['estado', 'medico']
+    search_fields = ['paciente__nombre', 'paciente__apellido_paterno', 'paciente__email', 'especialidad_normalizada']
+    readonly_fields = ['fecha_registro', 'fecha_actualizacion', 'reserva', 'fecha_oferta']
@@ -0,0 +1,55 @@
+"""
+Management command que expira las ofertas de la lista de espera sin respuesta y
+ofrece esos horarios a la siguiente solicitud
+"""
+from django.core.management.base import BaseCommand
+from medical.services.lista_espera import ListaEsperaService
+import time
+
+
+class Command(BaseCommand):
+    help = 'Expira las ofertas de lista de espera sin respuesta y ofrece el horario a la siguiente solicitud'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=100,
+            help='Ofertas por transacción (default: 100)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=60,
+            help='Segundos de espera cuando no hay ofertas vencidas (default: 60)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Expira lo vencido y termina',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+
+        try:
+            while True:
+                try:
+                    expiradas = ListaEsperaService.expirar_ofertas(options['lote'])
+                except Exception as e:
+                    # Redis o la base de datos no disponibles: se reintenta en la siguiente pasada
+                    self.stderr.write(f"Error expirando ofertas: {str(e)}")
+                    expiradas = 0
+                    if options['una_vez']:
+                        break
+
+                total += expiradas
+                if expiradas:
+                    continue
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nRevisión detenida'))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} oferta(s) expirada(s)"))
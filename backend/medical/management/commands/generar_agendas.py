@@ -0,0 +1,67 @@
+"""
+Management command que genera las agendas diarias de los médicos en un zip
+"""
+from django.core.management.base import BaseCommand, CommandError
+from medical.services.agendas_pdf import LoteAgendas
+from datetime import date, datetime
+import time
+
+
+def _fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+class Command(BaseCommand):
+    help = 'Genera un zip con la agenda de cada médico por día (o los PDFs de confirmación de cada cita)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            type=_fecha,
+            help='Primer día, YYYY-MM-DD (default: hoy)',
+        )
+        parser.add_argument(
+            '--hasta',
+            type=_fecha,
+            help='Último día, YYYY-MM-DD (default: igual a --desde)',
+        )
+        parser.add_argument(
+            '--medico',
+            type=int,
+            action='append',
+            dest='medicos',
+            help='ID de un médico a incluir (se puede repetir; default: todos los que tengan citas)',
+        )
+        parser.add_argument(
+            '--formato',
+            choices=LoteAgendas.FORMATOS,
+            default='agenda',
+            help='agenda: un PDF por médico y día; confirmaciones: un PDF por cita (default: agenda)',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            help='Procesos en paralelo (default: CITAS_CONFIG["procesos_pdf"] o uno por CPU)',
+        )
+        parser.add_argument(
+            '--salida',
+            help='Archivo zip de salida (default: <formato>_<desde>_<hasta>.zip)',
+        )
+
+    def handle(self, *args, **options):
+        desde = options['desde'] or date.today()
+        hasta = options['hasta'] or desde
+        if hasta < desde:
+            raise CommandError('--hasta no puede ser anterior a --desde')
+
+        lote = LoteAgendas(desde, hasta, options['formato'], options['medicos'], options['procesos'])
+        salida = options['salida'] or f"{lote.formato}_{desde.strftime('%Y%m%d')}_{hasta.strftime('%Y%m%d')}.zip"
+
+        inicio = time.perf_counter()
+        with open(salida, 'wb') as archivo:
+            for parte in lote.zip_streaming():
+                archivo.write(parte)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {salida} generado en {time.perf_counter() - inicio:.1f}s ({lote.procesos} procesos)"
+        ))
@@ -0,0 +1,56 @@
+"""
+Management command que procesa la cola de notificaciones por email (Redis Streams)
+"""
+from django.core.management.base import BaseCommand
+from medical.services.notificaciones import TrabajadorNotificaciones
+import os
+import socket
+
+
+class Command(BaseCommand):
+    help = 'Envía los emails encolados (confirmaciones y cancelaciones de citas, avisos de lista de espera) con reintentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrencia',
+            type=int,
+            help='Emails que se envían en paralelo (por defecto CITAS_CONFIG["hilos_notificaciones"])',
+        )
+        parser.add_argument(
+            '--reintentos',
+            type=int,
+            help='Intentos por email antes de pasarlo a la lista de fallidas (por defecto CITAS_CONFIG["reintentos_notificaciones"])',
+        )
+        parser.add_argument(
+            '--consumidor',
+            default=f'{socket.gethostname()}-{os.getpid()}',
+            help='Nombre del worker dentro del grupo de consumidores (único por proceso)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa lo que haya en la cola y termina',
+        )
+
+    def handle(self, *args, **options):
+        trabajador = TrabajadorNotificaciones(
+            options['consumidor'],
+            concurrencia=options['concurrencia'],
+            reintentos=options['reintentos'],
+        )
+
+        self.stdout.write(
+            f"Worker '{trabajador.consumidor}' procesando notificaciones "
+            f"({trabajador.concurrencia} hilos, {trabajador.reintentos} intentos por email)"
+        )
+
+        try:
+            totales = trabajador.ejecutar(una_vez=options['una_vez'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nWorker detenido'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totales['enviadas']} email(s) enviado(s), {totales['fallidas']} fallido(s), "
+            f"{totales['pendientes']} pendiente(s) de reintento"
+        ))
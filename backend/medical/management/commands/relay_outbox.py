@@ -0,0 +1,55 @@
+"""
+Management command que publica en la cola de notificaciones los eventos pendientes
+del outbox (los que no se pudieron publicar al confirmarse su transacción)
+"""
+from django.core.management.base import BaseCommand
+from medical.services.outbox import RelayOutbox
+import time
+
+
+class Command(BaseCommand):
+    help = 'Publica en Redis los eventos pendientes del outbox de notificaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=100,
+            help='Eventos por transacción (default: 100)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera cuando no hay eventos pendientes (default: 5)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Publica lo pendiente y termina',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+
+        try:
+            while True:
+                try:
+                    publicados = RelayOutbox.publicar_lote(options['lote'])
+                except Exception as e:
+                    # Redis o la base de datos no disponibles: los eventos siguen en la tabla
+                    self.stderr.write(f"Error publicando el outbox: {str(e)}")
+                    publicados = 0
+                    if options['una_vez']:
+                        break
+
+                total += publicados
+                if publicados:
+                    continue
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nRelay detenido'))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} evento(s) publicado(s)"))
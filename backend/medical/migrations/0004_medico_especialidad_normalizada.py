@@ -0,0 +1,34 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    # Copia de medical.services.analizador.normalizar: las migraciones no deben
+    # depender del código de la app, que puede cambiar
+    return unicodedata.normalize('NFD', texto.lower()).encode('ascii', 'ignore').decode('ascii').strip()
+
+
+def llenar_especialidad_normalizada(apps, schema_editor):
+    Medico = apps.get_model('medical', 'Medico')
+    medicos = list(Medico.objects.only('id', 'especialidad'))
+    for medico in medicos:
+        medico.especialidad_normalizada = normalizar(medico.especialidad)
+    Medico.objects.bulk_update(medicos, ['especialidad_normalizada'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0003_alter_cita_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medico',
+            name='especialidad_normalizada',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Especialidad en minúsculas y sin acentos, para búsquedas indexadas', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(llenar_especialidad_normalizada, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.conf import settings
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+def llenar_horario(apps, schema_editor):
+    # (fecha + hora) es un timestamp sin zona: se interpreta en la zona del sistema,
+    # igual que Cita.rango_horario
+    schema_editor.execute(
+        "UPDATE medical_cita SET horario = tstzrange("
+        "(fecha + hora) AT TIME ZONE %s, "
+        "(fecha + hora) AT TIME ZONE %s + make_interval(mins => duracion_minutos), "
+        "'[)')",
+        [settings.TIME_ZONE, settings.TIME_ZONE]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0004_medico_especialidad_normalizada'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='cita',
+            name='horario',
+            field=django.contrib.postgres.fields.ranges.DateTimeRangeField(editable=False, help_text='Rango [inicio, fin) de la cita, calculado de fecha, hora y duracion_minutos', null=True),
+        ),
+        migrations.RunPython(llenar_horario, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cita',
+            name='horario',
+            field=django.contrib.postgres.fields.ranges.DateTimeRangeField(editable=False, help_text='Rango [inicio, fin) de la cita, calculado de fecha, hora y duracion_minutos'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cita',
+            unique_together=set(),
+        ),
+        # Falla si ya existen citas agendadas que se traslapan: deben resolverse antes
+        migrations.AddConstraint(
+            model_name='cita',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('estado', 'AGENDADA')), expressions=[('medico', '='), ('horario', '&&')], name='cita_sin_traslape'),
+        ),
+    ]
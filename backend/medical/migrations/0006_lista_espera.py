@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0005_cita_horario_exclusion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListaEspera',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('especialidad_normalizada', models.CharField(blank=True, help_text='Especialidad en minúsculas y sin acentos (solo si no se pidió un médico)', max_length=100)),
+                ('fecha_desde', models.DateField(help_text='Primer día aceptable')),
+                ('fecha_hasta', models.DateField(help_text='Último día aceptable')),
+                ('motivo', models.TextField(help_text='Motivo de la cita')),
+                ('estado', models.CharField(choices=[('ESPERANDO', 'Esperando'), ('OFRECIDA', 'Horario ofrecido'), ('ASIGNADA', 'Cita asignada'), ('EXPIRADA', 'Oferta expirada'), ('CANCELADA', 'Cancelada')], default='ESPERANDO', max_length=20)),
+                ('fecha_ofrecida', models.DateField(blank=True, null=True)),
+                ('hora_ofrecida', models.TimeField(blank=True, null=True)),
+                ('reserva', models.CharField(blank=True, max_length=32)),
+                ('fecha_oferta', models.DateTimeField(blank=True, null=True)),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('cita', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lista_espera', to='medical.cita')),
+                ('medico', models.ForeignKey(blank=True, help_text='Médico solicitado (vacío: cualquier médico de la especialidad)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='listas_espera', to='medical.medico')),
+                ('medico_ofrecido', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ofertas_lista_espera', to='medical.medico')),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='listas_espera', to='medical.paciente')),
+            ],
+            options={
+                'verbose_name': 'Lista de Espera',
+                'verbose_name_plural': 'Listas de Espera',
+                'ordering': ['fecha_registro'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'ESPERANDO'), ('medico__isnull', False)), fields=['medico', 'fecha_desde', 'fecha_registro'], name='espera_por_medico_idx'), models.Index(condition=models.Q(('estado', 'ESPERANDO'), ('medico__isnull', True)), fields=['especialidad_normalizada', 'fecha_desde', 'fecha_registro'], name='espera_por_especialidad_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0006_lista_espera'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('confirmacion_cita', 'Confirmación de cita'), ('cancelacion_cita', 'Cancelación de cita'), ('oferta_lista_espera', 'Oferta de lista de espera')], max_length=40)),
+                ('objeto_id', models.IntegerField(help_text='ID de la cita o de la solicitud de lista de espera')),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Evento Outbox',
+                'verbose_name_plural': 'Eventos Outbox',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0007_evento_outbox'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='medico',
+            index=GinIndex(fields=['especialidad_normalizada'], name='medico_especialidad_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
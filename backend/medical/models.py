@@ -1,4 +1,8 @@
 from django.db import models
+from django.db.backends.postgresql.psycopg_any import DateTimeTZRange
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -90,6 +94,12 @@ class Medico(models.Model):
     
     # Información profesional
     especialidad = models.CharField(max_length=100, help_text="Especialidad médica (Cardiología, Pediatría, etc.)")
+    especialidad_normalizada = models.CharField(
+        max_length=100,
+        editable=False,
+        db_index=True,
+        help_text="Especialidad en minúsculas y sin acentos, para búsquedas indexadas"
+    )
     sub_especialidad = models.CharField(max_length=100, blank=True, help_text="Sub-especialidad si aplica")
     cedula_profesional = models.CharField(max_length=50, unique=True, help_text="Cédula profesional")
     cedula_especialidad = models.CharField(max_length=50, blank=True, help_text="Cédula de especialidad")
@@ -124,10 +134,30 @@ class Medico(models.Model):
         verbose_name = "Médico"
         verbose_name_plural = "Médicos"
         ordering = ['apellido_paterno', 'nombre']
+        indexes = [
+            # Trigramas: búsqueda por cualquier parte de la especialidad (LIKE '%x%')
+            GinIndex(
+                fields=['especialidad_normalizada'],
+                name='medico_especialidad_trgm_idx',
+                opclasses=['gin_trgm_ops']
+            ),
+        ]
     
     def __str__(self):
         return f"Dr(a). {self.nombre} {self.apellido_paterno} - {self.especialidad}"
     
+    def save(self, *args, **kwargs):
+        """Mantiene especialidad_normalizada sincronizada con especialidad"""
+        from .services.analizador import normalizar
+        
+        self.especialidad_normalizada = normalizar(self.especialidad).strip()
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'especialidad' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'especialidad_normalizada'}
+        
+        super().save(*args, **kwargs)
+    
     def nombre_completo(self):
         """Retorna el nombre completo del médico"""
         if self.apellido_materno:
@@ -201,6 +231,10 @@ class Cita(models.Model):
         validators=[MinValueValidator(15), MaxValueValidator(180)],
         help_text="Duración estimada en minutos"
     )
+    horario = DateTimeRangeField(
+        editable=False,
+        help_text="Rango [inicio, fin) de la cita, calculado de fecha, hora y duracion_minutos"
+    )
     tipo_consulta = models.CharField(max_length=20, choices=TIPO_CONSULTA_CHOICES, default='primera_vez')
     motivo = models.TextField(help_text="Motivo de la cita")
     sintomas_iniciales = models.TextField(blank=True, help_text="Síntomas mencionados en el chat")
@@ -232,12 +266,41 @@ class Cita(models.Model):
             models.Index(fields=['fecha', 'hora', 'medico']),
             models.Index(fields=['paciente', 'estado']),
         ]
-        unique_together = [['medico', 'fecha', 'hora']]  # No permitir citas duplicadas
+        constraints = [
+            # No permitir citas agendadas del mismo médico que se traslapen (según su
+            # duración); el índice GiST requiere la extensión btree_gist
+            ExclusionConstraint(
+                name='cita_sin_traslape',
+                expressions=[
+                    ('medico', RangeOperators.EQUAL),
+                    ('horario', RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(estado='AGENDADA'),
+            ),
+        ]
     
     def __str__(self):
         from datetime import datetime
         return f"Cita: {self.paciente} con {self.medico.nombre_completo()} - {self.fecha.strftime('%d/%m/%Y')} {self.hora.strftime('%H:%M')}"
     
+    @staticmethod
+    def rango_horario(fecha, hora, duracion_minutos):
+        """Rango [inicio, fin) en la zona horaria del sistema de una cita"""
+        from django.utils import timezone
+        from datetime import datetime, timedelta
+        inicio = timezone.make_aware(datetime.combine(fecha, hora))
+        return DateTimeTZRange(inicio, inicio + timedelta(minutes=duracion_minutos), '[)')
+    
+    def save(self, *args, **kwargs):
+        """Mantiene horario sincronizado con fecha, hora y duracion_minutos"""
+        self.horario = Cita.rango_horario(self.fecha, self.hora, self.duracion_minutos)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'fecha', 'hora', 'duracion_minutos'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'horario'}
+        
+        super().save(*args, **kwargs)
+    
     def esta_disponible(self):
         """Verifica si la cita sigue disponible (no cancelada ni completada)"""
         return self.estado == 'AGENDADA'
@@ -257,6 +320,113 @@ class Cita(models.Model):
         return False
 
 
+class ListaEspera(models.Model):
+    """
+    Solicitudes de pacientes que esperan un horario que se libere (por médico o por
+    especialidad, dentro de un rango de fechas)
+    """
+    
+    ESTADO_CHOICES = [
+        ('ESPERANDO', 'Esperando'),
+        ('OFRECIDA', 'Horario ofrecido'),
+        ('ASIGNADA', 'Cita asignada'),
+        ('EXPIRADA', 'Oferta expirada'),
+        ('CANCELADA', 'Cancelada'),
+    ]
+    
+    paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='listas_espera')
+    medico = models.ForeignKey(
+        Medico,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='listas_espera',
+        help_text="Médico solicitado (vacío: cualquier médico de la especialidad)"
+    )
+    especialidad_normalizada = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Especialidad en minúsculas y sin acentos (solo si no se pidió un médico)"
+    )
+    fecha_desde = models.DateField(help_text="Primer día aceptable")
+    fecha_hasta = models.DateField(help_text="Último día aceptable")
+    motivo = models.TextField(help_text="Motivo de la cita")
+    
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='ESPERANDO')
+    
+    # Horario ofrecido (apartado en Redis con el token 'reserva' hasta que expira)
+    medico_ofrecido = models.ForeignKey(
+        Medico,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ofertas_lista_espera'
+    )
+    fecha_ofrecida = models.DateField(null=True, blank=True)
+    hora_ofrecida = models.TimeField(null=True, blank=True)
+    reserva = models.CharField(max_length=32, blank=True)
+    fecha_oferta = models.DateTimeField(null=True, blank=True)
+    cita = models.OneToOneField(
+        Cita,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='lista_espera'
+    )
+    
+    # Metadatos
+    fecha_registro = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Lista de Espera"
+        verbose_name_plural = "Listas de Espera"
+        ordering = ['fecha_registro']
+        indexes = [
+            # Solo las solicitudes en espera participan en la asignación de horarios
+            models.Index(
+                fields=['medico', 'fecha_desde', 'fecha_registro'],
+                condition=models.Q(estado='ESPERANDO', medico__isnull=False),
+                name='espera_por_medico_idx'
+            ),
+            models.Index(
+                fields=['especialidad_normalizada', 'fecha_desde', 'fecha_registro'],
+                condition=models.Q(estado='ESPERANDO', medico__isnull=True),
+                name='espera_por_especialidad_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        solicitado = self.medico.nombre_completo() if self.medico else self.especialidad_normalizada
+        return f"{self.paciente} - {solicitado} ({self.fecha_desde} a {self.fecha_hasta}) - {self.estado}"
+
+
+class EventoOutbox(models.Model):
+    """
+    Notificaciones pendientes de publicar en la cola de Redis (patrón outbox)
+    Se guardan en la misma transacción que el cambio que las origina, así que no se
+    pierden si el proceso cae antes de encolarlas; el relay las publica y las borra
+    """
+    
+    TIPO_CHOICES = [
+        ('confirmacion_cita', 'Confirmación de cita'),
+        ('cancelacion_cita', 'Cancelación de cita'),
+        ('oferta_lista_espera', 'Oferta de lista de espera'),
+    ]
+    
+    tipo = models.CharField(max_length=40, choices=TIPO_CHOICES)
+    objeto_id = models.IntegerField(help_text="ID de la cita o de la solicitud de lista de espera")
+    fecha_registro = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Evento Outbox"
+        verbose_name_plural = "Eventos Outbox"
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.tipo} #{self.objeto_id}"
+
+
 class HistorialMedico(models.Model):
     """Modelo para el historial médico del paciente"""
     
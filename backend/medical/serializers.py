@@ -3,7 +3,7 @@
 Serializers para la API REST del sistema médico
 """
 from rest_framework import serializers
-from .models import Paciente, Medico, HorarioMedico, Cita
+from .models import Paciente, Medico, HorarioMedico, Cita, ListaEspera
 
 
 class PacienteSerializer(serializers.ModelSerializer):
@@ -93,13 +93,16 @@ class CitaCreateSerializer(serializers.ModelSerializer):
     paciente_telefono = serializers.CharField(write_only=True)
     paciente_fecha_nacimiento = serializers.DateField(write_only=True)
     paciente_sexo = serializers.ChoiceField(choices=['M', 'F'], write_only=True)
+    # Token de POST /api/citas/reservar/ (opcional)
+    reserva = serializers.CharField(write_only=True, required=False)
     
     class Meta:
         model = Cita
         fields = [
             'medico', 'fecha', 'hora', 'motivo', 'sintomas_iniciales',
             'paciente_nombre', 'paciente_apellido_paterno', 'paciente_apellido_materno',
-            'paciente_email', 'paciente_telefono', 'paciente_fecha_nacimiento', 'paciente_sexo'
+            'paciente_email', 'paciente_telefono', 'paciente_fecha_nacimiento', 'paciente_sexo',
+            'reserva'
         ]
     
     def validate(self, data):
@@ -122,6 +125,61 @@ class CitaCreateSerializer(serializers.ModelSerializer):
         return data
 
 
+class CitaMasivaSerializer(serializers.Serializer):
+    """
+    Serializer para cada cita de /api/citas/masivas/
+    Sin consultas por item: los horarios se validan en bloque en CitaService
+    """
+    medico_id = serializers.IntegerField()
+    fecha = serializers.DateField()
+    hora = serializers.TimeField()
+    motivo = serializers.CharField()
+    sintomas_iniciales = serializers.CharField(required=False, allow_blank=True, default='')
+    paciente_nombre = serializers.CharField()
+    paciente_apellido_paterno = serializers.CharField()
+    paciente_apellido_materno = serializers.CharField(required=False, allow_blank=True, default='')
+    paciente_email = serializers.EmailField()
+    paciente_telefono = serializers.CharField()
+    paciente_fecha_nacimiento = serializers.DateField()
+    paciente_sexo = serializers.ChoiceField(choices=['M', 'F'])
+
+
+class ListaEsperaSerializer(serializers.ModelSerializer):
+    """Serializer de solicitudes de lista de espera"""
+    paciente_nombre = serializers.CharField(source='paciente.nombre_completo', read_only=True)
+    
+    class Meta:
+        model = ListaEspera
+        fields = [
+            'id', 'paciente', 'paciente_nombre', 'medico', 'especialidad_normalizada',
+            'fecha_desde', 'fecha_hasta', 'motivo', 'estado',
+            'medico_ofrecido', 'fecha_ofrecida', 'hora_ofrecida', 'fecha_oferta', 'cita',
+            'fecha_registro'
+        ]
+        read_only_fields = fields
+
+
+class ListaEsperaCreateSerializer(serializers.Serializer):
+    """Serializer para inscribirse en la lista de espera (médico o especialidad)"""
+    medico_id = serializers.IntegerField(required=False)
+    especialidad = serializers.CharField(required=False)
+    fecha_desde = serializers.DateField()
+    fecha_hasta = serializers.DateField()
+    motivo = serializers.CharField()
+    paciente_nombre = serializers.CharField()
+    paciente_apellido_paterno = serializers.CharField()
+    paciente_apellido_materno = serializers.CharField(required=False, allow_blank=True, default='')
+    paciente_email = serializers.EmailField()
+    paciente_telefono = serializers.CharField()
+    paciente_fecha_nacimiento = serializers.DateField()
+    paciente_sexo = serializers.ChoiceField(choices=['M', 'F'])
+    
+    def validate(self, data):
+        if not data.get('medico_id') and not data.get('especialidad'):
+            raise serializers.ValidationError("Se requiere medico_id o especialidad")
+        return data
+
+
 class HorarioMedicoSerializer(serializers.ModelSerializer):
     """Serializer para horarios de médicos"""
     medico_nombre = serializers.CharField(source='medico.nombre_completo', read_only=True)
@@ -0,0 +1,322 @@
+"""
+Generación en lote de las agendas diarias de los médicos
+Para un rango de fechas produce, por médico y día, un PDF con la agenda (una fila por
+cita, varias páginas si hace falta) o los PDFs de confirmación de cada cita. El
+trabajo se reparte por médico y los archivos se agregan a un zip a medida que
+terminan, así la respuesta empieza a enviarse con el primer médico. El comando
+generar_agendas usa un pool de procesos; las peticiones HTTP, un pool de hilos
+acotado y compartido (un fork desde un servidor con hilos hereda sus conexiones y
+locks, y cada petición concurrente lanzaría sus propios procesos)
+"""
+from django.conf import settings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from io import BytesIO
+from itertools import groupby
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from datetime import datetime
+import multiprocessing
+import os
+import threading
+import zipfile
+
+import django
+
+from ..models import Cita
+from .pdf_service import PDFService
+
+
+COLOR_TEXTO = colors.HexColor('#2c3e50')
+COLOR_SUBTITULO = colors.HexColor('#34495e')
+COLOR_PIE = colors.HexColor('#7f8c8d')
+COLOR_LINEA = colors.HexColor('#bdc3c7')
+
+ANCHO, ALTO = landscape(letter)
+MARGEN = 54
+FILA = 20
+Y_PRIMERA_FILA = ALTO - 150
+FILAS_POR_PAGINA = int((Y_PRIMERA_FILA - 60) // FILA) + 1
+
+# (encabezado, x, ancho)
+COLUMNAS = [
+    ('Hora', MARGEN, 44),
+    ('Min.', MARGEN + 48, 30),
+    ('Paciente', MARGEN + 84, 170),
+    ('Teléfono', MARGEN + 260, 90),
+    ('Tipo', MARGEN + 356, 76),
+    ('Estado', MARGEN + 438, 70),
+    ('Motivo', MARGEN + 514, ANCHO - 2 * MARGEN - 514),
+]
+
+
+def _recortar(texto, fuente, tamano, ancho):
+    """Recorta el texto con '…' para que quepa en el ancho dado"""
+    texto = ' '.join(str(texto or '').split())
+    if stringWidth(texto, fuente, tamano) <= ancho:
+        return texto
+    while texto and stringWidth(texto + '…', fuente, tamano) > ancho:
+        texto = texto[:-1]
+    return texto + '…'
+
+
+class AgendaPDF:
+    """PDF con las citas de un médico en un día (hoja horizontal, una fila por cita)"""
+
+    @staticmethod
+    def nombre_archivo(medico, fecha):
+        apellido = medico.apellido_paterno.replace(' ', '_')
+        return f"agenda_{fecha.strftime('%Y%m%d')}_{medico.id}_{apellido}.pdf"
+
+    @staticmethod
+    def _encabezado(lienzo, medico, fecha, pagina, paginas, total):
+        lienzo.setFillColor(COLOR_TEXTO)
+        lienzo.setFont('Helvetica-Bold', 20)
+        lienzo.drawString(MARGEN, ALTO - 60, f"AGENDA DEL {fecha.strftime('%d/%m/%Y')}")
+        lienzo.setFillColor(COLOR_SUBTITULO)
+        lienzo.setFont('Helvetica-Bold', 13)
+        lienzo.drawString(MARGEN, ALTO - 84, f"{medico.nombre_completo()} - {medico.especialidad}")
+        lienzo.setFont('Helvetica', 10)
+        lienzo.drawString(MARGEN, ALTO - 100, f"Cédula Profesional: {medico.cedula_profesional}")
+
+        lienzo.setFillColor(COLOR_TEXTO)
+        lienzo.setFont('Helvetica-Bold', 10)
+        for encabezado, x, _ in COLUMNAS:
+            lienzo.drawString(x, ALTO - 126, encabezado)
+        lienzo.setStrokeColor(COLOR_LINEA)
+        lienzo.line(MARGEN, ALTO - 132, ANCHO - MARGEN, ALTO - 132)
+
+        lienzo.setFillColor(COLOR_PIE)
+        lienzo.setFont('Helvetica', 8)
+        lienzo.drawCentredString(
+            ANCHO / 2, 30,
+            f"Página {pagina} de {paginas} - {total} cita(s) - Generado el {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+        )
+
+    @classmethod
+    def generar(cls, medico, fecha, citas):
+        """
+        Args:
+            medico (Medico): Médico de la agenda
+            fecha (date): Día de la agenda
+            citas (list): Citas del día ordenadas por hora (con paciente)
+
+        Returns:
+            bytes: Contenido del PDF
+        """
+        buffer = BytesIO()
+        lienzo = canvas.Canvas(buffer, pagesize=(ANCHO, ALTO), pageCompression=0)
+        lienzo.setTitle(f"Agenda {fecha.isoformat()} - {medico.nombre_completo()}")
+
+        paginas = -(-len(citas) // FILAS_POR_PAGINA)
+        for pagina in range(paginas):
+            cls._encabezado(lienzo, medico, fecha, pagina + 1, paginas, len(citas))
+            lienzo.setFillColor(COLOR_TEXTO)
+            lienzo.setFont('Helvetica', 10)
+
+            filas = citas[pagina * FILAS_POR_PAGINA:(pagina + 1) * FILAS_POR_PAGINA]
+            for i, cita in enumerate(filas):
+                y = Y_PRIMERA_FILA - i * FILA
+                valores = [
+                    cita.hora.strftime('%H:%M'),
+                    cita.duracion_minutos,
+                    f"{cita.paciente.nombre} {cita.paciente.apellido_paterno} {cita.paciente.apellido_materno}",
+                    cita.paciente.telefono,
+                    cita.get_tipo_consulta_display(),
+                    cita.get_estado_display(),
+                    cita.motivo,
+                ]
+                for valor, (_, x, ancho) in zip(valores, COLUMNAS):
+                    lienzo.drawString(x, y, _recortar(valor, 'Helvetica', 10, ancho - 4))
+
+            lienzo.showPage()
+
+        lienzo.save()
+        return buffer.getvalue()
+
+
+def generar_archivos_medico(formato, medico, citas):
+    """
+    Genera los archivos de un médico (se ejecuta en los procesos del pool)
+
+    Args:
+        formato (str): 'agenda' o 'confirmaciones'
+        medico (Medico): Médico
+        citas (list): Citas del médico en el rango, ordenadas por fecha y hora
+
+    Returns:
+        list: Tuplas (ruta dentro del zip, contenido del PDF)
+    """
+    carpeta = f"{medico.id}_{medico.apellido_paterno.replace(' ', '_')}"
+    archivos = []
+
+    if formato == 'agenda':
+        for fecha, del_dia in groupby(citas, key=lambda cita: cita.fecha):
+            archivos.append((
+                f"{carpeta}/{AgendaPDF.nombre_archivo(medico, fecha)}",
+                AgendaPDF.generar(medico, fecha, list(del_dia))
+            ))
+    else:
+        # Los mismos PDFs guardados que sirve la descarga de cada cita: solo se
+        # generan (y guardan) los que aún no existen para la versión actual
+        for cita in citas:
+            archivos.append((
+                f"{carpeta}/{cita.fecha.isoformat()}/{PDFService.obtener_nombre_archivo(cita)}",
+                PDFService.leer_pdf_cita(cita)
+            ))
+
+    return archivos
+
+
+class _SalidaZip:
+    """Destino de escritura sin seek para zipfile: acumula lo escrito hasta que se retira"""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+class LoteAgendas:
+    """
+    Agendas (o confirmaciones) de varios médicos en un rango de fechas
+
+    Los procesos del pool no consultan la base de datos: reciben las citas ya
+    cargadas (una sola consulta) y solo generan los PDFs (o leen del storage los
+    de confirmación ya guardados)
+    """
+
+    FORMATOS = ('agenda', 'confirmaciones')
+    EJECUTORES = ('procesos', 'hilos')
+
+    _pool_hilos = None
+    _lock_pool_hilos = threading.Lock()
+
+    def __init__(self, desde, hasta, formato='agenda', medico_ids=None, procesos=None, ejecutor='procesos'):
+        """
+        Args:
+            desde (date): Primer día
+            hasta (date): Último día
+            formato (str): 'agenda' (un PDF por médico y día) o 'confirmaciones'
+                (el PDF de confirmación de cada cita)
+            medico_ids (list, optional): Médicos a incluir (todos los que tengan citas)
+            procesos (int, optional): Tamaño del pool de procesos (CITAS_CONFIG['procesos_pdf']
+                o la cantidad de CPUs)
+            ejecutor (str): 'procesos' (comando generar_agendas) o 'hilos' (peticiones
+                HTTP: pool compartido de CITAS_CONFIG['hilos_pdf'] hilos)
+
+        Raises:
+            ValueError: Si el formato no existe
+        """
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato inválido: {formato}. Use {' o '.join(self.FORMATOS)}")
+        if ejecutor not in self.EJECUTORES:
+            raise ValueError(f"Ejecutor inválido: {ejecutor}. Use {' o '.join(self.EJECUTORES)}")
+
+        self.desde = desde
+        self.hasta = hasta
+        self.formato = formato
+        self.medico_ids = medico_ids
+        self.procesos = procesos or settings.CITAS_CONFIG.get('procesos_pdf') or os.cpu_count() or 1
+        self.ejecutor = ejecutor
+
+    @staticmethod
+    def _opciones_pool():
+        """
+        'fork' donde existe: los procesos heredan Django ya configurado y arrancan al
+        instante (con 'spawn' cada uno tarda segundos en cargar las apps). En el resto
+        de plataformas, 'spawn' configurando Django al iniciar cada proceso
+        """
+        if 'fork' in multiprocessing.get_all_start_methods():
+            return {'mp_context': multiprocessing.get_context('fork')}
+        return {'mp_context': multiprocessing.get_context('spawn'), 'initializer': django.setup}
+
+    @classmethod
+    def pool_hilos(cls):
+        """
+        Pool de hilos del proceso, creado la primera vez que se usa y compartido por
+        todas las peticiones: las que llegan a la vez esperan turno en su cola
+        """
+        with cls._lock_pool_hilos:
+            if cls._pool_hilos is None:
+                cls._pool_hilos = ThreadPoolExecutor(
+                    max_workers=settings.CITAS_CONFIG.get('hilos_pdf') or 2,
+                    thread_name_prefix='agendas_pdf'
+                )
+            return cls._pool_hilos
+
+    def tareas(self):
+        """
+        Returns:
+            list: Tuplas (medico, citas) con las citas no canceladas del rango
+        """
+        citas = Cita.objects.filter(
+            fecha__range=(self.desde, self.hasta)
+        ).exclude(estado='CANCELADA').select_related('paciente', 'medico').order_by('medico_id', 'fecha', 'hora')
+        if self.medico_ids:
+            citas = citas.filter(medico_id__in=self.medico_ids)
+
+        return [
+            (del_medico[0].medico, del_medico)
+            for del_medico in (list(grupo) for _, grupo in groupby(citas, key=lambda cita: cita.medico_id))
+        ]
+
+    def archivos(self):
+        """
+        Genera los PDFs repartiendo los médicos entre los procesos
+
+        Yields:
+            tuple: (ruta dentro del zip, contenido) en el orden en que terminan
+        """
+        tareas = self.tareas()
+
+        if self.ejecutor == 'hilos':
+            yield from self._recolectar(self.pool_hilos(), tareas)
+            return
+
+        if len(tareas) <= 1 or self.procesos <= 1:
+            for medico, citas in tareas:
+                yield from generar_archivos_medico(self.formato, medico, citas)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.procesos, len(tareas)),
+            **self._opciones_pool()
+        ) as pool:
+            yield from self._recolectar(pool, tareas)
+
+    def _recolectar(self, pool, tareas):
+        """Envía un trabajo por médico al pool y entrega sus archivos en el orden en que terminan"""
+        futuros = [pool.submit(generar_archivos_medico, self.formato, medico, citas) for medico, citas in tareas]
+        try:
+            for futuro in as_completed(futuros):
+                yield from futuro.result()
+        finally:
+            # Si el cliente cortó la descarga, los médicos que no empezaron no ocupan el pool
+            for futuro in futuros:
+                futuro.cancel()
+
+    def zip_streaming(self):
+        """
+        Zip con todos los archivos, producido por partes a medida que se generan
+
+        Yields:
+            bytes: Siguiente parte del zip
+        """
+        salida = _SalidaZip()
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as archivo_zip:
+            for ruta, contenido in self.archivos():
+                archivo_zip.writestr(ruta, contenido)
+                yield salida.retirar()
+        yield salida.retirar()
@@ -0,0 +1,256 @@
+"""
+Analizador de palabras clave del asistente virtual
+Las tablas de palabras clave (intención, especialidad, síntomas, urgencia y
+solicitud de datos) se compilan una sola vez al importar el módulo, una expresión
+regular por grupo de tablas (las del mensaje del paciente y las de la respuesta
+del asistente), y cada texto se recorre una sola vez
+"""
+from collections import defaultdict
+import re
+import unicodedata
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos ('Cardiología' -> 'cardiologia')"""
+    # NFD separa las tildes en caracteres combinados que el encode a ASCII descarta;
+    # ambos pasos corren en C, a diferencia de filtrar carácter por carácter
+    return unicodedata.normalize('NFD', texto.lower()).encode('ascii', 'ignore').decode('ascii')
+
+
+def _tabla_bytes():
+    """
+    Tabla de traducción para texto codificado en Latin-1 (un byte por carácter):
+    pasa a minúsculas sin acentos y reemplaza signos de puntuación y espacios por
+    b' ', para que toda palabra del texto quede precedida por un espacio
+    """
+    tabla = bytearray(range(256))
+    for byte in range(256):
+        caracter = bytes([byte]).decode('latin-1')
+        base = normalizar(caracter)
+        if not caracter.isalnum():
+            tabla[byte] = ord(' ')
+        elif len(base) == 1:
+            tabla[byte] = ord(base)
+    return bytes(tabla)
+
+
+_TABLA_BYTES = _tabla_bytes()
+
+
+def _preparar(texto):
+    """
+    Texto normalizado como bytes, precedido por un espacio
+    Codificar a Latin-1 y traducir con una tabla de 256 bytes recorre el texto
+    dos veces en C, sin lower() ni NFD sobre el str completo
+    """
+    return b' ' + texto.encode('latin-1', 'replace').translate(_TABLA_BYTES)
+
+
+# Cada tabla es una lista de (palabra_clave, valor). Para las tablas de conteo el
+# valor es la propia palabra; para las de clasificación, la categoría detectada.
+# El orden importa: en 'especialidad' gana la primera de la tabla que aparezca.
+TABLAS = {
+    # Intención del usuario (servicio con Redis)
+    'intencion_sintomas': [(p, p) for p in [
+        'dolor', 'duele', 'siento', 'tengo', 'fiebre', 'tos', 'mareo',
+        'náusea', 'vómito', 'malestar', 'cansancio', 'síntoma'
+    ]],
+    'intencion_cita': [(p, p) for p in [
+        'cita', 'agendar', 'turno', 'consulta', 'hora', 'reservar',
+        'médico', 'doctor', 'especialista'
+    ]],
+
+    # La respuesta del asistente pide datos del paciente
+    'requiere_datos': [(p, p) for p in [
+        'nombre', 'edad', 'email', 'teléfono', 'correo', 'datos'
+    ]],
+
+    # Especialidad sugerida en la respuesta del asistente
+    'especialidad': [
+        ('medicina general', 'Medicina General'),
+        ('cardiología', 'Cardiología'),
+        ('dermatología', 'Dermatología'),
+        ('pediatría', 'Pediatría'),
+        ('traumatología', 'Traumatología'),
+        ('psicología', 'Psicología'),
+    ],
+
+    # Urgencia en la respuesta del asistente (servicio con Redis)
+    'urgencia': [(p, p) for p in [
+        'urgente', 'inmediato', 'emergencia', 'grave', 'severo',
+        'hospital', 'ambulancia', 'atención inmediata'
+    ]],
+
+    # Síntomas en el mensaje del paciente (servicio con base de datos)
+    'sintomas': [
+        (palabra, sintoma)
+        for sintoma, palabras in [
+            ('dolor', ['dolor', 'duele', 'adolorido', 'molestia']),
+            ('fiebre', ['fiebre', 'temperatura', 'calentura', 'febrícula']),
+            ('tos', ['tos', 'tosiendo', 'toser']),
+            ('mareo', ['mareo', 'mareado', 'vértigo', 'inestable']),
+            ('nausea', ['náusea', 'náuseas', 'ganas de vomitar', 'asco']),
+            ('vomito', ['vómito', 'vomitando', 'vomité']),
+            ('diarrea', ['diarrea', 'evacuaciones', 'descomposición']),
+            ('fatiga', ['cansancio', 'fatiga', 'cansado', 'agotado', 'débil']),
+            ('respiracion', ['respirar', 'respiro', 'ahogo', 'falta de aire']),
+        ]
+        for palabra in palabras
+    ],
+
+    # Urgencia alta en el mensaje del paciente (servicio con base de datos)
+    'urgencia_paciente': [(p, p) for p in [
+        'dolor de pecho', 'no puedo respirar', 'sangre', 'sangrando',
+        'desmayo', 'inconsciente', 'confusión', 'convulsión',
+        'dolor intenso', 'no puedo moverme', 'parálisis',
+        'mucho dolor', 'insoportable', 'emergencia'
+    ]],
+
+    # La respuesta del asistente recomienda atención urgente (servicio con base de datos)
+    'recomendacion_urgente': [(p, p) for p in [
+        'atención inmediata', 'urgencia', 'emergencia',
+        'acude al médico de inmediato', 'consulta urgente',
+        'atención médica urgente', 'servicio de emergencias'
+    ]],
+}
+
+
+# Tablas que se buscan en cada tipo de texto: la respuesta del asistente (que puede
+# ser larga) no se recorre con las tablas del mensaje del paciente ni al revés
+GRUPOS = {
+    'mensaje': ('intencion_sintomas', 'intencion_cita', 'sintomas', 'urgencia_paciente'),
+    'respuesta': ('requiere_datos', 'especialidad', 'urgencia', 'recomendacion_urgente'),
+}
+
+
+def _trie_regex(palabras):
+    """
+    Construye una alternativa equivalente a 'p1|p2|...' agrupando los prefijos
+    comunes (como un trie), para que en cada posición del texto el motor de
+    expresiones regulares solo pruebe la rama de la letra actual
+    """
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for letra in palabra:
+            nodo = nodo.setdefault(bytes([letra]), {})
+        nodo[b''] = True
+
+    def _regex(nodo):
+        fin = nodo.get(b'') is True
+        ramas = [re.escape(letra) + _regex(hijo) for letra, hijo in sorted(nodo.items()) if letra]
+
+        if not ramas:
+            return b''
+        cuerpo = ramas[0] if len(ramas) == 1 else b'(?:' + b'|'.join(ramas) + b')'
+        # Las ramas son voraces: se prefiere la palabra más larga que coincida
+        if fin:
+            return (b'(?:' + cuerpo + b')?') if len(ramas) == 1 else cuerpo + b'?'
+        return cuerpo
+
+    return _regex(trie)
+
+
+def _compilar(tablas):
+    """
+    Compila las tablas en una sola expresión regular
+
+    Returns:
+        tuple: (patron, entradas) donde entradas asocia cada palabra que puede
+            capturar el patrón con las (tabla, valor, orden) de ella y de las
+            palabras clave que son prefijo suyo
+    """
+    entradas = defaultdict(list)
+    for tabla, pares in tablas.items():
+        # El orden es el del primer par de cada valor: todas las palabras de un mismo
+        # valor comparten la entrada, y basta un set para no contarla dos veces
+        ordenes = {}
+        for palabra, valor in pares:
+            orden = ordenes.setdefault(valor, len(ordenes))
+            entradas[_preparar(palabra).strip()].append((tabla, valor, orden))
+
+    # En cada posición el trie captura la palabra más larga que coincide; las más
+    # cortas que empiezan ahí son justamente sus prefijos
+    palabras = list(entradas)
+    cierre = {
+        p: tuple({entrada for q in palabras if p.startswith(q) for entrada in entradas[q]})
+        for p in palabras
+    }
+
+    # Las palabras clave se buscan al inicio de una palabra del texto (pueden
+    # continuar: 'náusea' encuentra 'náuseas'). Anclar en el espacio permite al
+    # motor de regex saltar directamente de un espacio al siguiente, y el lookahead
+    # permite coincidencias superpuestas ('mucho dolor' y 'dolor')
+    patron = re.compile(b' (?=(' + _trie_regex(palabras) + b'))')
+
+    return patron, cierre
+
+
+# grupo -> (patron, entradas); None compila todas las tablas
+_PATRONES = {
+    grupo: _compilar({tabla: TABLAS[tabla] for tabla in tablas})
+    for grupo, tablas in GRUPOS.items()
+}
+_PATRONES[None] = _compilar(TABLAS)
+
+
+class AnalizadorPalabrasClave:
+    """Detección de intención, especialidad, síntomas y urgencia en una sola pasada"""
+
+    @staticmethod
+    def coincidencias(texto, grupo=None):
+        """
+        Args:
+            texto (str): Texto a analizar
+            grupo (str, optional): Clave de GRUPOS con las tablas a buscar (todas si es None)
+
+        Returns:
+            dict: tabla -> {valor: orden en la tabla} con lo encontrado en el texto
+        """
+        patron, entradas = _PATRONES[grupo]
+        coincidentes = set()
+        for palabra in set(patron.findall(_preparar(texto))):
+            coincidentes.update(entradas[palabra])
+
+        encontrado = defaultdict(dict)
+        for tabla, valor, orden in coincidentes:
+            encontrado[tabla][valor] = orden
+
+        return encontrado
+
+    @classmethod
+    def analizar(cls, texto, grupo=None):
+        """
+        Analiza un texto contra las tablas de un grupo (o contra todas)
+
+        Args:
+            texto (str): Mensaje del usuario o respuesta del asistente
+            grupo (str, optional): 'mensaje' o 'respuesta'; las claves de las tablas
+                fuera del grupo quedan en 0, None o False
+
+        Returns:
+            dict: {
+                'conteo_sintomas': int,  # Palabras de intención 'sintomas'
+                'conteo_cita': int,  # Palabras de intención 'agendar_cita'
+                'requiere_datos': bool,
+                'especialidad': str or None,
+                'urgencia': bool,
+                'sintomas': list,  # Categorías de síntomas en el orden de la tabla
+                'urgencia_paciente': bool,
+                'recomendacion_urgente': bool
+            }
+        """
+        encontrado = cls.coincidencias(texto, grupo)
+        especialidades = encontrado.get('especialidad', {})
+        sintomas = encontrado.get('sintomas', {})
+
+        return {
+            'conteo_sintomas': len(encontrado.get('intencion_sintomas', {})),
+            'conteo_cita': len(encontrado.get('intencion_cita', {})),
+            'requiere_datos': bool(encontrado.get('requiere_datos')),
+            'especialidad': min(especialidades, key=especialidades.get) if especialidades else None,
+            'urgencia': bool(encontrado.get('urgencia')),
+            'sintomas': sorted(sintomas, key=sintomas.get),
+            'urgencia_paciente': bool(encontrado.get('urgencia_paciente')),
+            'recomendacion_urgente': bool(encontrado.get('recomendacion_urgente')),
+        }
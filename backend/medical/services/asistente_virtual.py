@@ -3,19 +3,21 @@ Servicio de Asistente Virtual con OpenAI ChatGPT
 Este módulo maneja todas las interacciones con la API de OpenAI
 """
 
-from openai import OpenAI
 from django.conf import settings
 from medical.models import ConversacionIA, MensajeIA, Paciente
 from django.utils import timezone
 import re
 
+from .analizador import AnalizadorPalabrasClave
+from .openai_cliente import obtener_cliente_openai
+
 
 class AsistenteVirtualService:
     """Servicio para manejar conversaciones con el asistente virtual de IA"""
     
     def __init__(self):
-        """Inicializa el cliente de OpenAI"""
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        """Usa el cliente de OpenAI compartido por el proceso"""
+        self.client = obtener_cliente_openai()
         self.modelo = settings.OPENAI_MODEL
         self.system_prompt = self._get_system_prompt()
     
@@ -235,46 +237,13 @@ Antes de comenzar, quiero conocerte un poco. Veo que:
         Returns:
             dict: Análisis del mensaje
         """
-        contenido_lower = contenido.lower()
-        
-        # Palabras clave de síntomas comunes
-        sintomas_keywords = {
-            'dolor': ['dolor', 'duele', 'adolorido', 'molestia'],
-            'fiebre': ['fiebre', 'temperatura', 'calentura', 'febrícula'],
-            'tos': ['tos', 'tosiendo', 'toser'],
-            'mareo': ['mareo', 'mareado', 'vértigo', 'inestable'],
-            'nausea': ['náusea', 'náuseas', 'ganas de vomitar', 'asco'],
-            'vomito': ['vómito', 'vomitando', 'vomité'],
-            'diarrea': ['diarrea', 'evacuaciones', 'descomposición'],
-            'fatiga': ['cansancio', 'fatiga', 'cansado', 'agotado', 'débil'],
-            'respiracion': ['respirar', 'respiro', 'ahogo', 'falta de aire'],
-        }
-        
-        # Palabras clave de urgencia alta
-        urgencia_keywords = [
-            'dolor de pecho', 'no puedo respirar', 'sangre', 'sangrando',
-            'desmayo', 'inconsciente', 'confusión', 'convulsión',
-            'dolor intenso', 'no puedo moverme', 'parálisis',
-            'mucho dolor', 'insoportable', 'emergencia'
-        ]
+        # Síntomas y urgencia en una sola pasada sobre el mensaje
+        analisis = AnalizadorPalabrasClave.analizar(contenido, 'mensaje')
         
-        sintomas_detectados = []
-        contiene_sintomas = False
-        contiene_urgencia = False
-        nivel_urgencia = 1
-        
-        # Detectar síntomas
-        for sintoma, keywords in sintomas_keywords.items():
-            if any(keyword in contenido_lower for keyword in keywords):
-                sintomas_detectados.append(sintoma)
-                contiene_sintomas = True
-        
-        # Detectar urgencia
-        for keyword in urgencia_keywords:
-            if keyword in contenido_lower:
-                contiene_urgencia = True
-                nivel_urgencia = 8
-                break
+        sintomas_detectados = analisis['sintomas']
+        contiene_sintomas = bool(sintomas_detectados)
+        contiene_urgencia = analisis['urgencia_paciente']
+        nivel_urgencia = 8 if contiene_urgencia else 1
         
         # Si hay síntomas pero no urgencia clara, asignar nivel medio
         if contiene_sintomas and not contiene_urgencia:
@@ -289,18 +258,7 @@ Antes de comenzar, quiero conocerte un poco. Veo que:
     
     def _detecta_recomendacion_urgente(self, respuesta):
         """Detecta si la respuesta del asistente recomienda atención urgente"""
-        keywords_urgentes = [
-            'atención inmediata',
-            'urgencia',
-            'emergencia',
-            'acude al médico de inmediato',
-            'consulta urgente',
-            'atención médica urgente',
-            'servicio de emergencias'
-        ]
-        
-        respuesta_lower = respuesta.lower()
-        return any(keyword in respuesta_lower for keyword in keywords_urgentes)
+        return AnalizadorPalabrasClave.analizar(respuesta, 'respuesta')['recomendacion_urgente']
     
     def finalizar_conversacion(self, conversacion_id):
         """
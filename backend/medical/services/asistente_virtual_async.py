@@ -0,0 +1,204 @@
+"""
+Servicio asíncrono del Asistente Virtual (AsyncOpenAI + redis.asyncio)
+Pensado para las vistas async servidas por ASGI: mientras espera a OpenAI o a
+Redis no ocupa un hilo, por lo que un proceso puede atender muchos chats a la vez
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .asistente_virtual_redis import AsistenteVirtualBase
+from .cache_respuestas import CacheRespuestasAsync
+from .conversacion_store import ConversacionStoreAsync
+from .extractor_datos import ExtractorDatosPaciente
+from .llm_backend import obtener_backend_llm
+
+
+class AsistenteVirtualAsyncService(AsistenteVirtualBase):
+    """
+    Variante asíncrona de AsistenteVirtualService
+    Comparte con ella la lógica de prompts, análisis y agendamiento
+    (AsistenteVirtualBase) y el formato de las conversaciones en Redis
+    """
+    
+    def __init__(self):
+        """Inicializa el backend de LLM, el almacén de conversaciones y el cache de respuestas"""
+        super().__init__()
+        self.llm = obtener_backend_llm()
+        self.store = ConversacionStoreAsync(self.timeout)
+        self.cache_respuestas = CacheRespuestasAsync()
+    
+    async def iniciar_conversacion(self):
+        """
+        Inicia una nueva conversación y retorna el ID
+        
+        Returns:
+            dict: {
+                'conversacion_id': str (UUID),
+                'mensaje_inicial': str
+            }
+        """
+        conversacion_id, mensajes, metadatos = self._nueva_conversacion()
+        
+        await self.store.crear(conversacion_id, mensajes, metadatos)
+        
+        return {
+            'conversacion_id': conversacion_id,
+            'mensaje_inicial': self.MENSAJE_INICIAL
+        }
+    
+    async def obtener_conversacion(self, conversacion_id):
+        """
+        Returns:
+            dict or None: Datos de la conversación o None si no existe/expiró
+        """
+        return await self.store.obtener(conversacion_id)
+    
+    async def enviar_mensaje(self, conversacion_id, mensaje_usuario):
+        """
+        Envía un mensaje del usuario y obtiene respuesta del asistente
+        
+        Returns:
+            dict: Mismo formato que AsistenteVirtualService.enviar_mensaje
+        """
+        conversacion = await self.store.obtener(conversacion_id, ultimos=self.max_mensajes)
+        
+        if not conversacion:
+            # Conversación expirada o no existe - crear nueva
+            return self._respuesta_conversacion_nueva(await self.iniciar_conversacion())
+        
+        turno = self._construir_turno(conversacion, mensaje_usuario)
+        
+        if turno['clave_cache']:
+            respuesta_cacheada = await self.cache_respuestas.obtener(turno['clave_cache'])
+            if respuesta_cacheada:
+                return await self._completar_turno(conversacion_id, turno, respuesta_cacheada)
+        
+        try:
+            respuesta_asistente = await self.llm.completar_async(
+                mensajes=turno['mensajes_para_api'],
+                max_tokens=settings.ASISTENTE_CONFIG.get('max_tokens', 800),
+                temperature=settings.ASISTENTE_CONFIG.get('temperature', 0.7)
+            )
+            
+        except Exception as e:
+            # Error en la API de OpenAI
+            return self._respuesta_error(e)
+        
+        if turno['clave_cache'] and respuesta_asistente:
+            await self.cache_respuestas.guardar(turno['clave_cache'], respuesta_asistente)
+        
+        return await self._completar_turno(conversacion_id, turno, respuesta_asistente)
+    
+    async def _completar_turno(self, conversacion_id, turno, respuesta_asistente):
+        """Analiza la respuesta del asistente y persiste el turno en Redis"""
+        resultado, mensajes_nuevos, cambios = self._procesar_respuesta(turno, respuesta_asistente)
+        await self.store.agregar_mensajes(conversacion_id, mensajes_nuevos, **cambios)
+        
+        if turno['por_resumir'] or turno['fuera_de_ventana']:
+            await self._actualizar_resumen(conversacion_id, turno)
+        
+        return resultado
+    
+    async def _actualizar_resumen(self, conversacion_id, turno):
+        """Pliega en el resumen los mensajes que quedaron fuera de la ventana de historial"""
+        try:
+            por_resumir = turno['por_resumir']
+            if turno['fuera_de_ventana']:
+                inicio, fin = turno['fuera_de_ventana']
+                por_resumir = await self.store.obtener_mensajes(conversacion_id, inicio, fin - 1) + por_resumir
+            
+            resumen = await self.llm.completar_async(
+                mensajes=self._mensajes_resumen(turno['conversacion'].get('resumen'), por_resumir),
+                max_tokens=self.max_tokens_resumen,
+                temperature=0.3
+            )
+            
+            await self.store.actualizar(
+                conversacion_id,
+                resumen=resumen.strip(),
+                resumen_hasta=turno['resumen_hasta']
+            )
+            
+        except Exception as e:
+            print(f"[ERROR] Error al actualizar resumen: {e}")
+    
+    async def obtener_historial(self, conversacion_id):
+        """
+        Returns:
+            list: Lista de mensajes (sin el system prompt)
+        """
+        return self._filtrar_historial(await self.obtener_conversacion(conversacion_id))
+    
+    async def finalizar_conversacion(self, conversacion_id):
+        """Finaliza y elimina una conversación de Redis"""
+        await self.store.eliminar(conversacion_id)
+        return True
+    
+    async def extraer_datos_paciente(self, conversacion_id):
+        """
+        Obtiene los datos del paciente de la conversación, usando IA solo para
+        completar los campos que no se capturaron turno a turno
+        
+        Returns:
+            dict: Datos extraídos del paciente o None si no hay suficiente información
+        """
+        conversacion = await self.obtener_conversacion(conversacion_id)
+        
+        if not conversacion:
+            return None
+        
+        datos_conocidos = conversacion.get('datos_paciente')
+        if ExtractorDatosPaciente.completos(datos_conocidos):
+            return self._combinar_extraccion(datos_conocidos, {})
+        
+        try:
+            respuesta = await self.llm.completar_async(
+                mensajes=self._mensajes_extraccion(conversacion, datos_conocidos),
+                max_tokens=400,
+                temperature=0.1
+            )
+            
+            datos = self._combinar_extraccion(
+                datos_conocidos,
+                self._parsear_extraccion(respuesta) or {}
+            )
+            
+            if datos:
+                await self.store.actualizar(conversacion_id, datos_paciente=datos)
+            
+            return datos
+            
+        except Exception as e:
+            print(f"[ERROR] Error al extraer datos: {e}")
+            return None
+    
+    async def crear_cita_desde_conversacion(self, conversacion_id):
+        """
+        Crea una cita basándose en la conversación
+        Las consultas a la base de datos se ejecutan con sync_to_async
+        
+        Returns:
+            dict: Resultado de la creación de la cita
+        """
+        conversacion = await self.obtener_conversacion(conversacion_id)
+        
+        if not conversacion:
+            return {
+                'exito': False,
+                'error': 'Conversación no encontrada o expirada'
+            }
+        
+        datos_paciente = conversacion.get('datos_paciente')
+        
+        if ExtractorDatosPaciente.completos(datos_paciente):
+            datos_paciente = self._combinar_extraccion(datos_paciente, {})
+        else:
+            datos_paciente = await self.extraer_datos_paciente(conversacion_id)
+        
+        resultado = await sync_to_async(self._agendar_cita)(conversacion, datos_paciente)
+        
+        if resultado['exito']:
+            await self.store.actualizar(conversacion_id, cita_creada=self._resumen_cita_creada(resultado))
+        
+        return resultado
@@ -3,269 +3,300 @@ Servicio de Asistente Virtual con OpenAI ChatGPT y Redis
 Este módulo maneja todas las interacciones con la API de OpenAI usando Redis para cache
 """
 
-from openai import OpenAI
 from django.conf import settings
-from django.core.cache import cache
 from django.utils import timezone
 from datetime import datetime, timedelta
 import uuid
 import json
 import re
 
+from .analizador import AnalizadorPalabrasClave
+from .cache_respuestas import CacheRespuestas
+from .conversacion_store import ConversacionStore
+from .extractor_datos import ExtractorDatosPaciente
+from .llm_backend import obtener_backend_llm
+from .prompts import PROMPT_ASISTENTE, PROMPT_ASISTENTE_VERSION, obtener_prompt
+from .tokens import estimar_tokens_mensaje, estimar_tokens_mensajes
 
-class AsistenteVirtualService:
+
+class AsistenteVirtualBase:
     """
-    Servicio para manejar conversaciones con el asistente virtual de IA
-    Usa Redis para almacenar temporalmente las conversaciones (30 minutos)
+    Lógica del asistente que no hace I/O con OpenAI ni con Redis
+    Compartida por el servicio síncrono (AsistenteVirtualService) y el
+    asíncrono (AsistenteVirtualAsyncService)
     """
     
+    # Mensaje inicial del asistente
+    MENSAJE_INICIAL = """¡Hola! 👋 Soy tu asistente médico virtual.
+
+Puedo evaluar tus síntomas o ayudarte a agendar una cita médica.
+¿En qué puedo ayudarte hoy? :)"""
+    
+    # Instrucciones para la extracción de datos del paciente
+    SYSTEM_PROMPT_EXTRACCION = 'Eres un asistente experto en extraer datos estructurados de conversaciones. Respondes SOLO en formato JSON válido, sin explicaciones adicionales.'
+    
+    # Instrucciones para resumir los turnos que ya no caben en la ventana de historial
+    SYSTEM_PROMPT_RESUMEN = 'Resumes conversaciones entre un paciente y un asistente médico. Conserva síntomas, duración, especialidad sugerida, preferencias de horario y datos personales mencionados. Responde solo con el resumen, en español y en pocas líneas.'
+    
+    # Al resumir, la ventana se reduce a esta fracción del presupuesto para que
+    # el resumen no tenga que regenerarse en cada turno
+    FRACCION_VENTANA_TRAS_RESUMEN = 0.5
+    
     def __init__(self):
-        """Inicializa el cliente de OpenAI"""
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        """Carga la configuración del asistente"""
         self.modelo = settings.OPENAI_MODEL
         self.timeout = settings.ASISTENTE_CONFIG.get('timeout_conversacion', 1800)  # 30 min
-        self.max_mensajes = settings.ASISTENTE_CONFIG.get('max_historial_mensajes', 20)
-    
-    def _get_cache_key(self, conversacion_id):
-        """Genera la clave de cache para una conversación"""
-        return f"conversacion:{conversacion_id}"
+        self.max_mensajes = settings.ASISTENTE_CONFIG.get('max_historial_mensajes', 60)
+        self.max_tokens_historial = settings.ASISTENTE_CONFIG.get('max_tokens_historial', 2000)
+        self.max_tokens_resumen = settings.ASISTENTE_CONFIG.get('max_tokens_resumen', 300)
     
-    def _get_system_prompt(self):
+    def _get_system_prompt(self, version=None):
         """
-        Define el comportamiento y personalidad del asistente médico virtual
-        MODIFICADO para sistema de portfolio - Proactivo y guiado
+        Obtiene el system prompt del asistente médico virtual
+        
+        Args:
+            version (str, optional): Versión guardada en la conversación. Si no está
+                registrada en este proceso se usa la versión actual.
+        
+        Returns:
+            str: Texto del prompt
         """
-        return """Eres un asistente médico virtual amigable y profesional para un sistema de demostración.
-
-Tu función principal es:
-
-1. **SALUDO INICIAL**: Cuando un usuario inicie la conversación, salúdalo calurosamente y ofrécele DOS opciones claras:
-   - "Evaluar síntomas que tengas"
-   - "Agendar una cita médica"
-
-2. **SI EL USUARIO MENCIONA SÍNTOMAS**:
-   - Haz 2-3 preguntas de seguimiento relevantes
-   - Evalúa la gravedad
-   - Recomienda la especialidad médica apropiada
-   - Pregunta: "¿Deseas agendar una cita con [Especialidad]?"
-
-3. **SI EL USUARIO QUIERE AGENDAR CITA**:
-   - Si vino de evaluación de síntomas, sugiere la especialidad apropiada
-   - Si es directo, pregunta: "¿Qué especialidad médica necesitas?"
-   - Una vez definida la especialidad, SOLICITA sus datos personales EN ESTE ORDEN:
-     * Nombre completo (nombre y apellidos)
-     * Edad
-     * Email
-     * Teléfono
-   - Solicita UN dato a la vez, espera la respuesta antes de pedir el siguiente
-   - DESPUÉS de recopilar TODOS los datos (nombre, apellidos, edad, email, teléfono), di EXACTAMENTE:
-     "Perfecto, ya tengo toda tu información. Haz clic en el botón 'Crear Cita Ahora' para confirmar tu cita."
-   - NO menciones fechas u horas específicas, el sistema las asignará automáticamente
-   - NO intentes crear la cita tú mismo, el usuario debe hacer clic en el botón
-
-4. **DETECCIÓN DE INTENCIÓN**:
-   - Identifica si el usuario quiere: [SINTOMAS] o [AGENDAR_CITA]
-   - Marca claramente la intención en tu respuesta
-
-5. **SÉ CONCISO Y DIRECTO**:
-   - Respuestas claras y breves
-   - Usa emojis moderadamente
-   - Guía al usuario paso a paso
-   - Solicita UN dato a la vez
-
-6. **IMPORTANTE**:
-   - NO diagnostiques
-   - Si detectas síntomas graves, recomienda atención inmediata
-   - Sé empático pero profesional
-   - NO inventes fechas u horas de citas, el sistema las asignará
-
-**SÍNTOMAS DE ALARMA** (requieren atención urgente):
-- Dolor de pecho intenso
-- Dificultad severa para respirar
-- Sangrado abundante
-- Alteración de conciencia
-- Fiebre >40°C persistente
-
-**ESPECIALIDADES DISPONIBLES**:
-- Medicina General
-- Cardiología
-- Dermatología
-- Pediatría
-- Traumatología
-- Psicología
-
-Responde siempre en español y de forma amigable."""
+        return obtener_prompt(version) or PROMPT_ASISTENTE
     
-    def iniciar_conversacion(self):
+    def _nueva_conversacion(self):
         """
-        Inicia una nueva conversación y retorna el ID
+        Construye la estructura inicial de una conversación
         
         Returns:
-            dict: {
-                'conversacion_id': str (UUID),
-                'mensaje_inicial': str
-            }
+            tuple: (conversacion_id, mensajes, metadatos)
         """
         conversacion_id = str(uuid.uuid4())
         
-        # Mensaje inicial del asistente
-        mensaje_inicial = """¡Hola! 👋 Soy tu asistente médico virtual.
-
-Puedo evaluar tus síntomas o ayudarte a agendar una cita médica.
-¿En qué puedo ayudarte hoy? :)"""
-        
-        # Crear estructura de conversación en Redis
-        conversacion_data = {
+        # Crear estructura de conversación en Redis (lista de mensajes + hash de metadatos)
+        # El system prompt no se copia: solo se guarda su versión
+        mensajes = [
+            {
+                'role': 'assistant',
+                'content': self.MENSAJE_INICIAL
+            }
+        ]
+        metadatos = {
             'conversacion_id': conversacion_id,
             'inicio': timezone.now().isoformat(),
-            'mensajes': [
-                {
-                    'role': 'system',
-                    'content': self._get_system_prompt()
-                },
-                {
-                    'role': 'assistant',
-                    'content': mensaje_inicial
-                }
-            ],
+            'prompt_version': PROMPT_ASISTENTE_VERSION,
             'intencion': None,  # 'sintomas' o 'agendar_cita'
             'datos_paciente': None,  # Se llena cuando se soliciten datos
-            'especialidad_sugerida': None
+            'especialidad_sugerida': None,
+            'resumen': None,  # Resumen de los turnos que ya no se envían completos
+            'resumen_hasta': 0  # Mensajes (desde el inicio de la lista) incluidos en el resumen
         }
         
-        # Guardar en Redis con timeout de 30 minutos
-        cache_key = self._get_cache_key(conversacion_id)
-        cache.set(cache_key, json.dumps(conversacion_data), self.timeout)
+        return conversacion_id, mensajes, metadatos
+    
+    def _construir_turno(self, conversacion, mensaje_usuario):
+        """
+        Construye los mensajes que se envían a la API para un nuevo turno
+        
+        Args:
+            conversacion (dict): Metadatos + ventana de mensajes recientes
+            mensaje_usuario (str): Mensaje del usuario
+        
+        Returns:
+            dict: {
+                'conversacion': dict,
+                'mensaje_user': dict,
+                'mensajes_para_api': list,
+                'por_resumir': list,  # Mensajes a incorporar al resumen tras el turno
+                'fuera_de_ventana': tuple or None,  # (inicio, fin) de mensajes sin resumir que no se cargaron
+                'resumen_hasta': int,  # Nuevo valor de 'resumen_hasta' si se resume
+                'clave_cache': str or None  # Clave en el cache de respuestas si el turno es cacheable
+            }
+        """
+        # Se calcula antes de agregar el mensaje para contar solo los turnos previos
+        clave_cache = self.cache_respuestas.clave_turno(conversacion, mensaje_usuario, self.modelo)
+        
+        # Agregar mensaje del usuario al historial (se persiste junto con la respuesta)
+        mensaje_user = {
+            'role': 'user',
+            'content': mensaje_usuario
+        }
+        conversacion['mensajes'].append(mensaje_user)
+        mensajes = conversacion['mensajes']
+        
+        # Resolver el system prompt desde el registro según la versión de la conversación
+        mensajes_sistema = [{
+            'role': 'system',
+            'content': self._get_system_prompt(conversacion.get('prompt_version'))
+        }]
+        
+        if conversacion.get('resumen'):
+            mensajes_sistema.append({
+                'role': 'system',
+                'content': f"Resumen de la conversación anterior con el paciente:\n{conversacion['resumen']}"
+            })
+        
+        # Los mensajes ya resumidos no se vuelven a enviar completos
+        indice_inicio = conversacion.get('indice_inicio', 0)
+        resumen_hasta = conversacion.get('resumen_hasta', 0)
+        desde = max(resumen_hasta - indice_inicio, 0)
+        desde = min(desde, len(mensajes) - 1)
+        
+        # Mensajes que ya salieron de los últimos max_historial_mensajes sin llegar a
+        # resumirse (por ejemplo, si falló el resumen): se leen de Redis al resumir
+        fuera_de_ventana = (resumen_hasta, indice_inicio) if resumen_hasta < indice_inicio else None
+        
+        # Llenar el presupuesto de tokens desde el mensaje más reciente hacia atrás
+        presupuesto = self.max_tokens_historial - estimar_tokens_mensajes(mensajes_sistema[1:])
+        inicio = max(self._inicio_ventana(mensajes, presupuesto), desde)
+        
+        # Si quedaron mensajes fuera de la ventana, se pliegan al resumen después
+        # del turno, dejando la ventana en una fracción del presupuesto
+        por_resumir = []
+        if inicio > desde:
+            corte = self._inicio_ventana(mensajes, presupuesto * self.FRACCION_VENTANA_TRAS_RESUMEN)
+            corte = max(corte, inicio)
+            por_resumir = mensajes[desde:corte]
+            resumen_hasta = indice_inicio + corte
+        elif fuera_de_ventana:
+            resumen_hasta = indice_inicio
         
         return {
-            'conversacion_id': conversacion_id,
-            'mensaje_inicial': mensaje_inicial
+            'conversacion': conversacion,
+            'mensaje_user': mensaje_user,
+            'mensajes_para_api': mensajes_sistema + mensajes[inicio:],
+            'por_resumir': por_resumir,
+            'fuera_de_ventana': fuera_de_ventana,
+            'resumen_hasta': resumen_hasta,
+            'clave_cache': clave_cache
         }
     
-    def obtener_conversacion(self, conversacion_id):
+    @staticmethod
+    def _inicio_ventana(mensajes, presupuesto):
         """
-        Obtiene una conversación existente desde Redis
+        Calcula desde qué mensaje cabe el historial en el presupuesto de tokens,
+        recorriendo desde el más reciente hacia atrás
         
         Args:
-            conversacion_id (str): UUID de la conversación
+            mensajes (list): Mensajes en orden cronológico
+            presupuesto (int): Tokens disponibles
         
         Returns:
-            dict or None: Datos de la conversación o None si no existe/expiró
+            int: Índice del primer mensaje de la ventana (el último mensaje siempre se incluye)
         """
-        cache_key = self._get_cache_key(conversacion_id)
-        data = cache.get(cache_key)
+        inicio = len(mensajes) - 1
+        usados = estimar_tokens_mensaje(mensajes[inicio])
+        
+        while inicio > 0:
+            tokens = estimar_tokens_mensaje(mensajes[inicio - 1])
+            if usados + tokens > presupuesto:
+                break
+            usados += tokens
+            inicio -= 1
         
-        if data:
-            return json.loads(data)
-        return None
+        return inicio
     
-    def guardar_conversacion(self, conversacion_data):
+    def _mensajes_resumen(self, resumen_previo, mensajes):
         """
-        Guarda/actualiza una conversación en Redis
+        Construye los mensajes para pedir a OpenAI el resumen actualizado
         
         Args:
-            conversacion_data (dict): Datos de la conversación
+            resumen_previo (str or None): Resumen guardado en la conversación
+            mensajes (list): Mensajes que salen de la ventana de historial
+        
+        Returns:
+            list: Mensajes para la API
         """
-        cache_key = self._get_cache_key(conversacion_data['conversacion_id'])
-        cache.set(cache_key, json.dumps(conversacion_data), self.timeout)
+        texto = '\n'.join(
+            f"{'Usuario' if m['role'] == 'user' else 'Asistente'}: {m['content']}"
+            for m in mensajes
+        )
+        
+        prompt = f"""RESUMEN ACTUAL:
+{resumen_previo or '(vacío)'}
+
+NUEVOS MENSAJES:
+{texto}
+
+Actualiza el resumen incorporando los nuevos mensajes."""
+        
+        return [
+            {'role': 'system', 'content': self.SYSTEM_PROMPT_RESUMEN},
+            {'role': 'user', 'content': prompt}
+        ]
     
-    def enviar_mensaje(self, conversacion_id, mensaje_usuario):
+    def _procesar_respuesta(self, turno, respuesta_asistente):
         """
-        Envía un mensaje del usuario y obtiene respuesta del asistente
-        
-        Args:
-            conversacion_id (str): UUID de la conversación
-            mensaje_usuario (str): Mensaje del usuario
+        Analiza la respuesta del asistente y calcula qué se debe persistir
         
         Returns:
-            dict: {
-                'respuesta': str,
-                'intencion': str or None,
-                'requiere_datos': bool,
-                'especialidad_sugerida': str or None,
-                'es_urgente': bool
-            }
+            tuple: (resultado:dict, mensajes_nuevos:list, cambios_metadatos:dict)
         """
-        # Obtener conversación
-        conversacion = self.obtener_conversacion(conversacion_id)
+        conversacion = turno['conversacion']
+        mensaje_usuario = turno['mensaje_user']['content']
         
-        if not conversacion:
-            # Conversación expirada o no existe - crear nueva
-            resultado = self.iniciar_conversacion()
-            return {
-                'respuesta': resultado['mensaje_inicial'],
-                'intencion': None,
-                'requiere_datos': False,
-                'especialidad_sugerida': None,
-                'es_urgente': False,
-                'nueva_conversacion': True,
-                'conversacion_id': resultado['conversacion_id']
-            }
+        # Mensaje del asistente al que responde el usuario (contexto para la extracción)
+        anteriores = conversacion['mensajes'][:-1]
+        mensaje_previo = anteriores[-1]['content'] if anteriores and anteriores[-1]['role'] == 'assistant' else None
         
-        # Agregar mensaje del usuario al historial
-        conversacion['mensajes'].append({
-            'role': 'user',
-            'content': mensaje_usuario
-        })
+        mensaje_assistant = {
+            'role': 'assistant',
+            'content': respuesta_asistente
+        }
         
-        # Limitar historial
-        mensajes_sistema = [m for m in conversacion['mensajes'] if m['role'] == 'system']
-        mensajes_conversacion = [m for m in conversacion['mensajes'] if m['role'] != 'system']
+        # Analizar intención y contenido
+        analisis = self._analizar_respuesta(mensaje_usuario, respuesta_asistente, conversacion)
         
-        if len(mensajes_conversacion) > self.max_mensajes:
-            mensajes_conversacion = mensajes_conversacion[-self.max_mensajes:]
+        # Actualizar solo los metadatos que cambiaron
+        cambios = {}
+        if analisis['intencion'] and analisis['intencion'] != conversacion.get('intencion'):
+            cambios['intencion'] = analisis['intencion']
         
-        mensajes_para_api = mensajes_sistema + mensajes_conversacion
+        if analisis['especialidad_sugerida'] and analisis['especialidad_sugerida'] != conversacion.get('especialidad_sugerida'):
+            cambios['especialidad_sugerida'] = analisis['especialidad_sugerida']
         
-        # Llamar a OpenAI
-        try:
-            response = self.client.chat.completions.create(
-                model=self.modelo,
-                messages=mensajes_para_api,
-                max_tokens=settings.ASISTENTE_CONFIG.get('max_tokens', 800),
-                temperature=settings.ASISTENTE_CONFIG.get('temperature', 0.7)
-            )
-            
-            respuesta_asistente = response.choices[0].message.content
-            
-            # Agregar respuesta al historial
-            conversacion['mensajes'].append({
-                'role': 'assistant',
-                'content': respuesta_asistente
-            })
-            
-            # Analizar intención y contenido
-            analisis = self._analizar_respuesta(mensaje_usuario, respuesta_asistente, conversacion)
-            
-            # Actualizar conversación
-            if analisis['intencion']:
-                conversacion['intencion'] = analisis['intencion']
-            
-            if analisis['especialidad_sugerida']:
-                conversacion['especialidad_sugerida'] = analisis['especialidad_sugerida']
-            
-            # Guardar conversación actualizada
-            self.guardar_conversacion(conversacion)
-            
-            return {
-                'respuesta': respuesta_asistente,
-                'intencion': conversacion.get('intencion'),
-                'requiere_datos': analisis['requiere_datos'],
-                'especialidad_sugerida': conversacion.get('especialidad_sugerida'),
-                'es_urgente': analisis['es_urgente'],
-                'nueva_conversacion': False
-            }
-            
-        except Exception as e:
-            # Error en la API de OpenAI
-            return {
-                'respuesta': f"Lo siento, hubo un error al procesar tu mensaje: {str(e)}",
-                'intencion': None,
-                'requiere_datos': False,
-                'especialidad_sugerida': None,
-                'es_urgente': False,
-                'error': True
-            }
+        # Capturar los datos del paciente a medida que los entrega
+        datos_nuevos = ExtractorDatosPaciente.extraer(mensaje_usuario, mensaje_previo)
+        if datos_nuevos:
+            cambios['datos_paciente'] = ExtractorDatosPaciente.combinar(conversacion.get('datos_paciente'), datos_nuevos)
+            print(f"[DEBUG] Datos del paciente capturados: {list(datos_nuevos)}")
+        
+        conversacion.update(cambios)
+        
+        resultado = {
+            'respuesta': respuesta_asistente,
+            'intencion': conversacion.get('intencion'),
+            'requiere_datos': analisis['requiere_datos'],
+            'especialidad_sugerida': conversacion.get('especialidad_sugerida'),
+            'es_urgente': analisis['es_urgente'],
+            'nueva_conversacion': False
+        }
+        
+        return resultado, [turno['mensaje_user'], mensaje_assistant], cambios
+    
+    @staticmethod
+    def _respuesta_conversacion_nueva(resultado_inicio):
+        """Respuesta cuando la conversación solicitada expiró y se inició una nueva"""
+        return {
+            'respuesta': resultado_inicio['mensaje_inicial'],
+            'intencion': None,
+            'requiere_datos': False,
+            'especialidad_sugerida': None,
+            'es_urgente': False,
+            'nueva_conversacion': True,
+            'conversacion_id': resultado_inicio['conversacion_id']
+        }
+    
+    @staticmethod
+    def _respuesta_error(error):
+        """Respuesta estándar cuando falla la llamada a OpenAI"""
+        return {
+            'respuesta': f"Lo siento, hubo un error al procesar tu mensaje: {str(error)}",
+            'intencion': None,
+            'requiere_datos': False,
+            'especialidad_sugerida': None,
+            'es_urgente': False,
+            'error': True
+        }
     
     def _analizar_respuesta(self, mensaje_usuario, respuesta_asistente, conversacion):
         """
@@ -274,68 +305,26 @@ Puedo evaluar tus síntomas o ayudarte a agendar una cita médica.
         Returns:
             dict: Análisis de la conversación
         """
-        mensaje_lower = mensaje_usuario.lower()
-        respuesta_lower = respuesta_asistente.lower()
-        
         # Detectar intención
         intencion = conversacion.get('intencion')
         
         if not intencion:
-            # Detectar palabras clave de síntomas
-            sintomas_keywords = [
-                'dolor', 'duele', 'siento', 'tengo', 'fiebre', 'tos', 'mareo',
-                'náusea', 'vómito', 'malestar', 'cansancio', 'síntoma'
-            ]
-            
-            # Detectar palabras clave de agendamiento
-            cita_keywords = [
-                'cita', 'agendar', 'turno', 'consulta', 'hora', 'reservar',
-                'médico', 'doctor', 'especialista'
-            ]
-            
-            sintomas_count = sum(1 for keyword in sintomas_keywords if keyword in mensaje_lower)
-            cita_count = sum(1 for keyword in cita_keywords if keyword in mensaje_lower)
+            # Contar palabras clave de síntomas y de agendamiento
+            analisis_usuario = AnalizadorPalabrasClave.analizar(mensaje_usuario, 'mensaje')
+            sintomas_count = analisis_usuario['conteo_sintomas']
+            cita_count = analisis_usuario['conteo_cita']
             
             if sintomas_count > cita_count:
                 intencion = 'sintomas'
             elif cita_count > 0:
                 intencion = 'agendar_cita'
         
-        # Detectar si requiere datos del paciente
-        requiere_datos = any(keyword in respuesta_lower for keyword in [
-            'nombre', 'edad', 'email', 'teléfono', 'correo', 'datos'
-        ])
-        
-        # Detectar especialidad sugerida
-        especialidad_sugerida = None
-        especialidades = {
-            'medicina general': 'Medicina General',
-            'cardiología': 'Cardiología',
-            'cardiologia': 'Cardiología',
-            # 'endocrinología': 'Endocrinología',
-            # 'endocrinologia': 'Endocrinología',
-            'dermatología': 'Dermatología',
-            'dermatologia': 'Dermatología',
-            'pediatría': 'Pediatría',
-            'pediatria': 'Pediatría',
-            'traumatología': 'Traumatología',
-            'traumatologia': 'Traumatología',
-            'psicología': 'Psicología',
-            'psicologia': 'Psicología'
-        }
+        # Datos solicitados, especialidad sugerida y urgencia en una sola pasada
+        analisis_respuesta = AnalizadorPalabrasClave.analizar(respuesta_asistente, 'respuesta')
         
-        for key, value in especialidades.items():
-            if key in respuesta_lower:
-                especialidad_sugerida = value
-                break
-        
-        # Detectar urgencia
-        urgencia_keywords = [
-            'urgente', 'inmediato', 'emergencia', 'grave', 'severo',
-            'hospital', 'ambulancia', 'atención inmediata'
-        ]
-        
-        es_urgente = any(keyword in respuesta_lower for keyword in urgencia_keywords)
+        requiere_datos = analisis_respuesta['requiere_datos']
+        especialidad_sugerida = analisis_respuesta['especialidad']
+        es_urgente = analisis_respuesta['urgencia']
         
         return {
             'intencion': intencion,
@@ -344,58 +333,28 @@ Puedo evaluar tus síntomas o ayudarte a agendar una cita médica.
             'es_urgente': es_urgente
         }
     
-    def obtener_historial(self, conversacion_id):
-        """
-        Obtiene el historial de mensajes de una conversación
-        
-        Args:
-            conversacion_id (str): UUID de la conversación
-        
-        Returns:
-            list: Lista de mensajes (sin el system prompt)
-        """
-        conversacion = self.obtener_conversacion(conversacion_id)
-        
+    @staticmethod
+    def _filtrar_historial(conversacion):
+        """Retorna los mensajes de la conversación sin el system prompt"""
         if not conversacion:
             return []
         
-        # Filtrar mensajes (excluir system prompt)
-        mensajes = [
+        return [
             m for m in conversacion['mensajes']
             if m['role'] != 'system'
         ]
-        
-        return mensajes
     
-    def finalizar_conversacion(self, conversacion_id):
+    def _mensajes_extraccion(self, conversacion, datos_conocidos=None):
         """
-        Finaliza y elimina una conversación de Redis
+        Construye los mensajes para pedir a OpenAI los datos del paciente
         
         Args:
-            conversacion_id (str): UUID de la conversación
+            conversacion (dict): Conversación completa
+            datos_conocidos (dict, optional): Datos ya capturados durante la conversación
         
         Returns:
-            bool: True si se eliminó exitosamente
-        """
-        cache_key = self._get_cache_key(conversacion_id)
-        cache.delete(cache_key)
-        return True
-    
-    def extraer_datos_paciente(self, conversacion_id):
+            list: Mensajes para la API
         """
-        Extrae los datos del paciente de la conversación usando IA
-        
-        Args:
-            conversacion_id (str): UUID de la conversación
-        
-        Returns:
-            dict: Datos extraídos del paciente o None si no hay suficiente información
-        """
-        conversacion = self.obtener_conversacion(conversacion_id)
-        
-        if not conversacion:
-            return None
-        
         # Obtener TODA la conversación excluyendo el system prompt
         mensajes_conversacion = [
             f"{'Usuario' if m['role'] == 'user' else 'Asistente'}: {m['content']}"
@@ -407,13 +366,39 @@ Puedo evaluar tus síntomas o ayudarte a agendar una cita médica.
         
         print(f"[DEBUG] Conversación para extracción:\n{texto_completo[:500]}...")
         
+        seccion_conocidos = ''
+        if datos_conocidos:
+            # Los datos por confirmar (un nombre dicho con "soy") no se presentan como
+            # encontrados: la IA debe verificarlos en la conversación
+            inciertos = datos_conocidos.get('inciertos', [])
+            por_confirmar = {
+                campo: valor for campo, valor in datos_conocidos.items()
+                if campo in inciertos or (campo in ExtractorDatosPaciente.CAMPOS_NOMBRE and 'nombre' in inciertos)
+            }
+            seguros = {
+                campo: valor for campo, valor in datos_conocidos.items()
+                if campo != 'inciertos' and campo not in por_confirmar
+            }
+            seccion_conocidos = f"""
+DATOS YA IDENTIFICADOS (cuentan como encontrados, inclúyelos en tu respuesta):
+{json.dumps(seguros, ensure_ascii=False)}
+"""
+            if por_confirmar:
+                seccion_conocidos += f"""
+DATOS POR CONFIRMAR (capturados de una frase ambigua; corrígelos si la conversación dice otra cosa):
+{json.dumps(por_confirmar, ensure_ascii=False)}
+"""
+            seccion_conocidos += f"""
+Busca especialmente: {', '.join(ExtractorDatosPaciente.campos_faltantes(datos_conocidos) + inciertos)}
+"""
+        
         # Usar OpenAI para extraer datos estructurados
         prompt_extraccion = f"""Analiza la siguiente conversación completa entre un usuario y un asistente médico.
 Extrae los datos personales del paciente que fueron mencionados.
 
 CONVERSACIÓN:
 {texto_completo}
-
+{seccion_conocidos}
 Extrae los siguientes datos del paciente:
 - Nombre completo (separar en nombre, apellido_paterno, apellido_materno si están disponibles)
 - Edad (número)
@@ -442,103 +427,112 @@ Si NO encontraste los datos mínimos, responde SOLO:
 {{"datos_completos": false}}
 """
         
+        return [
+            {
+                'role': 'system',
+                'content': self.SYSTEM_PROMPT_EXTRACCION
+            },
+            {
+                'role': 'user',
+                'content': prompt_extraccion
+            }
+        ]
+    
+    @staticmethod
+    def _parsear_extraccion(respuesta_json):
+        """
+        Valida la respuesta JSON de la extracción de datos
+        
+        Returns:
+            dict or None: Datos del paciente (pueden estar incompletos) o None si la
+                respuesta no es válida o la IA no encontró datos
+        """
+        respuesta_json = respuesta_json.strip()
+        print(f"[DEBUG] Respuesta de extracción: {respuesta_json}")
+        
+        # Limpiar markdown si existe
+        if '```json' in respuesta_json:
+            respuesta_json = respuesta_json.split('```json')[1].split('```')[0].strip()
+        elif '```' in respuesta_json:
+            respuesta_json = respuesta_json.split('```')[1].split('```')[0].strip()
+        
         try:
-            response = self.client.chat.completions.create(
-                model=self.modelo,
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'Eres un asistente experto en extraer datos estructurados de conversaciones. Respondes SOLO en formato JSON válido, sin explicaciones adicionales.'
-                    },
-                    {
-                        'role': 'user',
-                        'content': prompt_extraccion
-                    }
-                ],
-                max_tokens=400,
-                temperature=0.1
-            )
-            
-            respuesta_json = response.choices[0].message.content.strip()
-            print(f"[DEBUG] Respuesta de extracción: {respuesta_json}")
-            
-            # Limpiar markdown si existe
-            if '```json' in respuesta_json:
-                respuesta_json = respuesta_json.split('```json')[1].split('```')[0].strip()
-            elif '```' in respuesta_json:
-                respuesta_json = respuesta_json.split('```')[1].split('```')[0].strip()
-            
             datos = json.loads(respuesta_json)
-            print(f"[DEBUG] Datos parseados: {datos}")
-            
-            # Validar que tenga los datos mínimos
-            if datos.get('datos_completos') == False:
-                print(f"[DEBUG] La IA indicó que no hay datos completos")
-                return None
-            
-            # Validar campos requeridos
-            campos_requeridos = ['nombre', 'edad', 'email', 'telefono']
-            if not all([datos.get(campo) for campo in campos_requeridos]):
-                print(f"[DEBUG] Faltan campos requeridos. Datos: {datos}")
-                return None
-            
-            # Asegurar que apellido_paterno esté presente (puede estar vacío)
-            if 'apellido_paterno' not in datos:
-                datos['apellido_paterno'] = ''
-            if 'apellido_materno' not in datos:
-                datos['apellido_materno'] = ''
-            
-            print(f"[DEBUG] Datos extraídos exitosamente: {datos}")
-            
-            # Guardar en conversación
-            conversacion['datos_paciente'] = datos
-            self.guardar_conversacion(conversacion)
-            
-            return datos
-            
         except json.JSONDecodeError as e:
             print(f"[ERROR] Error al parsear JSON: {e}")
             print(f"[ERROR] Respuesta recibida: {respuesta_json}")
             return None
-        except Exception as e:
-            print(f"[ERROR] Error al extraer datos: {e}")
-            import traceback
-            traceback.print_exc()
+        
+        print(f"[DEBUG] Datos parseados: {datos}")
+        
+        # Validar que tenga los datos mínimos
+        if datos.get('datos_completos') == False:
+            print(f"[DEBUG] La IA indicó que no hay datos completos")
             return None
+        
+        datos.pop('datos_completos', None)
+        
+        # La edad se usa para calcular la fecha de nacimiento
+        if isinstance(datos.get('edad'), str):
+            datos['edad'] = int(datos['edad']) if datos['edad'].strip().isdigit() else None
+        
+        # Asegurar que apellido_paterno esté presente (puede estar vacío)
+        if 'apellido_paterno' not in datos:
+            datos['apellido_paterno'] = ''
+        if 'apellido_materno' not in datos:
+            datos['apellido_materno'] = ''
+        
+        print(f"[DEBUG] Datos extraídos exitosamente: {datos}")
+        
+        return datos
     
-    def crear_cita_desde_conversacion(self, conversacion_id):
+    @staticmethod
+    def _combinar_extraccion(datos_conocidos, datos_ia):
         """
-        Crea una cita en la base de datos basándose en la conversación
-        
-        Args:
-            conversacion_id (str): UUID de la conversación
+        Completa los datos capturados localmente con los extraídos por la IA
+        (si no coinciden, prevalece la IA: lee la conversación completa)
         
         Returns:
-            dict: Resultado de la creación de la cita
+            dict or None: Datos completos o None si siguen faltando campos requeridos
         """
-        from ..models import Paciente, Medico, Cita
+        datos = ExtractorDatosPaciente.combinar(datos_conocidos, datos_ia, sobrescribir=True)
         
-        print(f"[DEBUG] Intentando crear cita para conversacion_id: {conversacion_id}")
-        
-        conversacion = self.obtener_conversacion(conversacion_id)
-        
-        if not conversacion:
-            print(f"[DEBUG] Conversación no encontrada")
-            return {
-                'exito': False,
-                'error': 'Conversación no encontrada o expirada'
-            }
+        faltantes = ExtractorDatosPaciente.campos_faltantes(datos)
+        if faltantes:
+            print(f"[DEBUG] Faltan campos requeridos: {faltantes}. Datos: {datos}")
+            return None
         
-        print(f"[DEBUG] Conversación encontrada: {conversacion.get('conversacion_id')}")
+        # Con la conversación ya revisada por la IA (o sin datos por confirmar), lo
+        # capturado se usa tal cual
+        datos.pop('inciertos', None)
+        datos.setdefault('apellido_paterno', '')
+        datos.setdefault('apellido_materno', '')
+        return datos
+    
+    @staticmethod
+    def _resumen_cita_creada(resultado):
+        """Datos de la cita creada que se guardan en la conversación"""
+        return {
+            'cita_id': resultado['cita_id'],
+            'paciente': resultado['paciente'],
+            'medico': resultado['medico'],
+            'fecha': resultado['fecha'],
+            'hora': resultado['hora']
+        }
+    
+    def _agendar_cita(self, conversacion, datos_paciente):
+        """
+        Busca médico y horario para la especialidad sugerida y crea la cita en la base de datos
         
-        # Extraer datos si no están disponibles
-        datos_paciente = conversacion.get('datos_paciente')
-        print(f"[DEBUG] Datos paciente en conversación: {datos_paciente}")
+        Args:
+            conversacion (dict): Metadatos de la conversación
+            datos_paciente (dict): Datos del paciente ya extraídos
         
-        if not datos_paciente:
-            print(f"[DEBUG] Intentando extraer datos del paciente...")
-            datos_paciente = self.extraer_datos_paciente(conversacion_id)
-            print(f"[DEBUG] Datos extraídos: {datos_paciente}")
+        Returns:
+            dict: Resultado de la creación de la cita
+        """
+        from .disponibilidad import BuscadorHorarios
+        from .reservas import ReservaHorario
         
         if not datos_paciente:
             print(f"[DEBUG] No se pudieron extraer datos del paciente")
@@ -565,120 +559,43 @@ Si NO encontraste los datos mínimos, responde SOLO:
             
             print(f"[DEBUG] Email del paciente: {email}")
             
-            # Buscar médico disponible de la especialidad
-            print(f"[DEBUG] Buscando médico de especialidad: {especialidad}")
+            # Médicos activos de la especialidad (sin importar acentos ni mayúsculas)
+            print(f"[DEBUG] Buscando médicos de especialidad: {especialidad}")
             
-            # Intentar búsqueda exacta primero
-            medico = Medico.objects.filter(
-                especialidad=especialidad,
-                activo=True,
-                acepta_nuevos_pacientes=True
-            ).first()
+            medicos = BuscadorHorarios.medicos_de_especialidad(especialidad)
             
-            # Si no encuentra, intentar búsqueda sin acentos (case insensitive)
-            if not medico:
-                print(f"[DEBUG] No se encontró con búsqueda exacta, intentando sin acentos...")
-                # Normalizar especialidad removiendo acentos
-                from unicodedata import normalize
-                especialidad_normalizada = ''.join(
-                    c for c in normalize('NFD', especialidad)
-                    if not c.isspace() and ord(c) < 0x300 or ord(c) > 0x36f
-                ).lower()
-                
-                print(f"[DEBUG] Especialidad normalizada: {especialidad_normalizada}")
-                
-                # Buscar médicos y filtrar manualmente
-                medicos_disponibles = Medico.objects.filter(
-                    activo=True,
-                    acepta_nuevos_pacientes=True
-                )
-                
-                for m in medicos_disponibles:
-                    esp_medico_normalizada = ''.join(
-                        c for c in normalize('NFD', m.especialidad)
-                        if not c.isspace() and ord(c) < 0x300 or ord(c) > 0x36f
-                    ).lower()
-                    
-                    if especialidad_normalizada == esp_medico_normalizada:
-                        medico = m
-                        print(f"[DEBUG] Médico encontrado con búsqueda normalizada: {m.especialidad}")
-                        break
-            
-            if not medico:
+            if not medicos:
                 print(f"[DEBUG] No se encontró médico de {especialidad}")
                 return {
                     'exito': False,
                     'error': f'No hay médicos disponibles de {especialidad} en este momento'
                 }
             
-            print(f"[DEBUG] Médico encontrado: {medico.nombre_completo()}")
-            
-            # Crear la cita para el siguiente día hábil
-            # Buscar un horario disponible
-            hoy = datetime.now().date()
-            fecha_cita = hoy + timedelta(days=1)
+            # Primer horario libre desde mañana entre todos los médicos de la
+            # especialidad (una consulta de citas para todos y todo el rango)
+            fecha_inicio = datetime.now().date() + timedelta(days=1)
+            max_dias = 14  # Buscar hasta 2 semanas
             
-            # Si es fin de semana, mover a lunes
-            while fecha_cita.weekday() >= 5:  # 5=Sábado, 6=Domingo
-                fecha_cita += timedelta(days=1)
+            libres = BuscadorHorarios.primeros_libres(especialidad, fecha_inicio, dias=max_dias, cantidad=5, medicos=medicos)
             
-            # Buscar una hora disponible para ese médico
-            horas_disponibles = ['09:00:00', '10:00:00', '11:00:00', '14:00:00', '15:00:00', '16:00:00', '17:00:00']
-            hora_asignada = None
-            
-            print(f"[DEBUG] Buscando horario disponible para {medico.nombre_completo()} el {fecha_cita}")
-            
-            for hora in horas_disponibles:
-                # Verificar si ya existe una cita en ese horario
-                cita_existente = Cita.objects.filter(
-                    medico=medico,
-                    fecha=fecha_cita,
-                    hora=hora
-                ).exists()
-                
-                if not cita_existente:
-                    hora_asignada = hora
-                    print(f"[DEBUG] Horario disponible encontrado: {hora}")
+            # Apartar el primero de esos horarios que no esté reservado por otra conversación
+            reserva = None
+            for medico, fecha_cita, hora_obj in libres:
+                reserva = ReservaHorario.tomar(medico.id, fecha_cita, hora_obj)
+                if reserva:
                     break
+                print(f"[DEBUG] Horario {fecha_cita} {hora_obj} reservado por otro paciente")
             
-            # Si no hay horarios disponibles ese día, intentar el siguiente día
-            intentos = 0
-            max_intentos = 10  # Buscar hasta 10 días
-            
-            while not hora_asignada and intentos < max_intentos:
-                fecha_cita += timedelta(days=1)
-                
-                # Saltar fines de semana
-                while fecha_cita.weekday() >= 5:
-                    fecha_cita += timedelta(days=1)
-                
-                print(f"[DEBUG] Intentando siguiente fecha: {fecha_cita}")
-                
-                for hora in horas_disponibles:
-                    cita_existente = Cita.objects.filter(
-                        medico=medico,
-                        fecha=fecha_cita,
-                        hora=hora
-                    ).exists()
-                    
-                    if not cita_existente:
-                        hora_asignada = hora
-                        print(f"[DEBUG] Horario disponible encontrado: {hora}")
-                        break
-                
-                intentos += 1
-            
-            if not hora_asignada:
-                print(f"[DEBUG] No se encontró horario disponible en los próximos {max_intentos} días")
+            if not reserva:
+                print(f"[DEBUG] No se encontró horario disponible en los próximos {max_dias} días")
                 return {
                     'exito': False,
-                    'error': f'No hay horarios disponibles para {medico.nombre_completo()} en los próximos días. Por favor, contacta directamente al consultorio.'
+                    'error': f'No hay horarios disponibles de {especialidad} en los próximos días. Por favor, contacta directamente al consultorio.'
                 }
             
-            print(f"[DEBUG] Fecha de cita calculada: {fecha_cita} a las {hora_asignada}")
+            print(f"[DEBUG] Médico encontrado: {medico.nombre_completo()}")
+            print(f"[DEBUG] Fecha de cita calculada: {fecha_cita} a las {hora_obj}")
             
-            # Convertir hora string a objeto time
-            hora_obj = datetime.strptime(hora_asignada, '%H:%M:%S').time()
             hora_12h = hora_obj.strftime('%I:%M %p')
             
             # Preparar datos para el servicio de creación de citas
@@ -697,7 +614,8 @@ Si NO encontraste los datos mínimos, responde SOLO:
                 'fecha': fecha_cita,
                 'hora': hora_obj,  # Pasar como objeto time, no string
                 'motivo': f'Consulta por síntomas. Especialidad: {especialidad}',
-                'sintomas_iniciales': conversacion.get('sintomas', '')
+                'sintomas_iniciales': conversacion.get('sintomas', ''),
+                'reserva': reserva
             }
             
             print(f"[DEBUG] Usando CitaService para crear cita y enviar email...")
@@ -721,16 +639,6 @@ Si NO encontraste los datos mínimos, responde SOLO:
                     'error': str(e)
                 }
             
-            # Actualizar conversación
-            conversacion['cita_creada'] = {
-                'cita_id': cita.id,
-                'paciente': cita.paciente.nombre_completo(),
-                'medico': cita.medico.nombre_completo(),
-                'fecha': str(fecha_cita),
-                'hora': hora_12h
-            }
-            self.guardar_conversacion(conversacion)
-            
             return {
                 'exito': True,
                 'cita_id': cita.id,
@@ -751,3 +659,323 @@ Si NO encontraste los datos mínimos, responde SOLO:
                 'exito': False,
                 'error': f'Error al crear la cita: {str(e)}'
             }
+
+
+class AsistenteVirtualService(AsistenteVirtualBase):
+    """
+    Servicio para manejar conversaciones con el asistente virtual de IA
+    Usa Redis para almacenar temporalmente las conversaciones (30 minutos):
+    los mensajes en una lista y los metadatos en un hash (ver ConversacionStore)
+    """
+    
+    def __init__(self):
+        """Usa el backend de LLM configurado (ver LLM_CONFIG)"""
+        super().__init__()
+        self.llm = obtener_backend_llm()
+        self.store = ConversacionStore(self.timeout)
+        self.cache_respuestas = CacheRespuestas()
+    
+    def iniciar_conversacion(self):
+        """
+        Inicia una nueva conversación y retorna el ID
+        
+        Returns:
+            dict: {
+                'conversacion_id': str (UUID),
+                'mensaje_inicial': str
+            }
+        """
+        conversacion_id, mensajes, metadatos = self._nueva_conversacion()
+        
+        # Guardar en Redis con timeout de 30 minutos
+        self.store.crear(conversacion_id, mensajes, metadatos)
+        
+        return {
+            'conversacion_id': conversacion_id,
+            'mensaje_inicial': self.MENSAJE_INICIAL
+        }
+    
+    def obtener_conversacion(self, conversacion_id):
+        """
+        Obtiene una conversación existente desde Redis
+        
+        Args:
+            conversacion_id (str): UUID de la conversación
+        
+        Returns:
+            dict or None: Datos de la conversación o None si no existe/expiró
+        """
+        return self.store.obtener(conversacion_id)
+    
+    def enviar_mensaje(self, conversacion_id, mensaje_usuario):
+        """
+        Envía un mensaje del usuario y obtiene respuesta del asistente
+        
+        Args:
+            conversacion_id (str): UUID de la conversación
+            mensaje_usuario (str): Mensaje del usuario
+        
+        Returns:
+            dict: {
+                'respuesta': str,
+                'intencion': str or None,
+                'requiere_datos': bool,
+                'especialidad_sugerida': str or None,
+                'es_urgente': bool
+            }
+        """
+        turno = self._preparar_turno(conversacion_id, mensaje_usuario)
+        
+        if not turno:
+            # Conversación expirada o no existe - crear nueva
+            return self._respuesta_conversacion_nueva(self.iniciar_conversacion())
+        
+        respuesta_cacheada = self._obtener_respuesta_cacheada(turno)
+        if respuesta_cacheada:
+            return self._completar_turno(conversacion_id, turno, respuesta_cacheada)
+        
+        # Llamar a OpenAI
+        try:
+            respuesta_asistente = self.llm.completar(
+                mensajes=turno['mensajes_para_api'],
+                max_tokens=settings.ASISTENTE_CONFIG.get('max_tokens', 800),
+                temperature=settings.ASISTENTE_CONFIG.get('temperature', 0.7)
+            )
+            
+            self._guardar_respuesta_cacheada(turno, respuesta_asistente)
+            
+            return self._completar_turno(conversacion_id, turno, respuesta_asistente)
+            
+        except Exception as e:
+            # Error en la API de OpenAI
+            return self._respuesta_error(e)
+    
+    def enviar_mensaje_stream(self, conversacion_id, mensaje_usuario):
+        """
+        Variante de enviar_mensaje que entrega la respuesta token a token
+        
+        La conversación se guarda y se analiza cuando termina el stream.
+        
+        Args:
+            conversacion_id (str): UUID de la conversación
+            mensaje_usuario (str): Mensaje del usuario
+        
+        Yields:
+            tuple: ('token', str) por cada fragmento recibido de OpenAI y al final
+                ('fin', dict) con el mismo resultado que enviar_mensaje, o
+                ('error', dict) si falló la llamada
+        """
+        turno = self._preparar_turno(conversacion_id, mensaje_usuario)
+        
+        if not turno:
+            yield 'fin', self._respuesta_conversacion_nueva(self.iniciar_conversacion())
+            return
+        
+        respuesta_cacheada = self._obtener_respuesta_cacheada(turno)
+        if respuesta_cacheada:
+            yield 'token', respuesta_cacheada
+            yield 'fin', self._completar_turno(conversacion_id, turno, respuesta_cacheada)
+            return
+        
+        fragmentos = []
+        try:
+            stream = self.llm.completar_stream(
+                mensajes=turno['mensajes_para_api'],
+                max_tokens=settings.ASISTENTE_CONFIG.get('max_tokens', 800),
+                temperature=settings.ASISTENTE_CONFIG.get('temperature', 0.7)
+            )
+            
+            for texto in stream:
+                fragmentos.append(texto)
+                yield 'token', texto
+            
+        except Exception as e:
+            yield 'error', self._respuesta_error(e)
+            return
+        
+        respuesta_asistente = ''.join(fragmentos)
+        self._guardar_respuesta_cacheada(turno, respuesta_asistente)
+        
+        yield 'fin', self._completar_turno(conversacion_id, turno, respuesta_asistente)
+    
+    def _preparar_turno(self, conversacion_id, mensaje_usuario):
+        """
+        Carga la ventana de historial desde Redis y construye el turno
+        
+        Returns:
+            dict or None: Turno (ver _construir_turno) o None si la conversación no existe/expiró
+        """
+        # Obtener conversación (solo la ventana de historial que se envía a la API)
+        conversacion = self.store.obtener(conversacion_id, ultimos=self.max_mensajes)
+        
+        if not conversacion:
+            return None
+        
+        return self._construir_turno(conversacion, mensaje_usuario)
+    
+    def _obtener_respuesta_cacheada(self, turno):
+        """Respuesta del cache para turnos cacheables (ver CacheRespuestas.clave_turno)"""
+        if not turno['clave_cache']:
+            return None
+        return self.cache_respuestas.obtener(turno['clave_cache'])
+    
+    def _guardar_respuesta_cacheada(self, turno, respuesta_asistente):
+        if turno['clave_cache'] and respuesta_asistente:
+            self.cache_respuestas.guardar(turno['clave_cache'], respuesta_asistente)
+    
+    def _completar_turno(self, conversacion_id, turno, respuesta_asistente):
+        """
+        Analiza la respuesta del asistente y persiste el turno en Redis
+        
+        Returns:
+            dict: Resultado del turno (ver enviar_mensaje)
+        """
+        resultado, mensajes_nuevos, cambios = self._procesar_respuesta(turno, respuesta_asistente)
+        
+        # Agregar los dos mensajes del turno y los metadatos modificados
+        self.store.agregar_mensajes(conversacion_id, mensajes_nuevos, **cambios)
+        
+        if turno['por_resumir'] or turno['fuera_de_ventana']:
+            self._actualizar_resumen(conversacion_id, turno)
+        
+        return resultado
+    
+    def _actualizar_resumen(self, conversacion_id, turno):
+        """
+        Pliega en el resumen los mensajes que quedaron fuera de la ventana de historial
+        Si falla, el resumen anterior se conserva y se reintenta en el siguiente turno
+        """
+        try:
+            por_resumir = turno['por_resumir']
+            if turno['fuera_de_ventana']:
+                inicio, fin = turno['fuera_de_ventana']
+                por_resumir = self.store.obtener_mensajes(conversacion_id, inicio, fin - 1) + por_resumir
+            
+            resumen = self.llm.completar(
+                mensajes=self._mensajes_resumen(turno['conversacion'].get('resumen'), por_resumir),
+                max_tokens=self.max_tokens_resumen,
+                temperature=0.3
+            )
+            
+            self.store.actualizar(
+                conversacion_id,
+                resumen=resumen.strip(),
+                resumen_hasta=turno['resumen_hasta']
+            )
+            
+        except Exception as e:
+            print(f"[ERROR] Error al actualizar resumen: {e}")
+    
+    def obtener_historial(self, conversacion_id):
+        """
+        Obtiene el historial de mensajes de una conversación
+        
+        Args:
+            conversacion_id (str): UUID de la conversación
+        
+        Returns:
+            list: Lista de mensajes (sin el system prompt)
+        """
+        return self._filtrar_historial(self.obtener_conversacion(conversacion_id))
+    
+    def finalizar_conversacion(self, conversacion_id):
+        """
+        Finaliza y elimina una conversación de Redis
+        
+        Args:
+            conversacion_id (str): UUID de la conversación
+        
+        Returns:
+            bool: True si se eliminó exitosamente
+        """
+        self.store.eliminar(conversacion_id)
+        return True
+    
+    def extraer_datos_paciente(self, conversacion_id):
+        """
+        Obtiene los datos del paciente de la conversación
+        
+        Normalmente ya fueron capturados turno a turno (ver ExtractorDatosPaciente);
+        solo si falta algún campo se recurre a la IA, que completa los faltantes
+        
+        Args:
+            conversacion_id (str): UUID de la conversación
+        
+        Returns:
+            dict: Datos extraídos del paciente o None si no hay suficiente información
+        """
+        conversacion = self.obtener_conversacion(conversacion_id)
+        
+        if not conversacion:
+            return None
+        
+        datos_conocidos = conversacion.get('datos_paciente')
+        if ExtractorDatosPaciente.completos(datos_conocidos):
+            return self._combinar_extraccion(datos_conocidos, {})
+        
+        # Usar OpenAI para extraer los datos que faltan
+        try:
+            respuesta = self.llm.completar(
+                mensajes=self._mensajes_extraccion(conversacion, datos_conocidos),
+                max_tokens=400,
+                temperature=0.1
+            )
+            
+            datos = self._combinar_extraccion(
+                datos_conocidos,
+                self._parsear_extraccion(respuesta) or {}
+            )
+            
+            if datos:
+                # Guardar en conversación
+                self.store.actualizar(conversacion_id, datos_paciente=datos)
+            
+            return datos
+            
+        except Exception as e:
+            print(f"[ERROR] Error al extraer datos: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    def crear_cita_desde_conversacion(self, conversacion_id):
+        """
+        Crea una cita en la base de datos basándose en la conversación
+        
+        Args:
+            conversacion_id (str): UUID de la conversación
+        
+        Returns:
+            dict: Resultado de la creación de la cita
+        """
+        print(f"[DEBUG] Intentando crear cita para conversacion_id: {conversacion_id}")
+        
+        conversacion = self.obtener_conversacion(conversacion_id)
+        
+        if not conversacion:
+            print(f"[DEBUG] Conversación no encontrada")
+            return {
+                'exito': False,
+                'error': 'Conversación no encontrada o expirada'
+            }
+        
+        print(f"[DEBUG] Conversación encontrada: {conversacion.get('conversacion_id')}")
+        
+        # Completar con IA solo si faltan datos por capturar
+        datos_paciente = conversacion.get('datos_paciente')
+        print(f"[DEBUG] Datos paciente en conversación: {datos_paciente}")
+        
+        if ExtractorDatosPaciente.completos(datos_paciente):
+            datos_paciente = self._combinar_extraccion(datos_paciente, {})
+        else:
+            print(f"[DEBUG] Intentando extraer datos del paciente...")
+            datos_paciente = self.extraer_datos_paciente(conversacion_id)
+            print(f"[DEBUG] Datos extraídos: {datos_paciente}")
+        
+        resultado = self._agendar_cita(conversacion, datos_paciente)
+        
+        if resultado['exito']:
+            # Actualizar conversación
+            self.store.actualizar(conversacion_id, cita_creada=self._resumen_cita_creada(resultado))
+        
+        return resultado
@@ -0,0 +1,180 @@
+"""
+Cache en Redis de los horarios libres de cada médico por día
+Las consultas de disponibilidad (/api/medicos/{id}/horarios/) leen todos los días
+del rango en un solo viaje a Redis; solo los días que faltan se calculan desde la
+base de datos (DisponibilidadMedico) y se guardan
+"""
+from django.core.cache import cache
+from django.utils import timezone
+from django_redis import get_redis_connection
+from datetime import date as dt_date, timedelta
+import logging
+
+from .disponibilidad import DisponibilidadMedico, PlantillaHorario, a_hora, a_minutos, horarios_cruzados
+
+logger = logging.getLogger(__name__)
+
+
+# Solo se cachean los días desde hoy hasta este horizonte
+DIAS_CACHEADOS = 60
+
+# Los cambios de citas y horarios actualizan o invalidan el cache (ver medical/signals.py);
+# el timeout acota lo que pudiera quedar desactualizado por cambios hechos fuera del ORM
+TIMEOUT_DISPONIBILIDAD = 60 * 15
+
+
+class CacheDisponibilidad:
+    """
+    Estructura en Redis:
+        disponibilidad:{medico_id}:{fecha} -> SET con los minutos de inicio de los
+            horarios libres del día, más el marcador -1 que distingue un día sin
+            horarios libres de un día que no está en cache
+    """
+
+    MARCADOR = -1
+
+    @staticmethod
+    def _redis():
+        return get_redis_connection('default')
+
+    @staticmethod
+    def _clave(medico_id, fecha):
+        return cache.make_key(f"disponibilidad:{medico_id}:{fecha.isoformat()}")
+
+    @staticmethod
+    def _cacheable(fecha):
+        hoy = dt_date.today()
+        return hoy <= fecha <= hoy + timedelta(days=DIAS_CACHEADOS)
+
+    @classmethod
+    def _pipeline_reemplazar(cls, pipe, medico_id, fecha, minutos):
+        clave = cls._clave(medico_id, fecha)
+        pipe.delete(clave)
+        pipe.sadd(clave, cls.MARCADOR, *minutos)
+        pipe.expire(clave, TIMEOUT_DISPONIBILIDAD)
+
+    @classmethod
+    def minutos_libres(cls, medico_id, fecha_inicio, dias):
+        """
+        Horarios libres de cada día del rango (incluye los de hoy que ya empezaron)
+
+        Args:
+            medico_id (int): ID del médico
+            fecha_inicio (date): Primer día del rango
+            dias (int): Cantidad de días
+
+        Returns:
+            dict: fecha -> lista ordenada de minutos de inicio de los horarios libres
+        """
+        fechas = [fecha_inicio + timedelta(days=i) for i in range(dias)]
+        cacheables = [fecha for fecha in fechas if cls._cacheable(fecha)]
+
+        # Un solo viaje a Redis para todos los días del rango
+        pipe = cls._redis().pipeline(transaction=False)
+        for fecha in cacheables:
+            pipe.smembers(cls._clave(medico_id, fecha))
+        en_cache = dict(zip(cacheables, pipe.execute()))
+
+        libres = {}
+        faltantes = []
+        for fecha in fechas:
+            miembros = en_cache.get(fecha)
+            if miembros:
+                libres[fecha] = sorted(m for m in map(int, miembros) if m != cls.MARCADOR)
+            elif fecha < dt_date.today():
+                libres[fecha] = []
+            else:
+                faltantes.append(fecha)
+
+        if faltantes:
+            # Calcular los días que faltan con una sola consulta de citas y guardarlos
+            disponibilidad = DisponibilidadMedico(
+                medico_id, faltantes[0], dias=(faltantes[-1] - faltantes[0]).days + 1
+            )
+            pipe = cls._redis().pipeline(transaction=False)
+            for fecha in faltantes:
+                libres[fecha] = disponibilidad.minutos_libres(fecha, incluir_iniciados=True)
+                if cls._cacheable(fecha):
+                    cls._pipeline_reemplazar(pipe, medico_id, fecha, libres[fecha])
+            pipe.execute()
+            logger.debug(f"Disponibilidad del médico {medico_id} calculada para {len(faltantes)} día(s)")
+
+        return libres
+
+    @classmethod
+    def siguientes_libres(cls, medico_id, fecha_inicio, dias, cantidad):
+        """
+        Próximos horarios libres del médico a partir de fecha_inicio
+
+        Returns:
+            list: Lista de tuplas (fecha, hora)
+        """
+        libres = cls.minutos_libres(medico_id, fecha_inicio, dias)
+        hoy = dt_date.today()
+        ahora = a_minutos(timezone.localtime().time())
+        resultado = []
+
+        for fecha in sorted(libres):
+            for minutos in libres[fecha]:
+                if fecha == hoy and minutos <= ahora:
+                    continue
+                resultado.append((fecha, a_hora(minutos)))
+                if len(resultado) >= cantidad:
+                    return resultado
+
+        return resultado
+
+    @classmethod
+    def ocupar(cls, medico_id, fecha, hora, duracion_cita):
+        """Quita del día en cache los horarios que se cruzan con una cita nueva"""
+        cls.ocupar_varias([(medico_id, fecha, hora, duracion_cita)])
+
+    @classmethod
+    def ocupar_varias(cls, citas):
+        """
+        Quita de los días en cache los horarios que se cruzan con varias citas nuevas,
+        en un solo viaje a Redis (las citas creadas con bulk_create no emiten señales)
+
+        Args:
+            citas (list): Tuplas (medico_id, fecha, hora, duracion_minutos)
+        """
+        citas = [cita for cita in citas if cls._cacheable(cita[1])]
+        if not citas:
+            return
+
+        plantillas = PlantillaHorario.obtener_varias({medico_id for medico_id, _, _, _ in citas})
+        pipe = cls._redis().pipeline(transaction=False)
+
+        for medico_id, fecha, hora, duracion_cita in citas:
+            plantilla = plantillas[medico_id]
+            horarios = plantilla['dias'][fecha.weekday()]
+            cruzados = [
+                horarios[indice]
+                for indice in horarios_cruzados(horarios, plantilla['duracion'], hora, duracion_cita)
+            ]
+            if cruzados:
+                # SREM es atómico y no crea la clave si el día no estaba en cache
+                pipe.srem(cls._clave(medico_id, fecha), *cruzados)
+
+        pipe.execute()
+
+    @classmethod
+    def recalcular(cls, medico_id, fecha):
+        """Reemplaza el día en cache por su disponibilidad actual en la base de datos"""
+        if not cls._cacheable(fecha):
+            return
+
+        minutos = DisponibilidadMedico(medico_id, fecha, dias=1).minutos_libres(fecha, incluir_iniciados=True)
+
+        pipe = cls._redis().pipeline(transaction=True)  # MULTI/EXEC: nadie ve el día a medias
+        cls._pipeline_reemplazar(pipe, medico_id, fecha, minutos)
+        pipe.execute()
+
+    @classmethod
+    def invalidar_medico(cls, medico_id):
+        """Descarta todos los días en cache del médico (cambió su plantilla)"""
+        hoy = dt_date.today()
+        cls._redis().delete(*[
+            cls._clave(medico_id, hoy + timedelta(days=i))
+            for i in range(DIAS_CACHEADOS + 1)
+        ])
@@ -0,0 +1,177 @@
+"""
+Cache de respuestas del asistente para los primeros turnos de una conversación
+Los primeros mensajes se repiten mucho ("quiero agendar una cita", "tengo dolor de
+cabeza") y, con el mismo estado de conversación, el prompt enviado a OpenAI es
+idéntico, así que la respuesta se puede reutilizar
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+import hashlib
+import json
+import re
+import time
+
+from .analizador import normalizar
+from .conversacion_store import obtener_redis_async
+
+
+class CacheRespuestasBase:
+    """
+    Estructura en Redis:
+        respuesta_asistente:{huella}    -> STRING con la respuesta (con TTL)
+        respuesta_asistente:lru         -> ZSET huella -> último uso, para desalojar
+                                           las menos usadas al superar el máximo
+        respuesta_asistente:estadisticas -> HASH con 'aciertos' y 'fallos'
+    """
+
+    def __init__(self):
+        config = settings.ASISTENTE_CONFIG
+        self.ttl = config.get('cache_respuestas_ttl', 86400)
+        self.max_entradas = config.get('cache_respuestas_max', 1000)
+        self.max_turnos = config.get('cache_respuestas_turnos', 1)
+        self.clave_lru = cache.make_key('respuesta_asistente:lru')
+        self.clave_estadisticas = cache.make_key('respuesta_asistente:estadisticas')
+
+    @staticmethod
+    def normalizar_texto(texto):
+        """Minúsculas, sin acentos, sin signos de puntuación y con espacios simples"""
+        texto = re.sub(r'[^\w\s]', ' ', normalizar(texto))
+        return ' '.join(texto.split())
+
+    def clave_turno(self, conversacion, mensaje_usuario, modelo):
+        """
+        Calcula la clave de cache de un turno o None si el turno no es cacheable
+
+        Solo se cachean los primeros turnos, sin resumen ni datos del paciente, y
+        mensajes cortos sin números ni correos (para no guardar datos personales)
+
+        Args:
+            conversacion (dict): Conversación cargada antes de agregar el mensaje
+            mensaje_usuario (str): Mensaje del usuario
+            modelo (str): Modelo de OpenAI usado
+
+        Returns:
+            str or None: Clave en Redis
+        """
+        total = conversacion.get('indice_inicio', 0) + len(conversacion['mensajes'])
+        turno = (total - 1) // 2  # Mensaje inicial + pares usuario/asistente
+
+        if turno >= self.max_turnos:
+            return None
+        if conversacion.get('resumen') or conversacion.get('datos_paciente'):
+            return None
+        if len(mensaje_usuario) > 200 or re.search(r'[\d@]', mensaje_usuario):
+            return None
+
+        huella = json.dumps([
+            self.normalizar_texto(mensaje_usuario),
+            turno,
+            conversacion.get('intencion'),
+            conversacion.get('especialidad_sugerida'),
+            conversacion.get('prompt_version'),
+            modelo,
+        ])
+
+        return cache.make_key(f"respuesta_asistente:{hashlib.sha1(huella.encode()).hexdigest()}")
+
+    def _pipeline_obtener(self, pipe, clave):
+        pipe.get(clave)
+        # Actualizar el último uso solo si la entrada sigue registrada
+        pipe.zadd(self.clave_lru, {clave: time.time()}, xx=True)
+
+    def _pipeline_guardar(self, pipe, clave, respuesta):
+        ahora = time.time()
+        pipe.set(clave, respuesta, ex=self.ttl)
+        pipe.zadd(self.clave_lru, {clave: ahora})
+        # Olvidar las entradas que ya expiraron por TTL
+        pipe.zremrangebyscore(self.clave_lru, '-inf', ahora - self.ttl)
+        pipe.zcard(self.clave_lru)
+
+    @staticmethod
+    def _decodificar(valor):
+        return valor.decode() if isinstance(valor, bytes) else valor
+
+    def _armar_estadisticas(self, campos, entradas):
+        campos = {self._decodificar(k): int(v) for k, v in campos.items()}
+        aciertos = campos.get('aciertos', 0)
+        fallos = campos.get('fallos', 0)
+        total = aciertos + fallos
+
+        return {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'tasa_aciertos': round(aciertos / total, 3) if total else 0.0,
+            'entradas': entradas
+        }
+
+
+class CacheRespuestas(CacheRespuestasBase):
+    """Cache síncrono (usa la conexión de django-redis)"""
+
+    def __init__(self):
+        super().__init__()
+        self.redis = get_redis_connection('default')
+
+    def obtener(self, clave):
+        """
+        Returns:
+            str or None: Respuesta cacheada o None si no existe
+        """
+        pipe = self.redis.pipeline()
+        self._pipeline_obtener(pipe, clave)
+        respuesta, _ = pipe.execute()
+
+        self.redis.hincrby(self.clave_estadisticas, 'aciertos' if respuesta else 'fallos', 1)
+
+        return self._decodificar(respuesta) if respuesta else None
+
+    def guardar(self, clave, respuesta):
+        """Guarda una respuesta y desaloja las menos usadas si se supera el máximo"""
+        pipe = self.redis.pipeline()
+        self._pipeline_guardar(pipe, clave, respuesta)
+        entradas = pipe.execute()[-1]
+
+        if entradas > self.max_entradas:
+            desalojadas = self.redis.zpopmin(self.clave_lru, entradas - self.max_entradas)
+            self.redis.delete(*[clave for clave, _ in desalojadas])
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: {'aciertos', 'fallos', 'tasa_aciertos', 'entradas'}
+        """
+        pipe = self.redis.pipeline()
+        pipe.hgetall(self.clave_estadisticas)
+        pipe.zcard(self.clave_lru)
+        campos, entradas = pipe.execute()
+
+        return self._armar_estadisticas(campos, entradas)
+
+
+class CacheRespuestasAsync(CacheRespuestasBase):
+    """Cache asíncrono (usa redis.asyncio) con la misma estructura que CacheRespuestas"""
+
+    @property
+    def redis(self):
+        return obtener_redis_async()
+
+    async def obtener(self, clave):
+        """Respuesta cacheada o None si no existe"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._pipeline_obtener(pipe, clave)
+            respuesta, _ = await pipe.execute()
+
+        await self.redis.hincrby(self.clave_estadisticas, 'aciertos' if respuesta else 'fallos', 1)
+
+        return self._decodificar(respuesta) if respuesta else None
+
+    async def guardar(self, clave, respuesta):
+        """Guarda una respuesta y desaloja las menos usadas si se supera el máximo"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._pipeline_guardar(pipe, clave, respuesta)
+            entradas = (await pipe.execute())[-1]
+
+        if entradas > self.max_entradas:
+            desalojadas = await self.redis.zpopmin(self.clave_lru, entradas - self.max_entradas)
+            await self.redis.delete(*[clave for clave, _ in desalojadas])
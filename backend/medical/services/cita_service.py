@@ -1,15 +1,24 @@
 """
 Servicio para gestión de citas médicas
 """
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from datetime import datetime, date as dt_date
 from ..models import Cita, Paciente, Medico
+from .cache_disponibilidad import CacheDisponibilidad
+from .disponibilidad import DisponibilidadMedico, PlantillaHorario, a_minutos
+from .notificaciones import NotificacionesCita
+from .outbox import RelayOutbox
+from .reservas import ReservaHorario
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class HorarioNoDisponible(ValueError):
+    """El horario ya está ocupado o apartado por otro paciente (conflicto, no dato inválido)"""
+
+
 class CitaService:
     """
     Servicio para crear y gestionar citas médicas
@@ -72,28 +81,39 @@ class CitaService:
         Returns:
             tuple: (disponible:bool, mensaje:str)
         """
+        try:
+            CitaService._validar_horario(medico_id, fecha, hora)
+        except ValueError as e:
+            return False, str(e)
+        
+        return True, "Horario disponible"
+    
+    @staticmethod
+    def _validar_horario(medico_id, fecha, hora):
+        """
+        Igual que validar_disponibilidad, pero lanza la excepción según el motivo
+        
+        Raises:
+            HorarioNoDisponible: Si otra cita se cruza con ese horario
+            ValueError: Si la fecha, el médico o la hora no son válidos
+        """
         # Validar que la fecha sea futura
         if fecha < dt_date.today():
-            return False, "La fecha de la cita debe ser futura"
+            raise ValueError("La fecha de la cita debe ser futura")
         
         # Validar que el médico existe y está disponible
-        try:
-            medico = Medico.objects.get(id=medico_id, activo=True)
-        except Medico.DoesNotExist:
-            return False, "El médico no existe o no está disponible"
-        
-        # Validar que no haya otra cita en ese horario
-        cita_existente = Cita.objects.filter(
-            medico_id=medico_id,
-            fecha=fecha,
-            hora=hora,
-            estado='AGENDADA'
-        ).exists()
+        if not Medico.objects.filter(id=medico_id, activo=True).exists():
+            raise ValueError("El médico no existe o no está disponible")
         
-        if cita_existente:
-            return False, "Este horario ya está ocupado"
+        disponibilidad = DisponibilidadMedico(medico_id, fecha, dias=1)
         
-        return True, "Horario disponible"
+        # Validar que el médico atienda a esa hora (según su HorarioMedico)
+        if not disponibilidad.atiende(fecha, hora):
+            raise ValueError("El médico no atiende en ese horario")
+        
+        # Validar que no haya otra cita que se cruce con ese horario
+        if not disponibilidad.esta_libre(fecha, hora):
+            raise HorarioNoDisponible("Este horario ya está ocupado")
     
     @staticmethod
     def obtener_horarios_alternativos(medico_id, fecha, hora_preferida=None, cantidad=5):
@@ -109,52 +129,151 @@ class CitaService:
         Returns:
             list: Lista de diccionarios con fecha y hora disponibles
         """
-        from datetime import timedelta, time
+        # Validar que el médico existe y está disponible
+        if not Medico.objects.filter(id=medico_id, activo=True).exists():
+            return []
+        
+        # Buscar en los próximos 7 días: un viaje a Redis y, para los días que no
+        # estén en cache, una sola consulta de citas
+        libres = CacheDisponibilidad.siguientes_libres(medico_id, fecha, dias=7, cantidad=cantidad)
+        
+        return [
+            {
+                'fecha': fecha_libre,
+                'hora': hora,
+                'fecha_str': fecha_libre.strftime('%d/%m/%Y'),
+                'hora_str': hora.strftime('%H:%M')
+            }
+            for fecha_libre, hora in libres
+        ]
+    
+    @staticmethod
+    def disponibilidad_calendario(medico_id, desde, hasta):
+        """
+        Disponibilidad compacta de un rango de días, para vistas de calendario
         
-        medico = Medico.objects.get(id=medico_id)
-        alternativas = []
+        Los días que están en el cache de Redis no consultan la base de datos; los
+        demás se calculan con una sola consulta de citas para todo el rango
         
-        # Horarios de trabajo estándar (9 AM - 5 PM cada 30 min)
-        horarios_base = [
-            time(9, 0), time(9, 30), time(10, 0), time(10, 30),
-            time(11, 0), time(11, 30), time(12, 0), time(12, 30),
-            time(13, 0), time(13, 30), time(14, 0), time(14, 30),
-            time(15, 0), time(15, 30), time(16, 0), time(16, 30)
-        ]
+        Args:
+            medico_id (int): ID del médico
+            desde (date): Primer día del rango
+            hasta (date): Último día del rango
         
-        # Buscar en los próximos 7 días
-        fecha_busqueda = fecha
-        dias_buscados = 0
-        
-        while len(alternativas) < cantidad and dias_buscados < 7:
-            if fecha_busqueda >= dt_date.today():
-                for hora in horarios_base:
-                    # Verificar disponibilidad
-                    disponible, _ = CitaService.validar_disponibilidad(
-                        medico_id, fecha_busqueda, hora
-                    )
-                    
-                    if disponible:
-                        alternativas.append({
-                            'fecha': fecha_busqueda,
-                            'hora': hora,
-                            'fecha_str': fecha_busqueda.strftime('%d/%m/%Y'),
-                            'hora_str': hora.strftime('%H:%M')
-                        })
-                        
-                        if len(alternativas) >= cantidad:
-                            break
-            
-            fecha_busqueda += timedelta(days=1)
-            dias_buscados += 1
+        Returns:
+            dict:
+                - duracion: minutos de cada horario
+                - plantilla: 7 listas (Lunes a Domingo) con las horas 'HH:MM' de
+                  inicio de los horarios de ese día de la semana
+                - dias: fecha 'YYYY-MM-DD' -> cadena con un carácter por horario de
+                  la plantilla de ese día ('1' libre, '0' ocupado o ya pasado;
+                  cadena vacía si el médico no atiende)
+        """
+        plantilla = PlantillaHorario.obtener(medico_id)
+        libres = CacheDisponibilidad.minutos_libres(medico_id, desde, (hasta - desde).days + 1)
+        hoy = dt_date.today()
+        ahora = a_minutos(timezone.localtime().time())
+        
+        dias = {}
+        for fecha in sorted(libres):
+            libres_dia = set(libres[fecha])
+            if fecha == hoy:
+                libres_dia = {minutos for minutos in libres_dia if minutos > ahora}
+            dias[fecha.isoformat()] = ''.join(
+                '1' if inicio in libres_dia else '0'
+                for inicio in plantilla['dias'][fecha.weekday()]
+            )
         
-        return alternativas
+        return {
+            'duracion': plantilla['duracion'],
+            'plantilla': [
+                [f"{inicio // 60:02d}:{inicio % 60:02d}" for inicio in horarios]
+                for horarios in plantilla['dias']
+            ],
+            'dias': dias
+        }
+    
+    @staticmethod
+    def _insertar_cita(datos_paciente, datos_cita):
+        """
+        Valida el horario e inserta la cita (sin enviar notificaciones)
+        
+        Returns:
+            tuple: (Cita, Paciente, paciente_creado:bool, Medico)
+        
+        Raises:
+            HorarioNoDisponible: Si otra cita ocupa el horario
+            ValueError: Si el horario no es válido
+        """
+        # Validar disponibilidad
+        CitaService._validar_horario(
+            datos_cita['medico_id'],
+            datos_cita['fecha'],
+            datos_cita['hora']
+        )
+        
+        # Obtener o crear paciente
+        paciente, paciente_creado = CitaService.get_or_create_paciente(datos_paciente)
+        
+        # Obtener médico
+        medico = Medico.objects.get(id=datos_cita['medico_id'])
+        
+        # Asignar consultorio (simple: usar ID del médico como número)
+        consultorio = f"Consultorio {medico.id}"
+        
+        # Crear cita; si otra transacción ya agendó una cita que se cruza con este horario,
+        # la restricción de exclusión cita_sin_traslape (rango de horario por médico) lo
+        # detecta y se informa como horario ocupado (no como error 500)
+        try:
+            with transaction.atomic():
+                cita = Cita.objects.create(
+                    paciente=paciente,
+                    medico=medico,
+                    fecha=datos_cita['fecha'],
+                    hora=datos_cita['hora'],
+                    duracion_minutos=medico.duracion_consulta_minutos,
+                    motivo=datos_cita['motivo'],
+                    sintomas_iniciales=datos_cita.get('sintomas_iniciales', ''),
+                    consultorio=consultorio,
+                    estado='AGENDADA'
+                )
+        except IntegrityError:
+            raise HorarioNoDisponible("Este horario ya está ocupado")
+        
+        return cita, paciente, paciente_creado, medico
+    
+    @staticmethod
+    def reservar_horario(medico_id, fecha, hora, reserva=None):
+        """
+        Aparta un horario disponible durante unos minutos (ver ReservaHorario)
+        
+        Args:
+            medico_id (int): ID del médico
+            fecha (date): Fecha de la cita
+            hora (time): Hora de la cita
+            reserva (str, optional): Token de una reserva previa para renovarla
+        
+        Returns:
+            str: Token de la reserva
+        
+        Raises:
+            HorarioNoDisponible: Si el horario está ocupado o apartado por otro paciente
+            ValueError: Si el horario no es válido
+        """
+        CitaService._validar_horario(medico_id, fecha, hora)
+        
+        token = ReservaHorario.tomar(medico_id, fecha, hora, reserva)
+        
+        if not token:
+            raise HorarioNoDisponible("Este horario está siendo reservado por otro paciente. Por favor, elige otro horario")
+        
+        return token
     
     @staticmethod
     @transaction.atomic
     def crear_cita(datos_paciente, datos_cita):
         """
-        Crea una nueva cita médica y envía confirmación por email
+        Crea una nueva cita médica y encola el email de confirmación
         
         Args:
             datos_paciente (dict): Datos del paciente
@@ -164,44 +283,32 @@ class CitaService:
                 - hora: time
                 - motivo: str
                 - sintomas_iniciales: str (opcional)
+                - reserva: str (opcional) token de CitaService.reservar_horario
         
         Returns:
             tuple: (Cita, created:bool, mensaje:str)
         
         Raises:
-            ValueError: Si los datos son inválidos o el horario no está disponible
+            HorarioNoDisponible: Si el horario está ocupado o apartado por otro paciente
+            ValueError: Si los datos son inválidos
         """
-        # Validar disponibilidad
-        disponible, mensaje = CitaService.validar_disponibilidad(
-            datos_cita['medico_id'],
-            datos_cita['fecha'],
-            datos_cita['hora']
-        )
+        medico_id, fecha, hora = datos_cita['medico_id'], datos_cita['fecha'], datos_cita['hora']
         
-        if not disponible:
-            raise ValueError(mensaje)
+        # Consumir la reserva del horario (o tomarla ahora si no se reservó antes):
+        # si otro paciente la tiene, se responde de inmediato sin tocar la base de datos
+        reserva = ReservaHorario.tomar(medico_id, fecha, hora, datos_cita.get('reserva'))
         
-        # Obtener o crear paciente
-        paciente, paciente_creado = CitaService.get_or_create_paciente(datos_paciente)
-        
-        # Obtener médico
-        medico = Medico.objects.get(id=datos_cita['medico_id'])
+        if not reserva:
+            raise HorarioNoDisponible("Este horario está siendo reservado por otro paciente. Por favor, elige otro horario")
         
-        # Asignar consultorio (simple: usar ID del médico como número)
-        consultorio = f"Consultorio {medico.id}"
+        try:
+            cita, paciente, paciente_creado, medico = CitaService._insertar_cita(datos_paciente, datos_cita)
+        except Exception:
+            ReservaHorario.liberar(medico_id, fecha, hora, reserva)
+            raise
         
-        # Crear cita
-        cita = Cita.objects.create(
-            paciente=paciente,
-            medico=medico,
-            fecha=datos_cita['fecha'],
-            hora=datos_cita['hora'],
-            duracion_minutos=medico.duracion_consulta_minutos,
-            motivo=datos_cita['motivo'],
-            sintomas_iniciales=datos_cita.get('sintomas_iniciales', ''),
-            consultorio=consultorio,
-            estado='AGENDADA'
-        )
+        # La cita ya ocupa el horario: la reserva se descarta al confirmar la transacción
+        transaction.on_commit(lambda: ReservaHorario.liberar(medico_id, fecha, hora, reserva))
         
         print(f"✅ Cita #{cita.id} creada exitosamente")
         print(f"   Paciente: {paciente.email}")
@@ -209,29 +316,11 @@ class CitaService:
         print(f"   Fecha: {datos_cita['fecha']}")
         logger.info(f"Cita #{cita.id} creada exitosamente para {paciente.email}")
         
-        # Enviar email de confirmación con PDF
-        print(f"\n📧 Intentando enviar email de confirmación...")
-        logger.info(f"Intentando enviar email de confirmación a {paciente.email}...")
-        try:
-            from .email_service import EmailService
-            email_service = EmailService()
-            resultado_email = email_service.enviar_confirmacion_cita(cita)
-            
-            if resultado_email['exito']:
-                print(f"✅ EMAIL ENVIADO EXITOSAMENTE!")
-                print(f"   Email ID: {resultado_email.get('email_id')}")
-                logger.info(f"Email de confirmación enviado para cita {cita.id}")
-                mensaje_final = "Cita creada exitosamente. Email de confirmación enviado."
-            else:
-                print(f"⚠️  ERROR al enviar email: {resultado_email['mensaje']}")
-                logger.warning(f"Error al enviar email para cita {cita.id}: {resultado_email['mensaje']}")
-                mensaje_final = "Cita creada exitosamente, pero hubo un problema al enviar el email."
-        except Exception as e:
-            print(f"❌ EXCEPCIÓN al enviar email: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            logger.error(f"Error inesperado al enviar email para cita {cita.id}: {str(e)}")
-            mensaje_final = "Cita creada exitosamente"
+        # El email de confirmación (con PDF) lo envía el worker de notificaciones: el
+        # evento se guarda en el outbox dentro de esta transacción y la respuesta no
+        # espera al render ni a la API de email
+        RelayOutbox.registrar(NotificacionesCita.CONFIRMACION_CITA, [cita.id])
+        mensaje_final = "Cita creada exitosamente. Recibirás el email de confirmación en unos minutos."
         
         print("="*80)
         print(f"✅ PROCESO COMPLETADO: {mensaje_final}")
@@ -242,6 +331,175 @@ class CitaService:
         
         return cita, True, mensaje_final
     
+    @staticmethod
+    def crear_citas_masivas(items):
+        """
+        Crea varias citas a la vez (migración desde otro sistema, campañas)
+        
+        Valida todos los horarios con una sola consulta de citas, crea o actualiza
+        los pacientes por email en bloque e inserta las citas con bulk_create en
+        una transacción. Las confirmaciones por email se encolan en lugar de
+        enviarse aquí
+        
+        Args:
+            items (list): Tuplas (datos_paciente, datos_cita) con el formato de crear_cita
+        
+        Returns:
+            list: Un diccionario por item, en el mismo orden:
+                {'exito': True, 'cita': Cita} o {'exito': False, 'error': str}
+        """
+        resultados = [None] * len(items)
+        hoy = dt_date.today()
+        
+        # Médicos activos del lote (una consulta)
+        medicos = Medico.objects.in_bulk(
+            {datos_cita['medico_id'] for _, datos_cita in items}
+        )
+        medicos = {medico_id: medico for medico_id, medico in medicos.items() if medico.activo}
+        
+        candidatos = []
+        for indice, (datos_paciente, datos_cita) in enumerate(items):
+            if datos_cita['fecha'] < hoy:
+                resultados[indice] = {'exito': False, 'error': "La fecha de la cita debe ser futura"}
+            elif datos_cita['medico_id'] not in medicos:
+                resultados[indice] = {'exito': False, 'error': "El médico no existe o no está disponible"}
+            else:
+                candidatos.append(indice)
+        
+        # Disponibilidad de todos los médicos en el rango del lote (una consulta de
+        # citas); los horarios aceptados se marcan ocupados para detectar choques
+        # entre items del mismo lote
+        disponibilidades = {}
+        if candidatos:
+            fechas = [items[indice][1]['fecha'] for indice in candidatos]
+            disponibilidades = DisponibilidadMedico.de_varios(
+                {items[indice][1]['medico_id'] for indice in candidatos},
+                min(fechas),
+                (max(fechas) - min(fechas)).days + 1
+            )
+        
+        aceptados = []
+        for indice in candidatos:
+            datos_cita = items[indice][1]
+            medico = medicos[datos_cita['medico_id']]
+            disponibilidad = disponibilidades[medico.id]
+            
+            if not disponibilidad.atiende(datos_cita['fecha'], datos_cita['hora']):
+                resultados[indice] = {'exito': False, 'error': "El médico no atiende en ese horario"}
+            elif not disponibilidad.esta_libre(datos_cita['fecha'], datos_cita['hora']):
+                resultados[indice] = {'exito': False, 'error': "Este horario ya está ocupado"}
+            else:
+                disponibilidad.ocupar(datos_cita['fecha'], datos_cita['hora'], medico.duracion_consulta_minutos)
+                aceptados.append(indice)
+        
+        # Apartar los horarios aceptados (un viaje a Redis) para no chocar con
+        # reservas o citas que se estén creando en paralelo
+        horarios = [
+            (items[indice][1]['medico_id'], items[indice][1]['fecha'], items[indice][1]['hora'])
+            for indice in aceptados
+        ]
+        reserva, apartados = ReservaHorario.tomar_varios(horarios)
+        
+        for indice, apartado in zip(list(aceptados), apartados):
+            if not apartado:
+                resultados[indice] = {
+                    'exito': False,
+                    'error': "Este horario está siendo reservado por otro paciente. Por favor, elige otro horario"
+                }
+                aceptados.remove(indice)
+        
+        if not aceptados:
+            ReservaHorario.liberar_varios(horarios, reserva)
+            return resultados
+        
+        # Pacientes por email: una consulta para los existentes, bulk_update de su
+        # teléfono y bulk_create de los nuevos (el primer item de cada email manda)
+        por_email = {}
+        for indice in aceptados:
+            datos_paciente = items[indice][0]
+            por_email.setdefault(datos_paciente['email'].lower().strip(), datos_paciente)
+        
+        existentes = Paciente.objects.in_bulk(list(por_email), field_name='email')
+        ahora = timezone.now()
+        nuevos = []
+        for email, datos_paciente in por_email.items():
+            if email in existentes:
+                existentes[email].telefono = datos_paciente['telefono']
+                existentes[email].fecha_actualizacion = ahora
+            else:
+                nuevos.append(Paciente(
+                    nombre=datos_paciente['nombre'],
+                    apellido_paterno=datos_paciente['apellido_paterno'],
+                    apellido_materno=datos_paciente['apellido_materno'],
+                    fecha_nacimiento=datos_paciente['fecha_nacimiento'],
+                    sexo=datos_paciente['sexo'],
+                    email=email,
+                    telefono=datos_paciente['telefono']
+                ))
+        
+        try:
+            with transaction.atomic():
+                Paciente.objects.bulk_update(list(existentes.values()), ['telefono', 'fecha_actualizacion'])
+                pacientes = {**existentes, **{p.email: p for p in Paciente.objects.bulk_create(nuevos)}}
+                
+                nuevas = []
+                for indice in aceptados:
+                    datos_paciente, datos_cita = items[indice]
+                    medico = medicos[datos_cita['medico_id']]
+                    nuevas.append(Cita(
+                        paciente=pacientes[datos_paciente['email'].lower().strip()],
+                        medico=medico,
+                        fecha=datos_cita['fecha'],
+                        hora=datos_cita['hora'],
+                        duracion_minutos=medico.duracion_consulta_minutos,
+                        # bulk_create no llama a save(): calcular el rango aquí
+                        horario=Cita.rango_horario(
+                            datos_cita['fecha'], datos_cita['hora'], medico.duracion_consulta_minutos
+                        ),
+                        motivo=datos_cita['motivo'],
+                        sintomas_iniciales=datos_cita.get('sintomas_iniciales', ''),
+                        consultorio=f"Consultorio {medico.id}",
+                        estado='AGENDADA'
+                    ))
+                citas = Cita.objects.bulk_create(nuevas)
+                
+                RelayOutbox.registrar(NotificacionesCita.CONFIRMACION_CITA, [cita.id for cita in citas])
+                
+                # bulk_create no emite señales: actualizar el cache de disponibilidad y
+                # soltar las reservas al confirmar la transacción
+                def al_confirmar():
+                    CacheDisponibilidad.ocupar_varias([
+                        (cita.medico_id, cita.fecha, cita.hora, cita.duracion_minutos) for cita in citas
+                    ])
+                    ReservaHorario.liberar_varios(horarios, reserva)
+                
+                transaction.on_commit(al_confirmar)
+        except IntegrityError as e:
+            # No se crea ninguna cita del lote. La restricción violada indica si otra
+            # transacción ganó alguno de los horarios o creó al mismo tiempo un
+            # paciente con un email del lote
+            ReservaHorario.liberar_varios(horarios, reserva)
+            diagnostico = getattr(e.__cause__, 'diag', None)
+            restriccion = getattr(diagnostico, 'constraint_name', None) or str(e)
+            if 'cita_sin_traslape' in restriccion:
+                error = "No se pudo crear la cita: otro horario del lote se ocupó. Intenta de nuevo"
+            elif 'email' in restriccion:
+                error = "No se pudo crear la cita: otro registro creó al mismo tiempo un paciente del lote. Intenta de nuevo"
+            else:
+                logger.error(f"Error de integridad al crear citas masivas: {str(e)}")
+                error = "No se pudo crear la cita por un conflicto con datos existentes. Intenta de nuevo"
+            for indice in aceptados:
+                resultados[indice] = {'exito': False, 'error': error}
+            return resultados
+        
+        for indice, cita in zip(aceptados, citas):
+            resultados[indice] = {'exito': True, 'cita': cita}
+        
+        logger.debug(f"Citas masivas: {len(citas)} creada(s) de {len(items)}")
+        logger.info(f"Citas masivas: {len(citas)} creadas de {len(items)}")
+        
+        return resultados
+    
     @staticmethod
     def cancelar_cita(cita_id, motivo=''):
         """
@@ -260,10 +518,12 @@ class CitaService:
             if not cita.puede_cancelar():
                 return False, "Esta cita no puede ser cancelada (ya pasó o está muy próxima)"
             
-            cita.estado = 'CANCELADA'
-            cita.fecha_cancelacion = timezone.now()
-            cita.motivo_cancelacion = motivo
-            cita.save()
+            with transaction.atomic():
+                cita.estado = 'CANCELADA'
+                cita.fecha_cancelacion = timezone.now()
+                cita.motivo_cancelacion = motivo
+                cita.save()
+                RelayOutbox.registrar(NotificacionesCita.CANCELACION_CITA, [cita.id])
             
             return True, "Cita cancelada exitosamente"
             
@@ -0,0 +1,245 @@
+"""
+Almacén de conversaciones del asistente virtual en Redis
+Guarda los mensajes en una lista y los metadatos en un hash para que cada turno
+solo agregue mensajes y actualice campos, sin reescribir la conversación completa
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+import redis.asyncio as redis_async
+import asyncio
+import json
+import weakref
+
+
+# Un cliente asíncrono por event loop: las conexiones de redis.asyncio no se
+# pueden compartir entre loops distintos
+_clientes_redis_async = weakref.WeakKeyDictionary()
+
+
+def obtener_redis_async():
+    """
+    Retorna el cliente redis.asyncio del event loop actual, creándolo si no existe
+    Usa la misma URL y timeouts que el cache de Django
+    """
+    loop = asyncio.get_running_loop()
+    cliente = _clientes_redis_async.get(loop)
+
+    if cliente is None:
+        opciones = settings.CACHES['default'].get('OPTIONS', {})
+        pool_kwargs = opciones.get('CONNECTION_POOL_KWARGS', {})
+        cliente = redis_async.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=opciones.get('SOCKET_CONNECT_TIMEOUT'),
+            socket_timeout=opciones.get('SOCKET_TIMEOUT'),
+            max_connections=pool_kwargs.get('max_connections'),
+            retry_on_timeout=pool_kwargs.get('retry_on_timeout', False),
+        )
+        _clientes_redis_async[loop] = cliente
+
+    return cliente
+
+
+async def cerrar_redis_async():
+    """Cierra el cliente redis.asyncio del event loop actual (si existe) y su pool"""
+    cliente = _clientes_redis_async.pop(asyncio.get_running_loop(), None)
+    if cliente is not None:
+        await cliente.aclose()
+
+
+class ConversacionStoreBase:
+    """
+    Estructura de una conversación en Redis:
+        conversacion:{id}:mensajes -> LIST con cada mensaje serializado en JSON
+        conversacion:{id}:meta     -> HASH con los metadatos (cada valor en JSON)
+
+    Ambas claves comparten el mismo timeout y se renuevan en cada escritura.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def _claves(self, conversacion_id):
+        """Genera las claves (mensajes, meta) respetando el KEY_PREFIX del cache"""
+        base = cache.make_key(f"conversacion:{conversacion_id}")
+        return f"{base}:mensajes", f"{base}:meta"
+
+    @staticmethod
+    def _serializar_campos(campos):
+        return {campo: json.dumps(valor) for campo, valor in campos.items()}
+
+    @staticmethod
+    def _deserializar_campos(campos):
+        return {
+            campo.decode() if isinstance(campo, bytes) else campo: json.loads(valor)
+            for campo, valor in campos.items()
+        }
+
+    def _armar_conversacion(self, campos, total, mensajes):
+        if not campos:
+            return None
+
+        conversacion = self._deserializar_campos(campos)
+        conversacion['mensajes'] = [json.loads(m) for m in mensajes]
+        # Posición en la lista completa del primer mensaje cargado
+        conversacion['indice_inicio'] = total - len(mensajes)
+        return conversacion
+
+    def _pipeline_crear(self, pipe, conversacion_id, mensajes, metadatos):
+        clave_mensajes, clave_meta = self._claves(conversacion_id)
+
+        pipe.delete(clave_mensajes, clave_meta)
+        if mensajes:
+            pipe.rpush(clave_mensajes, *[json.dumps(m) for m in mensajes])
+        pipe.hset(clave_meta, mapping=self._serializar_campos(metadatos))
+        pipe.expire(clave_mensajes, self.timeout)
+        pipe.expire(clave_meta, self.timeout)
+
+    def _pipeline_obtener(self, pipe, conversacion_id, ultimos=None):
+        clave_mensajes, clave_meta = self._claves(conversacion_id)
+
+        pipe.hgetall(clave_meta)
+        pipe.llen(clave_mensajes)
+        pipe.lrange(clave_mensajes, -ultimos if ultimos else 0, -1)
+
+    def _pipeline_agregar(self, pipe, conversacion_id, mensajes, metadatos):
+        clave_mensajes, clave_meta = self._claves(conversacion_id)
+
+        if mensajes:
+            pipe.rpush(clave_mensajes, *[json.dumps(m) for m in mensajes])
+        if metadatos:
+            pipe.hset(clave_meta, mapping=self._serializar_campos(metadatos))
+        pipe.expire(clave_mensajes, self.timeout)
+        pipe.expire(clave_meta, self.timeout)
+
+
+class ConversacionStore(ConversacionStoreBase):
+    """Almacén síncrono (usa la conexión de django-redis)"""
+
+    def __init__(self, timeout):
+        super().__init__(timeout)
+        self.redis = get_redis_connection('default')
+
+    def crear(self, conversacion_id, mensajes, metadatos):
+        """
+        Crea (o reemplaza) una conversación completa
+
+        Args:
+            conversacion_id (str): UUID de la conversación
+            mensajes (list): Mensajes iniciales
+            metadatos (dict): Metadatos iniciales
+        """
+        pipe = self.redis.pipeline()
+        self._pipeline_crear(pipe, conversacion_id, mensajes, metadatos)
+        pipe.execute()
+
+    def obtener_metadatos(self, conversacion_id):
+        """
+        Returns:
+            dict or None: Metadatos o None si la conversación no existe/expiró
+        """
+        _, clave_meta = self._claves(conversacion_id)
+        campos = self.redis.hgetall(clave_meta)
+
+        if not campos:
+            return None
+        return self._deserializar_campos(campos)
+
+    def obtener_mensajes(self, conversacion_id, inicio=0, fin=-1):
+        """
+        Obtiene un rango de mensajes (mismos índices que LRANGE)
+
+        Returns:
+            list: Mensajes en orden cronológico
+        """
+        clave_mensajes, _ = self._claves(conversacion_id)
+        return [json.loads(m) for m in self.redis.lrange(clave_mensajes, inicio, fin)]
+
+    def obtener(self, conversacion_id, ultimos=None):
+        """
+        Obtiene la conversación (metadatos + 'mensajes') en un solo viaje a Redis
+        Incluye 'indice_inicio': posición del primer mensaje cargado en la lista completa
+
+        Args:
+            conversacion_id (str): UUID de la conversación
+            ultimos (int, optional): Traer solo los últimos N mensajes
+
+        Returns:
+            dict or None: Datos de la conversación o None si no existe/expiró
+        """
+        pipe = self.redis.pipeline()
+        self._pipeline_obtener(pipe, conversacion_id, ultimos)
+        campos, total, mensajes = pipe.execute()
+
+        return self._armar_conversacion(campos, total, mensajes)
+
+    def agregar_mensajes(self, conversacion_id, mensajes, **metadatos):
+        """
+        Agrega mensajes al final de la lista y actualiza solo los metadatos indicados
+
+        Args:
+            conversacion_id (str): UUID de la conversación
+            mensajes (list): Mensajes a agregar
+            **metadatos: Campos del hash a actualizar en la misma operación
+        """
+        pipe = self.redis.pipeline()
+        self._pipeline_agregar(pipe, conversacion_id, mensajes, metadatos)
+        pipe.execute()
+
+    def actualizar(self, conversacion_id, **metadatos):
+        """Actualiza solo los campos indicados del hash de metadatos"""
+        self.agregar_mensajes(conversacion_id, [], **metadatos)
+
+    def eliminar(self, conversacion_id):
+        """Elimina la conversación (mensajes y metadatos)"""
+        self.redis.delete(*self._claves(conversacion_id))
+
+
+class ConversacionStoreAsync(ConversacionStoreBase):
+    """Almacén asíncrono (usa redis.asyncio) con la misma estructura que ConversacionStore"""
+
+    @property
+    def redis(self):
+        return obtener_redis_async()
+
+    async def crear(self, conversacion_id, mensajes, metadatos):
+        """Crea (o reemplaza) una conversación completa"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._pipeline_crear(pipe, conversacion_id, mensajes, metadatos)
+            await pipe.execute()
+
+    async def obtener_metadatos(self, conversacion_id):
+        """Metadatos o None si la conversación no existe/expiró"""
+        _, clave_meta = self._claves(conversacion_id)
+        campos = await self.redis.hgetall(clave_meta)
+
+        if not campos:
+            return None
+        return self._deserializar_campos(campos)
+
+    async def obtener_mensajes(self, conversacion_id, inicio=0, fin=-1):
+        """Obtiene un rango de mensajes (mismos índices que LRANGE)"""
+        clave_mensajes, _ = self._claves(conversacion_id)
+        return [json.loads(m) for m in await self.redis.lrange(clave_mensajes, inicio, fin)]
+
+    async def obtener(self, conversacion_id, ultimos=None):
+        """Obtiene la conversación (metadatos + 'mensajes') en un solo viaje a Redis"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._pipeline_obtener(pipe, conversacion_id, ultimos)
+            campos, total, mensajes = await pipe.execute()
+
+        return self._armar_conversacion(campos, total, mensajes)
+
+    async def agregar_mensajes(self, conversacion_id, mensajes, **metadatos):
+        """Agrega mensajes al final de la lista y actualiza solo los metadatos indicados"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            self._pipeline_agregar(pipe, conversacion_id, mensajes, metadatos)
+            await pipe.execute()
+
+    async def actualizar(self, conversacion_id, **metadatos):
+        """Actualiza solo los campos indicados del hash de metadatos"""
+        await self.agregar_mensajes(conversacion_id, [], **metadatos)
+
+    async def eliminar(self, conversacion_id):
+        """Elimina la conversación (mensajes y metadatos)"""
+        await self.redis.delete(*self._claves(conversacion_id))
@@ -0,0 +1,421 @@
+"""
+Motor de disponibilidad de horarios de los médicos
+Los horarios candidatos salen de la plantilla semanal del médico (sus HorarioMedico
+activos divididos según la duración de su consulta). Las citas agendadas de un
+rango de fechas se cargan en una sola consulta y se arma, por día, un mapa de bits
+con los horarios ocupados. Las preguntas "¿está libre este horario?" y "¿cuáles
+son los próximos N libres?" se responden en memoria, sin una consulta por horario
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from datetime import date as dt_date, time, timedelta
+import logging
+
+from ..models import Cita, HorarioMedico, Medico
+from .analizador import normalizar
+
+logger = logging.getLogger(__name__)
+
+
+# Las plantillas se invalidan al cambiar los horarios o el médico (ver medical/signals.py);
+# el timeout solo acota entradas huérfanas
+TIMEOUT_PLANTILLA = 60 * 60 * 24
+
+
+def a_minutos(hora):
+    """Minutos desde las 00:00 ('09:30' -> 570)"""
+    return hora.hour * 60 + hora.minute
+
+
+def a_hora(minutos):
+    """Hora a partir de los minutos desde las 00:00 (570 -> '09:30')"""
+    return time(minutos // 60, minutos % 60)
+
+
+def horarios_cruzados(horarios, duracion, hora, duracion_cita):
+    """
+    Índices de los horarios del día que se cruzan con una cita
+
+    Args:
+        horarios (list): Minutos de inicio de los horarios del día, ordenados
+        duracion (int): Duración de cada horario en minutos
+        hora (time): Hora de la cita
+        duracion_cita (int): Duración de la cita en minutos
+
+    Returns:
+        list: Índices en 'horarios'
+    """
+    inicio_cita = a_minutos(hora)
+    fin_cita = inicio_cita + duracion_cita
+    indices = []
+
+    for indice, inicio in enumerate(horarios):
+        if inicio >= fin_cita:
+            break
+        if inicio + duracion > inicio_cita:
+            indices.append(indice)
+
+    return indices
+
+
+class PlantillaHorario:
+    """
+    Plantilla semanal de horarios de un médico, cacheada en Redis
+
+    Formato: {'duracion': int, 'dias': [[minutos desde las 00:00 de cada horario], ...]}
+    con 7 listas ordenadas, una por día de la semana (0=Lunes ... 6=Domingo)
+    """
+
+    @staticmethod
+    def _clave(medico_id):
+        return f"plantilla_horario:{medico_id}"
+
+    @staticmethod
+    def compilar(bloques, duracion):
+        """
+        Divide los bloques de atención de cada día en horarios de 'duracion' minutos
+
+        Args:
+            bloques (list): Tuplas (dia_semana, hora_inicio, hora_fin)
+            duracion (int): Duración de la consulta en minutos
+
+        Returns:
+            dict: Plantilla semanal
+        """
+        dias = [set() for _ in range(7)]
+
+        for dia_semana, hora_inicio, hora_fin in bloques:
+            inicio, fin = a_minutos(hora_inicio), a_minutos(hora_fin)
+            dias[dia_semana].update(range(inicio, fin - duracion + 1, duracion))
+
+        return {'duracion': duracion, 'dias': [sorted(horarios) for horarios in dias]}
+
+    @classmethod
+    def obtener_varias(cls, medico_ids):
+        """
+        Plantillas de varios médicos: las que faltan en el cache se compilan con
+        una sola consulta y se guardan
+
+        Returns:
+            dict: medico_id -> plantilla
+        """
+        medico_ids = list(medico_ids)
+        en_cache = cache.get_many([cls._clave(medico_id) for medico_id in medico_ids])
+        plantillas = {
+            medico_id: en_cache[cls._clave(medico_id)]
+            for medico_id in medico_ids
+            if cls._clave(medico_id) in en_cache
+        }
+
+        faltantes = [medico_id for medico_id in medico_ids if medico_id not in plantillas]
+        if not faltantes:
+            return plantillas
+
+        bloques = {medico_id: [] for medico_id in faltantes}
+        duraciones = {}
+        filas = HorarioMedico.objects.filter(
+            medico_id__in=faltantes,
+            activo=True
+        ).values_list('medico_id', 'dia_semana', 'hora_inicio', 'hora_fin', 'medico__duracion_consulta_minutos')
+
+        for medico_id, dia_semana, hora_inicio, hora_fin, duracion in filas:
+            bloques[medico_id].append((dia_semana, hora_inicio, hora_fin))
+            duraciones[medico_id] = duracion
+
+        # Un médico sin horarios activos tiene una plantilla vacía (no atiende)
+        nuevas = {
+            medico_id: cls.compilar(bloques[medico_id], duraciones.get(medico_id, 30))
+            for medico_id in faltantes
+        }
+        cache.set_many({cls._clave(medico_id): p for medico_id, p in nuevas.items()}, TIMEOUT_PLANTILLA)
+        logger.debug(f"Plantillas de horario compiladas: {faltantes}")
+
+        plantillas.update(nuevas)
+        return plantillas
+
+    @classmethod
+    def obtener(cls, medico_id):
+        """Plantilla de un médico (ver obtener_varias)"""
+        return cls.obtener_varias([medico_id])[medico_id]
+
+    @classmethod
+    def invalidar(cls, medico_id):
+        """
+        Descarta la plantilla del médico ahora y de nuevo al confirmar la
+        transacción, para que una lectura concurrente no guarde la versión anterior
+        """
+        clave = cls._clave(medico_id)
+        cache.delete(clave)
+        transaction.on_commit(lambda: cache.delete(clave))
+
+
+class DisponibilidadMedico:
+    """
+    Disponibilidad de un médico en un rango de días
+
+    El bit i del mapa de un día indica que el i-ésimo horario de la plantilla de
+    ese día de la semana se cruza con una cita AGENDADA
+    """
+
+    def __init__(self, medico_id, fecha_inicio, dias=7, plantilla=None, citas=None):
+        """
+        Args:
+            medico_id (int): ID del médico
+            fecha_inicio (date): Primer día del rango
+            dias (int): Cantidad de días del rango
+            plantilla (dict, optional): Plantilla semanal ya cargada
+            citas (list, optional): Tuplas (fecha, hora, duracion_minutos) de las
+                citas agendadas del rango, si ya se consultaron
+        """
+        self.medico_id = medico_id
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_inicio + timedelta(days=dias - 1)
+        self.plantilla = plantilla or PlantillaHorario.obtener(medico_id)
+        self.duracion = self.plantilla['duracion']
+        self.ocupados = self._mapas_ocupados(self._cargar_citas() if citas is None else citas)
+
+    @classmethod
+    def de_varios(cls, medico_ids, fecha_inicio, dias):
+        """
+        Disponibilidad de varios médicos en el mismo rango, con una sola consulta
+        de citas para todos (más una para las plantillas que no estén en cache)
+
+        Returns:
+            dict: medico_id -> DisponibilidadMedico
+        """
+        medico_ids = list(medico_ids)
+        if not medico_ids:
+            return {}
+
+        fecha_fin = fecha_inicio + timedelta(days=dias - 1)
+        plantillas = PlantillaHorario.obtener_varias(medico_ids)
+
+        citas = {medico_id: [] for medico_id in medico_ids}
+        filas = Cita.objects.filter(
+            medico_id__in=medico_ids,
+            fecha__range=(fecha_inicio, fecha_fin),
+            estado='AGENDADA'
+        ).values_list('medico_id', 'fecha', 'hora', 'duracion_minutos')
+
+        for medico_id, fecha, hora, duracion in filas:
+            citas[medico_id].append((fecha, hora, duracion))
+
+        return {
+            medico_id: cls(medico_id, fecha_inicio, dias, plantillas[medico_id], citas[medico_id])
+            for medico_id in medico_ids
+        }
+
+    def _cargar_citas(self):
+        return Cita.objects.filter(
+            medico_id=self.medico_id,
+            fecha__range=(self.fecha_inicio, self.fecha_fin),
+            estado='AGENDADA'
+        ).values_list('fecha', 'hora', 'duracion_minutos')
+
+    def _horarios(self, fecha):
+        return self.plantilla['dias'][fecha.weekday()]
+
+    def _mapas_ocupados(self, citas):
+        """
+        Returns:
+            dict: fecha -> mapa de bits de los horarios ocupados (solo días con citas)
+        """
+        ocupados = {}
+
+        for fecha, hora, duracion_cita in citas:
+            mapa = ocupados.get(fecha, 0)
+            for indice in horarios_cruzados(self._horarios(fecha), self.duracion, hora, duracion_cita):
+                mapa |= 1 << indice
+            ocupados[fecha] = mapa
+
+        return ocupados
+
+    def _fechas(self):
+        fecha = self.fecha_inicio
+        while fecha <= self.fecha_fin:
+            yield fecha
+            fecha += timedelta(days=1)
+
+    def mapa_libres(self, fecha, incluir_iniciados=False):
+        """
+        Args:
+            fecha (date): Día del rango
+            incluir_iniciados (bool): Si es hoy, incluir los horarios que ya empezaron
+
+        Returns:
+            int: Mapa de bits de los horarios libres del día (0 si la fecha ya pasó
+                o está fuera del rango)
+        """
+        hoy = dt_date.today()
+        if fecha < hoy or not self.fecha_inicio <= fecha <= self.fecha_fin:
+            return 0
+
+        horarios = self._horarios(fecha)
+        libres = ((1 << len(horarios)) - 1) & ~self.ocupados.get(fecha, 0)
+
+        if fecha == hoy and not incluir_iniciados:
+            ahora = a_minutos(timezone.localtime().time())
+            pasados = sum(1 for inicio in horarios if inicio <= ahora)
+            libres &= ~((1 << pasados) - 1)
+
+        return libres
+
+    def minutos_libres(self, fecha, incluir_iniciados=False):
+        """
+        Returns:
+            list: Minutos de inicio de los horarios libres del día, en orden
+        """
+        horarios = self._horarios(fecha)
+        libres = self.mapa_libres(fecha, incluir_iniciados)
+        minutos = []
+
+        while libres:
+            bit = libres & -libres  # Bit libre más bajo = horario más temprano
+            minutos.append(horarios[bit.bit_length() - 1])
+            libres ^= bit
+
+        return minutos
+
+    def ocupar(self, fecha, hora, duracion_cita):
+        """Marca como ocupados los horarios que se cruzan con una cita aún no guardada"""
+        mapa = self.ocupados.get(fecha, 0)
+        for indice in horarios_cruzados(self._horarios(fecha), self.duracion, hora, duracion_cita):
+            mapa |= 1 << indice
+        self.ocupados[fecha] = mapa
+
+    def atiende(self, fecha, hora):
+        """True si la hora es el inicio de un horario de la plantilla de ese día"""
+        return a_minutos(hora) in self._horarios(fecha)
+
+    def esta_libre(self, fecha, hora):
+        """True si el horario es de la plantilla y no se cruza con una cita agendada"""
+        horarios = self._horarios(fecha)
+        minutos = a_minutos(hora)
+        if minutos not in horarios:
+            return False
+        return bool(self.mapa_libres(fecha) >> horarios.index(minutos) & 1)
+
+    def libres_del_dia(self, fecha):
+        """
+        Returns:
+            list: Horarios (time) libres del día en orden
+        """
+        return [a_hora(minutos) for minutos in self.minutos_libres(fecha)]
+
+    def siguientes_libres(self, cantidad):
+        """
+        Próximos horarios libres a partir de fecha_inicio
+
+        Args:
+            cantidad (int): Cantidad máxima de horarios a retornar
+
+        Returns:
+            list: Lista de tuplas (fecha, hora)
+        """
+        resultado = []
+
+        for fecha in self._fechas():
+            for hora in self.libres_del_dia(fecha):
+                resultado.append((fecha, hora))
+                if len(resultado) >= cantidad:
+                    return resultado
+
+        return resultado
+
+
+class BuscadorHorarios:
+    """
+    Búsqueda del primer horario libre entre todos los médicos de una especialidad
+
+    Estructura en cache:
+        especialidades_medicos -> {especialidad normalizada: [ids de médicos activos
+            que aceptan nuevos pacientes]}
+    """
+
+    CLAVE_ESPECIALIDADES = 'especialidades_medicos'
+
+    @classmethod
+    def ids_de_especialidad(cls, especialidad):
+        """
+        IDs de los médicos activos que aceptan nuevos pacientes de la especialidad,
+        comparando sin acentos ni mayúsculas ('cardiologia' encuentra 'Cardiología')
+
+        Returns:
+            list: IDs en el orden de Medico.Meta.ordering
+        """
+        mapa = cache.get(cls.CLAVE_ESPECIALIDADES)
+
+        if mapa is None:
+            mapa = {}
+            filas = Medico.objects.filter(
+                activo=True, acepta_nuevos_pacientes=True
+            ).values_list('especialidad_normalizada', 'id')
+            for especialidad_normalizada, medico_id in filas:
+                mapa.setdefault(especialidad_normalizada, []).append(medico_id)
+            cache.set(cls.CLAVE_ESPECIALIDADES, mapa, TIMEOUT_PLANTILLA)
+            logger.debug(f"Mapa de especialidades compilado: {len(mapa)} especialidad(es)")
+
+        return mapa.get(normalizar(especialidad).strip(), [])
+
+    @classmethod
+    def invalidar_especialidades(cls):
+        """Descarta el mapa de especialidades (cambió algún médico)"""
+        cache.delete(cls.CLAVE_ESPECIALIDADES)
+        transaction.on_commit(lambda: cache.delete(cls.CLAVE_ESPECIALIDADES))
+
+    @classmethod
+    def medicos_de_especialidad(cls, especialidad):
+        """
+        Médicos activos que aceptan nuevos pacientes de la especialidad (ver
+        ids_de_especialidad); con el mapa en cache es una búsqueda por llave primaria
+
+        Returns:
+            list: Instancias de Medico
+        """
+        ids = cls.ids_de_especialidad(especialidad)
+        if not ids:
+            return []
+        return list(Medico.objects.filter(id__in=ids, activo=True, acepta_nuevos_pacientes=True))
+
+    @classmethod
+    def primeros_libres(cls, especialidad, fecha_inicio, dias=14, cantidad=1, medicos=None):
+        """
+        Primeros horarios libres de la especialidad, entre todos sus médicos
+
+        Usa una consulta para los médicos y otra para todas sus citas agendadas del
+        rango (más una para las plantillas que no estén en cache)
+
+        Args:
+            especialidad (str): Especialidad buscada
+            fecha_inicio (date): Primer día de la búsqueda
+            dias (int): Cantidad de días a revisar
+            cantidad (int): Cantidad máxima de horarios a retornar
+            medicos (list, optional): Médicos de la especialidad, si ya se buscaron
+
+        Returns:
+            list: Tuplas (Medico, fecha, hora) ordenadas por fecha y hora; a igual
+                horario, en el orden de los médicos
+        """
+        if medicos is None:
+            medicos = cls.medicos_de_especialidad(especialidad)
+        if not medicos:
+            return []
+
+        fecha_fin = fecha_inicio + timedelta(days=dias - 1)
+        por_medico = DisponibilidadMedico.de_varios([medico.id for medico in medicos], fecha_inicio, dias)
+        disponibilidades = [(medico, por_medico[medico.id]) for medico in medicos]
+
+        # Recorrer día por día, juntando los horarios libres de todos los médicos
+        resultado = []
+        fecha = fecha_inicio
+        while fecha <= fecha_fin and len(resultado) < cantidad:
+            del_dia = sorted(
+                (minutos, orden, medico)
+                for orden, (medico, disponibilidad) in enumerate(disponibilidades)
+                for minutos in disponibilidad.minutos_libres(fecha)
+            )
+            resultado.extend((medico, fecha, a_hora(minutos)) for minutos, _, medico in del_dia)
+            fecha += timedelta(days=1)
+
+        return resultado[:cantidad]
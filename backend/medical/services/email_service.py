@@ -206,9 +206,8 @@ class EmailService:
                 }
         """
         try:
-            # Generar PDF
-            pdf_buffer = PDFService.generar_pdf_cita(cita)
-            pdf_content = pdf_buffer.getvalue()
+            # PDF guardado de la cita (se genera solo si cambió)
+            pdf_content = PDFService.leer_pdf_cita(cita)
             pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
             
             # Generar HTML del email
@@ -250,6 +249,75 @@ class EmailService:
                 'mensaje': f'Error al enviar email: {str(e)}'
             }
     
+    def enviar_cancelacion_cita(self, cita):
+        """
+        Confirma al paciente la cancelación de su cita
+        
+        Args:
+            cita (Cita): Cita cancelada
+            
+        Returns:
+            dict: Resultado del envío
+        """
+        motivo = f"<p><strong>Motivo:</strong> {cita.motivo_cancelacion}</p>" if cita.motivo_cancelacion else ""
+        html_content = f"""
+        <!DOCTYPE html>
+        <html lang="es">
+        <body style="font-family: Arial, sans-serif; color: #333;">
+            <h2 style="color: #dc2626;">Tu cita fue cancelada</h2>
+            <p>Hola {cita.paciente.nombre},</p>
+            <p>Cancelamos tu cita con {cita.medico.nombre_completo()} ({cita.medico.especialidad})
+            del {cita.fecha.strftime('%d/%m/%Y')} a las {cita.hora.strftime('%I:%M %p')}.</p>
+            {motivo}
+            <p>Puedes agendar una nueva cita cuando lo necesites.</p>
+        </body>
+        </html>
+        """
+        
+        return self.enviar_email_personalizado(
+            cita.paciente.email,
+            "Cancelación de tu cita médica",
+            html_content
+        )
+    
+    def enviar_oferta_lista_espera(self, entrada):
+        """
+        Avisa al paciente de la lista de espera que se liberó un horario para él
+        
+        Args:
+            entrada (ListaEspera): Solicitud con el horario ofrecido
+            
+        Returns:
+            dict: Resultado del envío
+        """
+        from .lista_espera import ListaEsperaService
+        
+        horas = ListaEsperaService.ttl_oferta() // 3600 or 1
+        html_content = f"""
+        <!DOCTYPE html>
+        <html lang="es">
+        <body style="font-family: Arial, sans-serif; color: #333;">
+            <h2 style="color: #2563eb;">Se liberó un horario para tu cita</h2>
+            <p>Hola {entrada.paciente.nombre},</p>
+            <p>Estabas en la lista de espera y se liberó este horario:</p>
+            <ul>
+                <li><strong>Médico:</strong> {entrada.medico_ofrecido.nombre_completo()}</li>
+                <li><strong>Especialidad:</strong> {entrada.medico_ofrecido.especialidad}</li>
+                <li><strong>Fecha:</strong> {entrada.fecha_ofrecida.strftime('%d/%m/%Y')}</li>
+                <li><strong>Hora:</strong> {entrada.hora_ofrecida.strftime('%I:%M %p')}</li>
+            </ul>
+            <p>Lo apartamos para ti durante {horas} hora(s). Confirma o rechaza el horario
+            desde la aplicación (solicitud #{entrada.id}).</p>
+        </body>
+        </html>
+        """
+        
+        return self.enviar_email_personalizado(
+            entrada.paciente.email,
+            "Horario disponible para tu cita médica",
+            html_content
+        )
+    
     def enviar_email_personalizado(self, destinatario, asunto, html_content, adjuntos=None):
         """
         Envía un email personalizado
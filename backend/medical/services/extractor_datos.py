@@ -0,0 +1,303 @@
+"""
+Extracción local de los datos del paciente durante la conversación
+Cada mensaje del usuario se analiza con expresiones regulares y con el contexto
+de la última pregunta del asistente, de modo que al crear la cita los datos ya
+suelen estar completos y no hace falta volver a enviar la conversación a OpenAI
+"""
+import re
+
+from .analizador import normalizar
+
+
+class ExtractorDatosPaciente:
+    """Extrae nombre, edad, email y teléfono de los mensajes del usuario"""
+
+    CAMPOS_REQUERIDOS = ('nombre', 'edad', 'email', 'telefono')
+    CAMPOS_NOMBRE = ('nombre', 'apellido_paterno', 'apellido_materno')
+
+    EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+    # Teléfonos: 7 a 15 dígitos con separadores opcionales y prefijo +
+    TELEFONO = re.compile(r'(?<![\w@])\+?\d[\d\s().-]{5,18}\d(?![\w@])')
+
+    # Fechas que el patrón de teléfono confundiría (2024-05-10, 10/05/2024)
+    FECHA = re.compile(r'\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b|\b\d{1,2}[.-]\d{1,2}[.-]\d{4}\b')
+
+    # Número de documento (DNI, carné de extranjería, pasaporte) justo antes del
+    # número: no es el teléfono. Se aplica al texto normalizado
+    DOCUMENTO = re.compile(r'\b(?:dni|documento|doc|cedula|identidad|pasaporte|carne|carnet|ruc|ce)\b\D{0,20}$')
+
+    # Se aplica al texto normalizado (sin acentos)
+    EDAD = re.compile(r'\b(\d{1,3})\s*(?:anos|anitos)\b')
+
+    # "N años" que no es la edad del paciente: una duración ("desde hace 2 años")
+    # o la edad de otra persona ("mi hijo tiene 5 años")
+    DURACION = re.compile(r'\b(?:hace|desde|durante|por|llevo|lleva|tras)\s+(?:(?:mas de|unos|casi|ya)\s+)?$')
+    # ... o lo que sigue lo delata ("tengo 2 años con este dolor")
+    DURACION_POSTERIOR = re.compile(r'\s*(?:con|sufriendo|padeciendo|que|asi|de\s+(?!edad\b))')
+    TERCEROS = re.compile(
+        r'\b(?:mi|mis|su|sus|el|la|los|las|un|una|unos|unas|dos|tres|\d+)\s+'
+        r'(?:hij[oa]s?|espos[oa]|marido|mujer|mama|papa|madre|padre|abuel[oa]s?|herman[oa]s?|'
+        r'bebes?|niet[oa]s?|sobrin[oa]s?|prim[oa]s?|tios?|tias?|pareja|novi[oa]|amig[oa]s?|'
+        r'nin[oa]s?|menores)\b'
+    )
+    # Último número de una enumeración ("de 5, 7 y 10 años"): edades de varias personas
+    ENUMERACION = re.compile(r'\d\s*(?:,\s*\d+\s*)*(?:,|y|e|o)\s*$')
+
+    NOMBRE = re.compile(
+        r'\b(?:me llamo|mi nombre es|mi nombre completo es)\s+'
+        r'([a-záéíóúüñ]+(?:\s+[a-záéíóúüñ]+){0,4})',
+        re.IGNORECASE
+    )
+
+    # "Soy ..." solo se toma como nombre si el asistente acaba de preguntarlo:
+    # en otro contexto casi siempre es una profesión o un estado ("soy operado de...")
+    NOMBRE_SOY = re.compile(
+        r'\bsoy\s+([a-záéíóúüñ]+(?:\s+[a-záéíóúüñ]+){0,4})',
+        re.IGNORECASE
+    )
+
+    # Palabras que indican que el texto no es un nombre
+    NO_NOMBRES = {
+        'alergico', 'alergica', 'diabetico', 'diabetica', 'hipertenso', 'hipertensa',
+        'paciente', 'nuevo', 'nueva', 'mayor', 'menor', 'de', 'del', 'el', 'la', 'un', 'una',
+        'muy', 'asmatico', 'asmatica', 'estudiante', 'madre', 'padre', 'mama', 'papa',
+        'mujer', 'hombre', 'yo', 'aqui', 'aca', 'senor', 'senora', 'senorita', 'joven',
+        'nino', 'nina', 'chico', 'chica', 'persona', 'usted', 'tu', 'ese', 'esa', 'este',
+        'esta', 'casado', 'casada', 'soltero', 'soltera', 'embarazada', 'peruano', 'peruana',
+        'profesor', 'profesora', 'maestro', 'maestra', 'doctor', 'doctora', 'medico', 'medica',
+        'enfermero', 'enfermera', 'ingeniero', 'ingeniera', 'abogado', 'abogada', 'jubilado',
+        'jubilada', 'operado', 'operada', 'vegetariano', 'vegetariana', 'fumador', 'fumadora',
+        'deportista', 'trabajador', 'trabajadora', 'viudo', 'viuda', 'divorciado', 'divorciada',
+        'zurdo', 'zurda', 'primera', 'primer', 'otro', 'otra', 'cliente', 'familiar',
+    }
+
+    # Partículas que pueden ir dentro de un nombre ("María de la Cruz"), nunca al final
+    PARTICULAS = {'de', 'del', 'la', 'las', 'los'}
+
+    # Palabras que no forman parte de un nombre en una respuesta corta
+    NO_EN_NOMBRE = {
+        'dolor', 'tengo', 'quiero', 'cita', 'si', 'no', 'gracias', 'fiebre', 'tos', 'hola',
+        'agendar', 'necesito', 'siento', 'cabeza', 'estomago', 'pecho', 'ok', 'vale', 'bien',
+        'doctor', 'doctora', 'medico', 'consulta', 'por', 'favor', 'claro', 'buenos', 'buenas',
+    }
+
+    # Palabras donde termina el nombre ("Juan Pérez y tengo...")
+    CONECTORES = {
+        'y', 'e', 'mi', 'mis', 'me', 'tengo', 'con', 'edad', 'correo', 'email', 'telefono',
+        'que', 'pero', 'porque', 'estoy', 'quiero', 'necesito', 'a', 'en', 'para', 'por',
+        'desde', 'hace', 'duele', 'vivo', 'trabajo', 'soy', 'tambien', 'no', 'si',
+    }
+
+    @classmethod
+    def _pregunta(cls, mensaje_asistente):
+        """Campos que pide la última pregunta del asistente"""
+        texto = normalizar(mensaje_asistente or '')
+        return {
+            'nombre': 'nombre' in texto,
+            'edad': 'edad' in texto or 'cuantos anos' in texto,
+        }
+
+    @classmethod
+    def _edad(cls, texto):
+        """
+        Primera mención "N años" que se refiere al paciente
+
+        Returns:
+            int or None: Edad
+        """
+        texto = normalizar(texto)
+        for edad in cls.EDAD.finditer(texto):
+            if cls.ENUMERACION.search(texto[:edad.start()]):
+                continue
+            # Solo cuenta lo anterior dentro de la misma oración o cláusula
+            anterior = re.split(r'[.,;:!?\n]', texto[:edad.start()])[-1]
+            if cls.DURACION.search(anterior) or cls.TERCEROS.search(anterior):
+                continue
+            if cls.DURACION_POSTERIOR.match(texto, edad.end()):
+                continue
+            return int(edad.group(1))
+        return None
+
+    @classmethod
+    def _telefono(cls, texto):
+        """
+        Primer número con forma de teléfono que no es una fecha ni un documento
+
+        Returns:
+            str or None: Teléfono tal como se escribió
+        """
+        texto = cls.FECHA.sub(lambda fecha: ' ' * len(fecha.group(0)), texto)
+        for telefono in cls.TELEFONO.finditer(texto):
+            if not 7 <= len(re.sub(r'\D', '', telefono.group(0))) <= 15:
+                continue
+            if cls.DOCUMENTO.search(normalizar(texto[:telefono.start()])):
+                continue
+            return telefono.group(0).strip()
+        return None
+
+    @classmethod
+    def _separar_nombre(cls, texto):
+        """
+        Separa un nombre completo en nombre, apellido_paterno y apellido_materno
+
+        Returns:
+            dict or None: Campos del nombre o None si el texto no parece un nombre
+        """
+        palabras = []
+        for palabra in texto.split():
+            if normalizar(palabra) in cls.CONECTORES:
+                break
+            palabras.append(palabra)
+        while palabras and normalizar(palabras[-1]) in cls.PARTICULAS:
+            palabras.pop()
+
+        if not palabras or normalizar(palabras[0]) in cls.NO_NOMBRES:
+            return None
+        if any(
+            normalizar(palabra) in cls.NO_EN_NOMBRE
+            or (normalizar(palabra) in cls.NO_NOMBRES and normalizar(palabra) not in cls.PARTICULAS)
+            or len(palabra) < 2
+            for palabra in palabras
+        ):
+            return None
+
+        # Cada partícula va con la palabra que la sigue ("de la Cruz" es un apellido)
+        grupos, particulas = [], []
+        for palabra in palabras:
+            if normalizar(palabra) in cls.PARTICULAS:
+                particulas.append(palabra.lower())
+            else:
+                grupos.append(' '.join(particulas + [palabra.capitalize()]))
+                particulas = []
+        palabras = grupos
+
+        if len(palabras) >= 4:
+            nombre, apellidos = ' '.join(palabras[:-2]), palabras[-2:]
+        else:
+            nombre, apellidos = palabras[0], palabras[1:]
+
+        return {
+            'nombre': nombre,
+            'apellido_paterno': apellidos[0] if apellidos else '',
+            'apellido_materno': apellidos[1] if len(apellidos) > 1 else ''
+        }
+
+    @classmethod
+    def extraer(cls, mensaje_usuario, mensaje_asistente=None):
+        """
+        Extrae los datos del paciente presentes en un mensaje del usuario
+
+        Args:
+            mensaje_usuario (str): Mensaje del usuario
+            mensaje_asistente (str, optional): Mensaje anterior del asistente, usado
+                como contexto para respuestas cortas ("Juan Pérez", "35")
+
+        Returns:
+            dict: Solo los campos encontrados
+        """
+        datos = {}
+        texto = mensaje_usuario.strip()
+        pregunta = cls._pregunta(mensaje_asistente)
+
+        email = cls.EMAIL.search(texto)
+        if email:
+            datos['email'] = email.group(0).lower()
+            texto_sin_email = texto.replace(email.group(0), ' ')
+        else:
+            texto_sin_email = texto
+
+        telefono = cls._telefono(texto_sin_email)
+        if telefono:
+            datos['telefono'] = telefono
+
+        edad = cls._edad(texto)
+        if edad is None and pregunta['edad']:
+            # Respuesta a "¿Cuál es tu edad?" con solo el número
+            solo_numero = re.fullmatch(r'\D{0,12}?(\d{1,3})\D{0,12}', texto)
+            edad = int(solo_numero.group(1)) if solo_numero else None
+        if edad and 0 < edad <= 120:
+            datos['edad'] = edad
+
+        nombre = cls.NOMBRE.search(texto)
+        nombre_soy = not nombre and pregunta['nombre'] and cls.NOMBRE_SOY.search(texto)
+        if nombre:
+            datos.update(cls._separar_nombre(nombre.group(1)) or {})
+        elif nombre_soy:
+            # Un nombre dicho con "soy" queda por confirmar: uno explícito lo reemplaza
+            # y antes de crear la cita se verifica con la IA
+            campos = cls._separar_nombre(nombre_soy.group(1))
+            if campos:
+                datos.update(campos, inciertos=['nombre'])
+        elif pregunta['nombre']:
+            # Respuesta a "¿Cuál es tu nombre completo?" con el nombre solo o
+            # como primer elemento de una lista ("Ana Torres, 28 años, ...")
+            for segmento in re.split(r'[,;\n]', texto):
+                segmento = segmento.strip()
+                palabras = normalizar(segmento).split()
+                if (re.fullmatch(r"[A-Za-zÁÉÍÓÚÜÑáéíóúüñ' ]{3,80}", segmento)
+                        and 2 <= len(palabras) <= 5
+                        and not cls.NO_EN_NOMBRE.intersection(palabras)):
+                    datos.update(cls._separar_nombre(segmento) or {})
+                    break
+
+        return datos
+
+    @classmethod
+    def combinar(cls, datos, nuevos, sobrescribir=False):
+        """
+        Agrega los campos nuevos a los datos existentes
+
+        Por defecto solo se completan los campos que faltan: una captura posterior
+        (una duración, una fecha) no reemplaza un dato ya guardado. El nombre y los
+        apellidos se tratan como un solo dato: uno explícito ("me llamo ...") reemplaza
+        al anterior, y uno por confirmar (ver 'inciertos') solo completa. Con
+        sobrescribir=True prevalecen los nuevos (la extracción de la IA)
+
+        'inciertos' lista los datos que salieron de patrones poco fiables
+        """
+        combinados = dict(datos or {})
+        inciertos = set(combinados.pop('inciertos', []))
+        nuevos = dict(nuevos)
+        nuevos_inciertos = set(nuevos.pop('inciertos', []))
+        nuevos = {campo: valor for campo, valor in nuevos.items() if valor not in (None, '')}
+
+        if 'nombre' in nuevos and (sobrescribir or 'nombre' not in nuevos_inciertos):
+            # Un nombre que prevalece reemplaza también los apellidos anteriores
+            for campo in cls.CAMPOS_NOMBRE:
+                nuevos.setdefault(campo, '')
+        elif not sobrescribir and combinados.get('nombre'):
+            for campo in cls.CAMPOS_NOMBRE:
+                nuevos.pop(campo, None)
+
+        if not sobrescribir:
+            nuevos = {
+                campo: valor for campo, valor in nuevos.items()
+                if campo in cls.CAMPOS_NOMBRE or not combinados.get(campo)
+            }
+
+        if 'nombre' in nuevos:
+            inciertos.discard('nombre')
+            inciertos.update(nuevos_inciertos & {'nombre'})
+
+        combinados.update(nuevos)
+        if inciertos:
+            combinados['inciertos'] = sorted(inciertos)
+        return combinados
+
+    @classmethod
+    def campos_faltantes(cls, datos):
+        """
+        Returns:
+            list: Campos requeridos que aún no se conocen
+        """
+        datos = datos or {}
+        return [campo for campo in cls.CAMPOS_REQUERIDOS if not datos.get(campo)]
+
+    @classmethod
+    def completos(cls, datos):
+        """
+        True si están todos los campos requeridos para crear la cita y ninguno está
+        por confirmar
+        """
+        return not cls.campos_faltantes(datos) and not (datos or {}).get('inciertos')
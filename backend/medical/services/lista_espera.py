@@ -0,0 +1,279 @@
+"""
+Servicio de lista de espera
+Cuando una cita se cancela (al confirmarse la transacción, ver medical/signals.py),
+cada horario liberado se ofrece a la solicitud en espera más antigua que lo acepta:
+se aparta en Redis y se le avisa por email (vía el outbox). Cada cancelación busca con
+los índices parciales de ListaEspera; la única revisión periódica es la de las ofertas
+sin respuesta (comando expirar_lista_espera), que pasan el horario a la siguiente solicitud
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import date as dt_date, timedelta
+import logging
+
+from ..models import ListaEspera, Medico
+from .analizador import normalizar
+from .disponibilidad import PlantillaHorario, a_hora, horarios_cruzados
+from .notificaciones import NotificacionesCita
+from .outbox import RelayOutbox
+from .reservas import ReservaHorario
+
+logger = logging.getLogger(__name__)
+
+
+class ListaEsperaService:
+    """Inscripción, asignación de horarios liberados y respuesta a las ofertas"""
+
+    @staticmethod
+    def ttl_oferta():
+        """Segundos que el paciente tiene para aceptar un horario ofrecido"""
+        return settings.CITAS_CONFIG.get('lista_espera_ttl', 3600)
+
+    @staticmethod
+    def inscribir(datos_paciente, fecha_desde, fecha_hasta, motivo, medico_id=None, especialidad=None):
+        """
+        Agrega un paciente a la lista de espera de un médico o de una especialidad
+
+        Args:
+            datos_paciente (dict): Datos del paciente (ver CitaService.get_or_create_paciente)
+            fecha_desde (date): Primer día aceptable
+            fecha_hasta (date): Último día aceptable
+            motivo (str): Motivo de la cita
+            medico_id (int, optional): Médico solicitado
+            especialidad (str, optional): Especialidad, si no se pide un médico
+
+        Returns:
+            ListaEspera: Solicitud creada
+
+        Raises:
+            ValueError: Si los datos son inválidos
+        """
+        from .cita_service import CitaService
+
+        if fecha_hasta < fecha_desde or fecha_hasta < dt_date.today():
+            raise ValueError("El rango de fechas no es válido")
+
+        if medico_id:
+            if not Medico.objects.filter(id=medico_id, activo=True).exists():
+                raise ValueError("El médico no existe o no está disponible")
+            especialidad_normalizada = ''
+        elif especialidad:
+            especialidad_normalizada = normalizar(especialidad).strip()
+        else:
+            raise ValueError("Se requiere un médico o una especialidad")
+
+        paciente, _ = CitaService.get_or_create_paciente(datos_paciente)
+
+        entrada = ListaEspera.objects.create(
+            paciente=paciente,
+            medico_id=medico_id,
+            especialidad_normalizada=especialidad_normalizada,
+            fecha_desde=max(fecha_desde, dt_date.today()),
+            fecha_hasta=fecha_hasta,
+            motivo=motivo
+        )
+        logger.debug(f"Paciente {paciente.email} en lista de espera #{entrada.id}")
+        return entrada
+
+    @classmethod
+    def ofrecer_horario(cls, medico_id, fecha, hora, excluir=()):
+        """
+        Ofrece un horario liberado a la solicitud en espera más antigua que lo acepta
+        (del médico o de su especialidad), lo aparta y encola el aviso por email
+
+        Args:
+            medico_id (int): ID del médico
+            fecha (date): Fecha del horario
+            hora (time): Hora del horario
+            excluir (iterable): IDs de solicitudes que ya rechazaron este horario
+
+        Returns:
+            ListaEspera or None: Solicitud a la que se ofreció el horario
+        """
+        from .cita_service import CitaService
+
+        # El horario pudo ocuparse de nuevo antes de llegar aquí
+        disponible, _ = CitaService.validar_disponibilidad(medico_id, fecha, hora)
+        if not disponible:
+            return None
+
+        especialidad_normalizada = Medico.objects.values_list(
+            'especialidad_normalizada', flat=True
+        ).get(id=medico_id)
+
+        reserva = ReservaHorario.tomar(medico_id, fecha, hora, ttl=cls.ttl_oferta())
+        if not reserva:
+            return None
+
+        with transaction.atomic():
+            # Cada rama del OR usa su índice parcial; skip_locked evita que dos
+            # cancelaciones simultáneas esperen por la misma solicitud
+            entrada = ListaEspera.objects.select_for_update(skip_locked=True).filter(
+                Q(medico_id=medico_id) | Q(medico__isnull=True, especialidad_normalizada=especialidad_normalizada),
+                estado='ESPERANDO',
+                fecha_desde__lte=fecha,
+                fecha_hasta__gte=fecha
+            ).exclude(id__in=list(excluir)).order_by('fecha_registro').first()
+
+            if entrada is None:
+                ReservaHorario.liberar(medico_id, fecha, hora, reserva)
+                return None
+
+            entrada.estado = 'OFRECIDA'
+            entrada.medico_ofrecido_id = medico_id
+            entrada.fecha_ofrecida = fecha
+            entrada.hora_ofrecida = hora
+            entrada.reserva = reserva
+            entrada.fecha_oferta = timezone.now()
+            entrada.save()
+
+            RelayOutbox.registrar(NotificacionesCita.OFERTA_LISTA_ESPERA, [entrada.id])
+
+        logger.debug(f"Horario {fecha} {hora} del médico {medico_id} ofrecido a lista de espera #{entrada.id}")
+        return entrada
+
+    @classmethod
+    def ofrecer_horarios_liberados(cls, medico_id, fecha, hora, duracion_minutos):
+        """
+        Ofrece cada horario de la plantilla del médico que ocupaba una cita cancelada
+        (una cita de 60 minutos en una plantilla de 30 libera dos)
+
+        Returns:
+            list: Solicitudes a las que se ofreció un horario
+        """
+        horarios = PlantillaHorario.obtener(medico_id)
+        del_dia = horarios['dias'][fecha.weekday()]
+        liberados = [
+            a_hora(del_dia[indice])
+            for indice in horarios_cruzados(del_dia, horarios['duracion'], hora, duracion_minutos)
+        ]
+
+        # Sin horarios en la plantilla (el horario del médico cambió): la hora de la cita
+        ofrecidas = [cls.ofrecer_horario(medico_id, fecha, liberado) for liberado in liberados or [hora]]
+        return [entrada for entrada in ofrecidas if entrada is not None]
+
+    @classmethod
+    def _pasar_al_siguiente(cls, entrada):
+        """
+        Marca como expirada la oferta de una solicitud bloqueada y, al confirmarse la
+        transacción, ofrece el horario a la siguiente solicitud
+        """
+        medico_id, fecha, hora = entrada.medico_ofrecido_id, entrada.fecha_ofrecida, entrada.hora_ofrecida
+        ReservaHorario.liberar(medico_id, fecha, hora, entrada.reserva)
+
+        entrada.estado = 'EXPIRADA'
+        entrada.save(update_fields=['estado', 'fecha_actualizacion'])
+
+        transaction.on_commit(lambda: cls.ofrecer_horario(medico_id, fecha, hora, excluir=[entrada.id]))
+
+    @classmethod
+    def aceptar(cls, entrada_id):
+        """
+        Crea la cita del horario ofrecido
+
+        Returns:
+            tuple: (Cita or None, mensaje:str)
+        """
+        from .cita_service import CitaService
+
+        with transaction.atomic():
+            # Bloquear la solicitud: si el paciente acepta dos veces a la vez, la
+            # segunda llamada espera aquí y ve el estado que dejó la primera
+            entrada = ListaEspera.objects.select_for_update(of=('self',)).select_related('paciente').get(id=entrada_id)
+
+            if entrada.estado != 'OFRECIDA':
+                return None, "Esta solicitud no tiene un horario ofrecido"
+
+            paciente = entrada.paciente
+            datos_paciente = {
+                'nombre': paciente.nombre,
+                'apellido_paterno': paciente.apellido_paterno,
+                'apellido_materno': paciente.apellido_materno,
+                'fecha_nacimiento': paciente.fecha_nacimiento,
+                'sexo': paciente.sexo,
+                'email': paciente.email,
+                'telefono': paciente.telefono,
+            }
+            datos_cita = {
+                'medico_id': entrada.medico_ofrecido_id,
+                'fecha': entrada.fecha_ofrecida,
+                'hora': entrada.hora_ofrecida,
+                'motivo': entrada.motivo,
+                'reserva': entrada.reserva,
+            }
+
+            expirada = (timezone.now() - entrada.fecha_oferta).total_seconds() > cls.ttl_oferta()
+            try:
+                if expirada:
+                    raise ValueError("La oferta expiró")
+                with transaction.atomic():
+                    cita, _, mensaje = CitaService.crear_cita(datos_paciente, datos_cita)
+            except ValueError as e:
+                # El horario ya no se puede asignar a este paciente: pasarlo al siguiente
+                cls._pasar_al_siguiente(entrada)
+                return None, str(e)
+
+            entrada.estado = 'ASIGNADA'
+            entrada.cita = cita
+            entrada.save(update_fields=['estado', 'cita', 'fecha_actualizacion'])
+        return cita, mensaje
+
+    @classmethod
+    def rechazar(cls, entrada_id):
+        """
+        El paciente no quiere el horario ofrecido: vuelve a esperar y el horario se
+        ofrece a la siguiente solicitud
+
+        Returns:
+            tuple: (success:bool, mensaje:str)
+        """
+        with transaction.atomic():
+            entrada = ListaEspera.objects.select_for_update().get(id=entrada_id)
+
+            if entrada.estado != 'OFRECIDA':
+                return False, "Esta solicitud no tiene un horario ofrecido"
+
+            medico_id, fecha, hora = entrada.medico_ofrecido_id, entrada.fecha_ofrecida, entrada.hora_ofrecida
+            ReservaHorario.liberar(medico_id, fecha, hora, entrada.reserva)
+
+            entrada.estado = 'ESPERANDO'
+            entrada.medico_ofrecido = None
+            entrada.fecha_ofrecida = None
+            entrada.hora_ofrecida = None
+            entrada.reserva = ''
+            entrada.fecha_oferta = None
+            entrada.save()
+
+            transaction.on_commit(lambda: cls.ofrecer_horario(medico_id, fecha, hora, excluir=[entrada.id]))
+        return True, "Seguirás en la lista de espera"
+
+    @classmethod
+    def expirar_ofertas(cls, tamano=100):
+        """
+        Pasa a la siguiente solicitud los horarios ofrecidos que no se aceptaron ni
+        rechazaron dentro de ttl_oferta()
+
+        Args:
+            tamano (int): Máximo de ofertas a revisar
+
+        Returns:
+            int: Ofertas expiradas
+        """
+        limite = timezone.now() - timedelta(seconds=cls.ttl_oferta())
+
+        with transaction.atomic():
+            # skip_locked: una oferta que el paciente está aceptando en este momento
+            # se revisa en la siguiente pasada
+            entradas = list(ListaEspera.objects.select_for_update(skip_locked=True).filter(
+                estado='OFRECIDA',
+                fecha_oferta__lt=limite
+            ).order_by('fecha_oferta')[:tamano])
+
+            for entrada in entradas:
+                cls._pasar_al_siguiente(entrada)
+
+        if entradas:
+            logger.debug(f"{len(entradas)} oferta(s) de lista de espera expirada(s)")
+        return len(entradas)
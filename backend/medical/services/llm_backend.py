@@ -0,0 +1,280 @@
+"""
+Backends de modelo de lenguaje para el asistente virtual
+Permiten cambiar OpenAI por una grabación o un stub sin tocar los servicios:
+    - 'openai':    llamadas reales a la API
+    - 'grabacion': llamadas reales que además se guardan en un archivo JSONL
+    - 'replay':    respuestas leídas de la grabación (o un texto fijo) con una
+                   latencia simulada, sin red ni consumo de cuota, para pruebas de carga
+
+Se elige con settings.LLM_CONFIG['backend']
+"""
+from django.conf import settings
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from .openai_cliente import obtener_cliente_openai, obtener_cliente_openai_async
+
+logger = logging.getLogger(__name__)
+
+
+def clave_peticion(modelo, mensajes, max_tokens, temperature):
+    """Huella de una petición, usada para encontrar su respuesta en la grabación"""
+    contenido = json.dumps([modelo, mensajes, max_tokens, temperature], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(contenido.encode()).hexdigest()
+
+
+class OpenAIBackend:
+    """Llamadas reales a OpenAI con el cliente compartido del proceso"""
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+
+    def completar(self, mensajes, max_tokens, temperature):
+        """
+        Returns:
+            str: Texto de la respuesta
+        """
+        response = obtener_cliente_openai().chat.completions.create(
+            model=self.modelo,
+            messages=mensajes,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+    def completar_stream(self, mensajes, max_tokens, temperature):
+        """
+        Yields:
+            str: Fragmentos de la respuesta a medida que llegan
+        """
+        stream = obtener_cliente_openai().chat.completions.create(
+            model=self.modelo,
+            messages=mensajes,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            texto = chunk.choices[0].delta.content
+            if texto:
+                yield texto
+
+    async def completar_async(self, mensajes, max_tokens, temperature):
+        """Variante asíncrona de completar"""
+        response = await obtener_cliente_openai_async().chat.completions.create(
+            model=self.modelo,
+            messages=mensajes,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+
+class GrabacionBackend(OpenAIBackend):
+    """
+    Llama a OpenAI y agrega cada par petición/respuesta al archivo de grabaciones
+    (una línea JSON por llamada, con la latencia observada)
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, modelo, archivo):
+        super().__init__(modelo)
+        self.archivo = archivo
+
+    def _grabar(self, mensajes, max_tokens, temperature, respuesta, inicio):
+        registro = {
+            'clave': clave_peticion(self.modelo, mensajes, max_tokens, temperature),
+            'modelo': self.modelo,
+            'mensajes': mensajes,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'respuesta': respuesta,
+            'latencia_ms': round((time.monotonic() - inicio) * 1000),
+        }
+        linea = json.dumps(registro, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            with open(self.archivo, 'a', encoding='utf-8') as archivo:
+                archivo.write(linea)
+
+    def completar(self, mensajes, max_tokens, temperature):
+        inicio = time.monotonic()
+        respuesta = super().completar(mensajes, max_tokens, temperature)
+        self._grabar(mensajes, max_tokens, temperature, respuesta, inicio)
+        return respuesta
+
+    def completar_stream(self, mensajes, max_tokens, temperature):
+        inicio = time.monotonic()
+        fragmentos = []
+        for texto in super().completar_stream(mensajes, max_tokens, temperature):
+            fragmentos.append(texto)
+            yield texto
+        self._grabar(mensajes, max_tokens, temperature, ''.join(fragmentos), inicio)
+
+    async def completar_async(self, mensajes, max_tokens, temperature):
+        inicio = time.monotonic()
+        respuesta = await super().completar_async(mensajes, max_tokens, temperature)
+        self._grabar(mensajes, max_tokens, temperature, respuesta, inicio)
+        return respuesta
+
+
+class ReplayBackend:
+    """
+    Responde sin red a partir de una grabación
+
+    Busca la petición exacta; si no está, la última grabación con el mismo
+    mensaje final del usuario; y si tampoco, responde con el texto stub.
+    La latencia se simula según la distribución configurada:
+        {'distribucion': 'fija' | 'uniforme' | 'normal' | 'lognormal' | 'grabada',
+         'mediana_ms': float, 'sigma': float, 'min_ms': float, 'max_ms': float}
+    """
+
+    def __init__(self, modelo, archivo=None, respuesta_stub='', latencia=None, fraccion_primer_token=0.3):
+        self.modelo = modelo
+        self.respuesta_stub = respuesta_stub
+        self.latencia = latencia or {'distribucion': 'fija', 'mediana_ms': 0}
+        self.fraccion_primer_token = fraccion_primer_token
+        self.por_clave = {}
+        self.por_ultimo_mensaje = {}
+
+        if archivo and os.path.exists(archivo):
+            self._cargar(archivo)
+
+    def _cargar(self, archivo):
+        with open(archivo, encoding='utf-8') as lineas:
+            for linea in lineas:
+                if not linea.strip():
+                    continue
+                registro = json.loads(linea)
+                self.por_clave[registro['clave']] = registro
+
+                ultimo = self._ultimo_mensaje_usuario(registro['mensajes'])
+                if ultimo:
+                    self.por_ultimo_mensaje[ultimo] = registro
+
+        logger.debug(f"Replay LLM: {len(self.por_clave)} respuestas grabadas cargadas")
+
+    @staticmethod
+    def _ultimo_mensaje_usuario(mensajes):
+        for mensaje in reversed(mensajes):
+            if mensaje['role'] == 'user':
+                return mensaje['content'].strip().lower()
+        return None
+
+    def _buscar(self, mensajes, max_tokens, temperature):
+        """
+        Returns:
+            tuple: (respuesta:str, latencia_grabada_ms:float or None)
+        """
+        registro = self.por_clave.get(clave_peticion(self.modelo, mensajes, max_tokens, temperature))
+
+        if registro is None:
+            registro = self.por_ultimo_mensaje.get(self._ultimo_mensaje_usuario(mensajes))
+
+        if registro is None:
+            return self.respuesta_stub, None
+        return registro['respuesta'], registro.get('latencia_ms')
+
+    def _muestrear_latencia(self, latencia_grabada=None):
+        """
+        Returns:
+            float: Segundos de espera simulada
+        """
+        config = self.latencia
+        distribucion = config.get('distribucion', 'fija')
+        mediana = config.get('mediana_ms', 0)
+        sigma = config.get('sigma', 0.5)
+
+        if distribucion == 'grabada' and latencia_grabada is not None:
+            milisegundos = latencia_grabada
+        elif distribucion == 'uniforme':
+            milisegundos = random.uniform(config.get('min_ms', 0), config.get('max_ms', 2 * mediana))
+        elif distribucion == 'normal':
+            milisegundos = random.gauss(mediana, sigma * mediana)
+        elif distribucion == 'lognormal':
+            milisegundos = random.lognormvariate(0, sigma) * mediana
+        else:
+            milisegundos = mediana
+
+        milisegundos = max(config.get('min_ms', 0), min(milisegundos, config.get('max_ms', milisegundos)))
+        return milisegundos / 1000
+
+    @staticmethod
+    def _fragmentar(texto):
+        """Divide la respuesta en fragmentos del tamaño de unas pocas palabras"""
+        palabras = texto.split(' ')
+        return [' '.join(palabras[i:i + 3]) + (' ' if i + 3 < len(palabras) else '')
+                for i in range(0, len(palabras), 3)]
+
+    def completar(self, mensajes, max_tokens, temperature):
+        respuesta, latencia_grabada = self._buscar(mensajes, max_tokens, temperature)
+        time.sleep(self._muestrear_latencia(latencia_grabada))
+        return respuesta
+
+    def completar_stream(self, mensajes, max_tokens, temperature):
+        respuesta, latencia_grabada = self._buscar(mensajes, max_tokens, temperature)
+        espera = self._muestrear_latencia(latencia_grabada)
+        fragmentos = self._fragmentar(respuesta)
+
+        # Una parte de la latencia antes del primer fragmento y el resto repartida
+        time.sleep(espera * self.fraccion_primer_token)
+        pausa = espera * (1 - self.fraccion_primer_token) / max(len(fragmentos), 1)
+
+        for fragmento in fragmentos:
+            yield fragmento
+            time.sleep(pausa)
+
+    async def completar_async(self, mensajes, max_tokens, temperature):
+        respuesta, latencia_grabada = self._buscar(mensajes, max_tokens, temperature)
+        await asyncio.sleep(self._muestrear_latencia(latencia_grabada))
+        return respuesta
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def obtener_backend_llm():
+    """
+    Retorna el backend configurado en settings.LLM_CONFIG (uno por proceso)
+
+    Raises:
+        ValueError: Si el backend configurado no existe
+    """
+    global _backend
+
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'LLM_CONFIG', {})
+                tipo = config.get('backend', 'openai')
+                modelo = settings.OPENAI_MODEL
+
+                if tipo == 'openai':
+                    _backend = OpenAIBackend(modelo)
+                elif tipo == 'grabacion':
+                    _backend = GrabacionBackend(modelo, config['archivo_grabaciones'])
+                elif tipo == 'replay':
+                    _backend = ReplayBackend(
+                        modelo,
+                        archivo=config.get('archivo_grabaciones'),
+                        respuesta_stub=config.get('respuesta_stub', ''),
+                        latencia=config.get('latencia'),
+                        fraccion_primer_token=config.get('fraccion_primer_token', 0.3),
+                    )
+                else:
+                    raise ValueError(f"Backend de LLM desconocido: {tipo}")
+
+                logger.debug(f"Backend de LLM: {tipo}")
+
+    return _backend
@@ -0,0 +1,294 @@
+"""
+Cola de notificaciones por email en Redis Streams
+Los servicios no encolan directamente: registran el evento en el outbox (ver
+outbox.py), que lo publica aquí. El PDF y la llamada a la API de email los hace el
+worker (python manage.py procesar_notificaciones), con
+reintentos por reentrega y una lista acotada de mensajes fallidos (dead-letter)
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, ResponseError
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class NotificacionesCita:
+    """
+    Estructura en Redis:
+        notificaciones -> STREAM con un mensaje {tipo, objeto_id} por email pendiente,
+            leído por el grupo de consumidores 'trabajadores'
+        notificaciones:fallidas -> LIST con los últimos mensajes que agotaron sus
+            reintentos (JSON, hasta CITAS_CONFIG['max_notificaciones_fallidas'])
+    """
+
+    GRUPO = 'trabajadores'
+
+    CONFIRMACION_CITA = 'confirmacion_cita'
+    CANCELACION_CITA = 'cancelacion_cita'
+    OFERTA_LISTA_ESPERA = 'oferta_lista_espera'
+
+    @staticmethod
+    def _redis():
+        return get_redis_connection('default')
+
+    @staticmethod
+    def clave_stream():
+        return cache.make_key('notificaciones')
+
+    @staticmethod
+    def clave_fallidas():
+        return cache.make_key('notificaciones:fallidas')
+
+    @classmethod
+    def encolar(cls, tipo, objeto_ids):
+        """
+        Agrega un mensaje al stream por cada objeto (un solo viaje a Redis)
+
+        Args:
+            tipo (str): CONFIRMACION_CITA, CANCELACION_CITA u OFERTA_LISTA_ESPERA
+            objeto_ids (list): IDs de objetos ya confirmados en la base de datos
+
+        Returns:
+            int: Cantidad de notificaciones encoladas
+        """
+        pipe = cls._redis().pipeline(transaction=False)
+        for objeto_id in objeto_ids:
+            pipe.xadd(cls.clave_stream(), {'tipo': tipo, 'objeto_id': objeto_id})
+        pipe.execute()
+
+        logger.debug(f"{len(objeto_ids)} notificación(es) '{tipo}' encolada(s)")
+        return len(objeto_ids)
+
+    @classmethod
+    def enviar(cls, tipo, objeto_id):
+        """
+        Envía una notificación (lo llama el worker)
+
+        Returns:
+            dict: Resultado de EmailService ({'exito': bool, 'mensaje': str, ...})
+
+        Raises:
+            ObjectDoesNotExist: Si el objeto ya no existe
+            ValueError: Si el tipo no existe
+        """
+        from ..models import Cita, ListaEspera
+        from .email_service import EmailService
+
+        if tipo == cls.CONFIRMACION_CITA:
+            cita = Cita.objects.select_related('paciente', 'medico').get(id=objeto_id)
+            return EmailService().enviar_confirmacion_cita(cita)
+        if tipo == cls.CANCELACION_CITA:
+            cita = Cita.objects.select_related('paciente', 'medico').get(id=objeto_id)
+            return EmailService().enviar_cancelacion_cita(cita)
+        if tipo == cls.OFERTA_LISTA_ESPERA:
+            entrada = ListaEspera.objects.select_related('paciente', 'medico_ofrecido').get(id=objeto_id)
+            return EmailService().enviar_oferta_lista_espera(entrada)
+        raise ValueError(f"Tipo de notificación desconocido: {tipo}")
+
+    @classmethod
+    def fallidas(cls, limite=100):
+        """Últimos mensajes que agotaron sus reintentos"""
+        return [json.loads(m) for m in cls._redis().lrange(cls.clave_fallidas(), 0, limite - 1)]
+
+
+class TrabajadorNotificaciones:
+    """
+    Consumidor del stream de notificaciones
+
+    Lee los mensajes en lotes de 'concurrencia' y hace un intento de envío por
+    mensaje en un pool de hilos. Un envío fallido no se confirma: queda pendiente a
+    nombre del consumidor REINTENTOS y se vuelve a entregar cuando vence su espera
+    (que se duplica en cada intento), sin dormir el hilo. Al agotar los reintentos
+    se guarda en notificaciones:fallidas. Los mensajes que un worker caído dejó sin
+    confirmar se reclaman después de 'inactividad_ms'
+    """
+
+    # Consumidor sin worker que retiene los mensajes a la espera de un reintento
+    REINTENTOS = 'reintentos'
+
+    # Pendientes de reintento que se revisan en cada lectura
+    LOTE_REINTENTOS = 100
+
+    def __init__(self, consumidor, concurrencia=None, reintentos=None, espera_reintento=2, inactividad_ms=5 * 60 * 1000):
+        """
+        Args:
+            consumidor (str): Nombre único del worker dentro del grupo
+            concurrencia (int, optional): Hilos que envían en paralelo
+            reintentos (int, optional): Intentos por mensaje antes de descartarlo
+            espera_reintento (float): Segundos antes del primer reintento (se duplica)
+            inactividad_ms (int): Tiempo sin confirmar tras el que un mensaje se reclama
+        """
+        self.consumidor = consumidor
+        self.concurrencia = concurrencia or settings.CITAS_CONFIG.get('hilos_notificaciones', 4)
+        self.reintentos = reintentos or settings.CITAS_CONFIG.get('reintentos_notificaciones', 3)
+        self.espera_reintento = espera_reintento
+        self.inactividad_ms = inactividad_ms
+        self.max_fallidas = settings.CITAS_CONFIG.get('max_notificaciones_fallidas', 1000)
+        self.redis = NotificacionesCita._redis()
+        self.stream = NotificacionesCita.clave_stream()
+
+    def _asegurar_grupo(self):
+        try:
+            self.redis.xgroup_create(self.stream, NotificacionesCita.GRUPO, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def _espera_ms(self, intento):
+        """Milisegundos que espera un mensaje tras fallar su intento número 'intento'"""
+        return int(self.espera_reintento * 1000 * 2 ** (intento - 1))
+
+    def _leer_reintentos(self):
+        """Reclama los mensajes cuya espera de reintento ya venció"""
+        pendientes = self.redis.xpending_range(
+            self.stream, NotificacionesCita.GRUPO, min='-', max='+', count=self.LOTE_REINTENTOS,
+            consumername=self.REINTENTOS, idle=self._espera_ms(1)
+        )
+        # XCLAIM no incrementa las entregas al retener (JUSTID): times_delivered es
+        # el número de intentos ya hechos
+        vencidos = [
+            pendiente for pendiente in pendientes
+            if pendiente['time_since_delivered'] >= self._espera_ms(pendiente['times_delivered'])
+        ][:self.concurrencia]
+        if not vencidos:
+            return []
+
+        # min_idle_time: si otro worker lo reclamó primero, su espera se reinició y no se toma
+        pipe = self.redis.pipeline(transaction=False)
+        for pendiente in vencidos:
+            pipe.xclaim(
+                self.stream, NotificacionesCita.GRUPO, self.consumidor,
+                min_idle_time=self._espera_ms(pendiente['times_delivered']),
+                message_ids=[pendiente['message_id']]
+            )
+        return [
+            (mensaje_id, campos, pendiente['times_delivered'] + 1)
+            for pendiente, reclamados in zip(vencidos, pipe.execute())
+            for mensaje_id, campos in reclamados if campos
+        ]
+
+    def _leer(self, bloqueo_ms):
+        """
+        Returns:
+            list: Tuplas (mensaje_id, campos, intento) a procesar
+        """
+        reintentos = self._leer_reintentos()
+        if reintentos:
+            return reintentos
+
+        # Luego los mensajes abandonados por otros workers
+        _, reclamados, _ = self.redis.xautoclaim(
+            self.stream, NotificacionesCita.GRUPO, self.consumidor,
+            min_idle_time=self.inactividad_ms, start_id='0-0', count=self.concurrencia
+        )
+        reclamados = [(mensaje_id, campos) for mensaje_id, campos in reclamados if campos]
+        if reclamados:
+            pipe = self.redis.pipeline(transaction=False)
+            for mensaje_id, _ in reclamados:
+                pipe.xpending_range(self.stream, NotificacionesCita.GRUPO, min=mensaje_id, max=mensaje_id, count=1)
+            return [
+                (mensaje_id, campos, pendiente[0]['times_delivered'] if pendiente else 1)
+                for (mensaje_id, campos), pendiente in zip(reclamados, pipe.execute())
+            ]
+
+        respuesta = self.redis.xreadgroup(
+            NotificacionesCita.GRUPO, self.consumidor, {self.stream: '>'},
+            count=self.concurrencia, block=bloqueo_ms
+        )
+        return [(mensaje_id, campos, 1) for mensaje_id, campos in respuesta[0][1]] if respuesta else []
+
+    def procesar(self, mensaje_id, campos, intento=1):
+        """
+        Hace un intento de envío y, según el resultado, confirma el mensaje (ACK), lo
+        retiene para un reintento o lo pasa a notificaciones:fallidas
+
+        Returns:
+            bool or None: True si se envió, False si se descartó, None si sigue pendiente
+        """
+        tipo = campos[b'tipo'].decode()
+        objeto_id = int(campos[b'objeto_id'])
+        definitivo = False
+
+        # Cada hilo usa su propia conexión a la base de datos
+        close_old_connections()
+        try:
+            resultado = NotificacionesCita.enviar(tipo, objeto_id)
+            error = None if resultado['exito'] else resultado['mensaje']
+        except (ObjectDoesNotExist, ValueError) as e:
+            # Reintentar no lo va a arreglar
+            error = str(e)
+            definitivo = True
+        except Exception as e:
+            error = str(e)
+        finally:
+            close_old_connections()
+
+        try:
+            if error and not definitivo and intento < self.reintentos:
+                logger.warning(f"Notificación {tipo} #{objeto_id} falló (intento {intento}): {error}")
+                self.redis.xclaim(
+                    self.stream, NotificacionesCita.GRUPO, self.REINTENTOS,
+                    min_idle_time=0, message_ids=[mensaje_id], justid=True
+                )
+                return None
+
+            pipe = self.redis.pipeline(transaction=True)
+            if error:
+                logger.error(f"Notificación {tipo} #{objeto_id} descartada: {error}")
+                pipe.lpush(NotificacionesCita.clave_fallidas(), json.dumps({
+                    'mensaje_id': mensaje_id.decode(),
+                    'tipo': tipo,
+                    'objeto_id': objeto_id,
+                    'error': error,
+                    'fecha': timezone.now().isoformat(),
+                }))
+                pipe.ltrim(NotificacionesCita.clave_fallidas(), 0, self.max_fallidas - 1)
+            pipe.xack(self.stream, NotificacionesCita.GRUPO, mensaje_id)
+            pipe.xdel(self.stream, mensaje_id)
+            pipe.execute()
+        except RedisError as e:
+            # Sin ACK el mensaje sigue pendiente de este worker: se reclama tras inactividad_ms
+            logger.error(f"Notificación {tipo} #{objeto_id} sin confirmar por un error de Redis: {e}")
+            return None
+
+        return error is None
+
+    def ejecutar(self, una_vez=False, bloqueo_ms=5000):
+        """
+        Procesa mensajes hasta que se interrumpa (o hasta vaciar la cola si una_vez)
+
+        Returns:
+            dict: {'enviadas': int, 'fallidas': int, 'pendientes': int}
+        """
+        self._asegurar_grupo()
+        totales = {'enviadas': 0, 'fallidas': 0, 'pendientes': 0}
+        claves = {True: 'enviadas', False: 'fallidas', None: 'pendientes'}
+
+        with ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix='notificaciones') as pool:
+            while True:
+                try:
+                    mensajes = self._leer(100 if una_vez else bloqueo_ms)
+                except RedisError as e:
+                    if una_vez:
+                        raise
+                    logger.error(f"No se pudo leer la cola de notificaciones: {e}")
+                    time.sleep(self.espera_reintento)
+                    continue
+
+                if not mensajes:
+                    if una_vez:
+                        break
+                    continue
+
+                for resultado in pool.map(lambda mensaje: self.procesar(*mensaje), mensajes):
+                    totales[claves[resultado]] += 1
+
+        return totales
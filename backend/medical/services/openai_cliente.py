@@ -0,0 +1,106 @@
+"""
+Clientes de OpenAI compartidos por proceso
+Crear un OpenAI(...) por petición abre un pool HTTP nuevo y obliga a repetir el
+handshake TLS con la API en cada turno del chat. Aquí se crea un único cliente
+por proceso (y uno asíncrono por event loop) con conexiones keep-alive
+"""
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI
+import asyncio
+import httpx
+import os
+import threading
+import weakref
+
+
+_lock = threading.Lock()
+_cliente = None
+_pid_cliente = None
+
+# Los clientes asíncronos no se pueden compartir entre event loops
+_clientes_async = weakref.WeakKeyDictionary()
+
+
+def _configuracion():
+    """Límites del pool y timeouts (settings.OPENAI_CLIENT_CONFIG)"""
+    config = getattr(settings, 'OPENAI_CLIENT_CONFIG', {})
+
+    limites = httpx.Limits(
+        max_connections=config.get('max_connections', 20),
+        max_keepalive_connections=config.get('max_keepalive_connections', 10),
+        keepalive_expiry=config.get('keepalive_expiry', 60),
+    )
+    timeout = httpx.Timeout(
+        config.get('timeout', 60),
+        connect=config.get('connect_timeout', 5),
+    )
+
+    return limites, timeout, config.get('max_retries', 2)
+
+
+def obtener_cliente_openai():
+    """
+    Retorna el cliente síncrono del proceso, creándolo la primera vez
+
+    Es seguro entre hilos (el cliente de OpenAI y su pool httpx lo son) y tras un
+    fork: si el PID cambió, el proceso hijo crea su propio cliente en lugar de
+    reutilizar los sockets heredados del padre
+    """
+    global _cliente, _pid_cliente
+
+    pid = os.getpid()
+    if _cliente is None or _pid_cliente != pid:
+        with _lock:
+            if _cliente is None or _pid_cliente != pid:
+                limites, timeout, max_retries = _configuracion()
+                _cliente = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    timeout=timeout,
+                    max_retries=max_retries,
+                    http_client=httpx.Client(limits=limites, timeout=timeout),
+                )
+                _pid_cliente = pid
+
+    return _cliente
+
+
+def obtener_cliente_openai_async():
+    """Retorna el cliente AsyncOpenAI del event loop actual, creándolo si no existe"""
+    loop = asyncio.get_running_loop()
+    cliente = _clientes_async.get(loop)
+
+    if cliente is None:
+        limites, timeout, max_retries = _configuracion()
+        cliente = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=httpx.AsyncClient(limits=limites, timeout=timeout),
+        )
+        _clientes_async[loop] = cliente
+
+    return cliente
+
+
+async def cerrar_cliente_openai_async():
+    """
+    Cierra el cliente AsyncOpenAI del event loop actual (si existe)
+    Para loops de una sola petición, que de otro modo dejarían su pool abierto
+    """
+    cliente = _clientes_async.pop(asyncio.get_running_loop(), None)
+    if cliente is not None:
+        await cliente.close()
+
+
+def _reiniciar_tras_fork():
+    """En el proceso hijo se descartan los clientes (y el lock) heredados del padre"""
+    global _lock, _cliente, _pid_cliente, _clientes_async
+
+    _lock = threading.Lock()
+    _cliente = None
+    _pid_cliente = None
+    _clientes_async = weakref.WeakKeyDictionary()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_tras_fork)
@@ -0,0 +1,70 @@
+"""
+Outbox transaccional de notificaciones
+Los servicios registran el evento en la base de datos dentro de su transacción
+(registrar) y el relay lo publica en la cola de Redis (ver notificaciones.py). Si el
+proceso cae entre el commit y la publicación, el evento sigue en la tabla y lo
+publica el siguiente relay: cada notificación se entrega al menos una vez
+"""
+from django.db import transaction
+import logging
+
+from ..models import EventoOutbox
+from .notificaciones import NotificacionesCita
+
+logger = logging.getLogger(__name__)
+
+
+class RelayOutbox:
+    """Registro y publicación de los eventos de EventoOutbox"""
+
+    @classmethod
+    def registrar(cls, tipo, objeto_ids):
+        """
+        Guarda los eventos en la transacción actual y, al confirmarse, intenta
+        publicarlos de inmediato (si falla, quedan para el relay)
+
+        Args:
+            tipo (str): Tipo de notificación (ver NotificacionesCita)
+            objeto_ids (list): IDs de los objetos
+        """
+        EventoOutbox.objects.bulk_create([
+            EventoOutbox(tipo=tipo, objeto_id=objeto_id) for objeto_id in objeto_ids
+        ])
+        transaction.on_commit(cls._publicar_al_confirmar)
+
+    @classmethod
+    def _publicar_al_confirmar(cls):
+        try:
+            cls.publicar_lote()
+        except Exception as e:
+            logger.warning(f"Outbox: publicación diferida al relay ({str(e)})")
+
+    @staticmethod
+    def publicar_lote(tamano=100):
+        """
+        Publica y borra un lote de eventos pendientes
+
+        SKIP LOCKED permite correr varios relays (y las publicaciones inmediatas de
+        registrar) en paralelo sin que dos tomen el mismo evento. Los eventos se
+        encolan antes del commit: si este falla se volverán a publicar (al menos
+        una vez, nunca cero)
+
+        Returns:
+            int: Cantidad de eventos publicados
+        """
+        with transaction.atomic():
+            eventos = list(
+                EventoOutbox.objects.select_for_update(skip_locked=True).order_by('id')[:tamano]
+            )
+            if not eventos:
+                return 0
+
+            por_tipo = {}
+            for evento in eventos:
+                por_tipo.setdefault(evento.tipo, []).append(evento.objeto_id)
+            for tipo, objeto_ids in por_tipo.items():
+                NotificacionesCita.encolar(tipo, objeto_ids)
+
+            EventoOutbox.objects.filter(id__in=[evento.id for evento in eventos]).delete()
+
+        return len(eventos)
@@ -0,0 +1,248 @@
+"""
+Renderer rápido del PDF de confirmación de cita
+La parte fija de la página (título, encabezados, etiquetas, instrucciones y líneas) se
+convierte una sola vez por proceso en operadores PDF que se copian tal cual en cada
+documento; por cada cita solo se escriben los datos variables, en un único objeto de
+texto y sin el motor de maquetación de platypus
+"""
+from io import BytesIO
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.rl_accel import fp_str
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from datetime import datetime
+
+
+COLOR_TEXTO = colors.HexColor('#2c3e50')
+COLOR_SUBTITULO = colors.HexColor('#34495e')
+COLOR_PIE = colors.HexColor('#7f8c8d')
+COLOR_LINEA = colors.HexColor('#bdc3c7')
+COLORES_ESTADO = {
+    'AGENDADA': colors.HexColor('#27ae60'),
+    'COMPLETADA': colors.HexColor('#3498db'),
+    'CANCELADA': colors.HexColor('#e74c3c'),
+    'EXPIRADA': colors.HexColor('#95a5a6'),
+}
+
+ANCHO, ALTO = letter
+MARGEN = 72
+X_ETIQUETA = MARGEN + 6
+X_VALOR = MARGEN + 150
+ANCHO_VALOR = ANCHO - MARGEN - X_VALOR
+ANCHO_TEXTO = ANCHO - 2 * MARGEN
+FILA = 18
+LINEAS_TEXTO = 3
+INTERLINEADO = 14
+
+# Posición vertical (línea base) de cada bloque
+Y_TITULO = 700
+Y_ESTADO = 670
+Y_DETALLES = 635
+Y_MEDICO = 510
+Y_PACIENTE = 367
+Y_MOTIVO = 260
+Y_SINTOMAS = 187
+Y_INSTRUCCIONES = 110
+Y_PIE = 34
+
+ETIQUETAS_CITA = ['Fecha:', 'Hora:', 'Duración:', 'Consultorio:', 'Tipo:']
+ETIQUETAS_MEDICO = ['Nombre:', 'Especialidad:', 'Cédula Profesional:', 'Teléfono:', 'Email:']
+ETIQUETAS_PACIENTE = ['Nombre:', 'Edad:', 'Email:', 'Teléfono:']
+
+INSTRUCCIONES = [
+    "• Llegue 15 minutos antes de su cita",
+    "• Traiga su identificación oficial",
+    "• Traiga estudios médicos previos (si los tiene)",
+    "• Si necesita cancelar, hágalo con al menos 24 horas de anticipación",
+]
+
+
+def _filas(y_subtitulo, cantidad):
+    """Líneas base de las filas de una tabla bajo su subtítulo"""
+    return [y_subtitulo - 23 - i * FILA for i in range(cantidad)]
+
+
+class PlantillaPDFCita:
+    """
+    PDF de una página con posiciones fijas
+
+    Las filas del médico reservan un lugar para la sub-especialidad. Si un dato no
+    cabe en su lugar (un email muy largo, un motivo de más de tres líneas) generar
+    devuelve None y PDFService usa el renderer de platypus, que sí pagina
+    """
+
+    _plantilla = None
+
+    @staticmethod
+    def operaciones_fijas():
+        """
+        Returns:
+            list: Parte fija de la página, como tuplas
+                ('texto', fuente, tamaño, color, x, y, texto, centrado) y
+                ('linea', color, x1, y1, x2, y2)
+        """
+        operaciones = [('texto', 'Helvetica-Bold', 24, COLOR_TEXTO, ANCHO / 2, Y_TITULO, "CONFIRMACIÓN DE CITA MÉDICA", True)]
+        operaciones.append(('linea', COLOR_LINEA, MARGEN, Y_TITULO - 14, ANCHO - MARGEN, Y_TITULO - 14))
+
+        secciones = [
+            (Y_DETALLES, "DETALLES DE LA CITA", ETIQUETAS_CITA),
+            (Y_MEDICO, "MÉDICO TRATANTE", ETIQUETAS_MEDICO[:2] + [None] + ETIQUETAS_MEDICO[2:]),
+            (Y_PACIENTE, "PACIENTE", ETIQUETAS_PACIENTE),
+            (Y_INSTRUCCIONES, "INSTRUCCIONES", []),
+        ]
+        for y, subtitulo, etiquetas in secciones:
+            operaciones.append(('texto', 'Helvetica-Bold', 16, COLOR_SUBTITULO, MARGEN, y, subtitulo, False))
+            operaciones.append(('linea', COLOR_LINEA, MARGEN, y - 6, ANCHO - MARGEN, y - 6))
+            for etiqueta, y_fila in zip(etiquetas, _filas(y, len(etiquetas))):
+                if etiqueta:
+                    operaciones.append(('texto', 'Helvetica-Bold', 11, COLOR_TEXTO, X_ETIQUETA, y_fila, etiqueta, False))
+
+        for i, instruccion in enumerate(INSTRUCCIONES):
+            operaciones.append(('texto', 'Helvetica', 11, COLOR_TEXTO, MARGEN, Y_INSTRUCCIONES - 18 - i * INTERLINEADO, instruccion, False))
+
+        return operaciones
+
+    @staticmethod
+    def _nuevo_lienzo(buffer):
+        lienzo = canvas.Canvas(buffer, pagesize=letter, pageCompression=0)
+        # Helvetica (la fuente inicial del canvas) queda como /F1 y Helvetica-Bold
+        # como /F2 en todos los documentos, así los operadores de la plantilla
+        # sirven para cualquiera de ellos
+        lienzo.setFont('Helvetica-Bold', 11)
+        return lienzo
+
+    @staticmethod
+    def _escribir(objeto_texto, operaciones):
+        """Agrega las operaciones de texto a un objeto de texto del canvas"""
+        for _, fuente, tamano, color, x, y, texto, centrado in operaciones:
+            if centrado:
+                x -= stringWidth(texto, fuente, tamano) / 2
+            objeto_texto.setFont(fuente, tamano)
+            objeto_texto.setFillColor(color)
+            objeto_texto.setTextOrigin(x, y)
+            objeto_texto.textOut(texto)
+
+    @classmethod
+    def plantilla(cls):
+        """
+        Operadores PDF de la parte fija, generados la primera vez que se usan en el
+        proceso
+
+        Returns:
+            str: Contenido para Canvas.addLiteral
+        """
+        if cls._plantilla is not None:
+            return cls._plantilla
+
+        operaciones = cls.operaciones_fijas()
+        lienzo = cls._nuevo_lienzo(BytesIO())
+        objeto_texto = lienzo.beginText()
+        cls._escribir(objeto_texto, [op for op in operaciones if op[0] == 'texto'])
+
+        codigo = [objeto_texto.getCode()]
+        for _, color, x1, y1, x2, y2 in (op for op in operaciones if op[0] == 'linea'):
+            codigo.append(f"{fp_str(*color.rgb())} RG {fp_str(x1, y1)} m {fp_str(x2, y2)} l S")
+
+        cls._plantilla = ' '.join(codigo)
+        return cls._plantilla
+
+    @staticmethod
+    def operaciones_variables(cita):
+        """
+        Datos de la cita ubicados en la plantilla
+
+        Returns:
+            list or None: Operaciones (ver operaciones_fijas), o None si algún dato
+                no cabe en su lugar
+        """
+        operaciones = [(
+            'texto', 'Helvetica-Bold', 14, COLORES_ESTADO.get(cita.estado, colors.black),
+            ANCHO / 2, Y_ESTADO, f"Estado: {cita.get_estado_display()}", True
+        )]
+
+        medico = cita.medico
+        paciente = cita.paciente
+        valores = [
+            (Y_DETALLES, [
+                cita.fecha.strftime('%d de %B de %Y'),
+                cita.hora.strftime('%H:%M'),
+                f'{cita.duracion_minutos} minutos',
+                cita.consultorio,
+                cita.get_tipo_consulta_display(),
+            ]),
+            (Y_MEDICO, [
+                medico.nombre_completo(),
+                medico.especialidad,
+                medico.sub_especialidad,
+                medico.cedula_profesional,
+                medico.telefono,
+                medico.email,
+            ]),
+            (Y_PACIENTE, [
+                f"{paciente.nombre} {paciente.apellido_paterno}",
+                f"{paciente.edad()} años",
+                paciente.email,
+                paciente.telefono,
+            ]),
+        ]
+        for y, datos in valores:
+            for valor, y_fila in zip(datos, _filas(y, len(datos))):
+                if not valor:
+                    continue
+                valor = str(valor)
+                if stringWidth(valor, 'Helvetica', 11) > ANCHO_VALOR:
+                    return None
+                operaciones.append(('texto', 'Helvetica', 11, COLOR_TEXTO, X_VALOR, y_fila, valor, False))
+
+        if medico.sub_especialidad:
+            y_fila = _filas(Y_MEDICO, 3)[2]
+            operaciones.append(('texto', 'Helvetica-Bold', 11, COLOR_TEXTO, X_ETIQUETA, y_fila, 'Sub-especialidad:', False))
+
+        for y, subtitulo, texto in [
+            (Y_MOTIVO, "MOTIVO DE CONSULTA", cita.motivo),
+            (Y_SINTOMAS, "SÍNTOMAS MENCIONADOS", cita.sintomas_iniciales),
+        ]:
+            if not texto:
+                continue
+            lineas = simpleSplit(texto, 'Helvetica', 11, ANCHO_TEXTO)
+            if len(lineas) > LINEAS_TEXTO:
+                return None
+            operaciones.append(('texto', 'Helvetica-Bold', 16, COLOR_SUBTITULO, MARGEN, y, subtitulo, False))
+            for i, linea in enumerate(lineas):
+                operaciones.append(('texto', 'Helvetica', 11, COLOR_TEXTO, MARGEN, y - 20 - i * INTERLINEADO, linea, False))
+
+        fecha_generacion = datetime.now().strftime('%d/%m/%Y %H:%M')
+        operaciones.append(('texto', 'Helvetica', 9, COLOR_PIE, ANCHO / 2, Y_PIE, f"Documento generado el {fecha_generacion}", True))
+        operaciones.append(('texto', 'Helvetica', 9, COLOR_PIE, ANCHO / 2, Y_PIE - 11, f"ID de Cita: {cita.id}", True))
+        return operaciones
+
+    @classmethod
+    def generar(cls, cita):
+        """
+        Genera el PDF de la cita sobre la plantilla
+
+        Args:
+            cita (Cita): Instancia del modelo Cita (con paciente y medico)
+
+        Returns:
+            BytesIO or None: Buffer con el PDF, o None si la cita no cabe en la plantilla
+        """
+        variables = cls.operaciones_variables(cita)
+        if variables is None:
+            return None
+
+        buffer = BytesIO()
+        lienzo = cls._nuevo_lienzo(buffer)
+        lienzo.setTitle(f"Cita {cita.id}")
+        lienzo.addLiteral(cls.plantilla())
+
+        objeto_texto = lienzo.beginText()
+        cls._escribir(objeto_texto, variables)
+        lienzo.drawText(objeto_texto)
+        lienzo.showPage()
+        lienzo.save()
+
+        buffer.seek(0)
+        return buffer
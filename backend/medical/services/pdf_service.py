@@ -1,6 +1,9 @@
 """
 Servicio para generación de PDFs de citas médicas
 """
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -9,17 +12,47 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from datetime import datetime
+import logging
+
+from .pdf_plantilla import PlantillaPDFCita
+
+logger = logging.getLogger(__name__)
 
 
 class PDFService:
     """
     Servicio para generar PDFs profesionales de citas médicas
+    
+    Los PDFs generados se guardan en el storage (MEDIA_ROOT) como
+    citas_pdf/<cita_id>/<version>.pdf, donde la versión sale de fecha_actualizacion:
+    solo se vuelven a generar cuando la cita cambia
     """
     
+    CARPETA_PDFS = 'citas_pdf'
+    
+    @classmethod
+    def generar_pdf_cita(cls, cita):
+        """
+        Genera el PDF de una cita con el renderer de CITAS_CONFIG['pdf_renderer']:
+        'plantilla' (rápido, una página fija; si la cita no cabe se usa platypus) o
+        'platypus'
+        
+        Args:
+            cita (Cita): Instancia del modelo Cita
+        
+        Returns:
+            BytesIO: Buffer con el PDF generado
+        """
+        if settings.CITAS_CONFIG.get('pdf_renderer', 'plantilla') == 'plantilla':
+            buffer = PlantillaPDFCita.generar(cita)
+            if buffer is not None:
+                return buffer
+        return cls.generar_pdf_cita_platypus(cita)
+    
     @staticmethod
-    def generar_pdf_cita(cita):
+    def generar_pdf_cita_platypus(cita):
         """
-        Genera un PDF con los detalles de una cita médica
+        Genera un PDF con los detalles de una cita médica (maquetado con platypus)
         
         Args:
             cita (Cita): Instancia del modelo Cita
@@ -273,3 +306,78 @@ class PDFService:
         paciente_nombre = paciente_nombre.replace(' ', '_')
         
         return f"cita_{fecha_str}_{paciente_nombre}_{cita.id}.pdf"
+    
+    @classmethod
+    def ruta_pdf_cita(cls, cita):
+        """
+        Ruta en el storage del PDF de la versión actual de la cita
+        
+        Args:
+            cita (Cita): Instancia del modelo Cita (con paciente y medico)
+        
+        Returns:
+            str: Ruta relativa a MEDIA_ROOT
+        """
+        # El PDF también muestra datos del paciente y del médico: la versión es la
+        # última modificación de cualquiera de los tres
+        version = max(
+            cita.fecha_actualizacion,
+            cita.paciente.fecha_actualizacion,
+            cita.medico.fecha_actualizacion
+        ).strftime('%Y%m%d%H%M%S%f')
+        return f"{cls.CARPETA_PDFS}/{cita.id}/{version}.pdf"
+    
+    @classmethod
+    def obtener_pdf_cita(cls, cita):
+        """
+        Devuelve el PDF guardado de la cita, generándolo solo si no existe para su
+        versión actual (y borrando las versiones anteriores)
+        
+        Args:
+            cita (Cita): Instancia del modelo Cita (con paciente y medico)
+        
+        Returns:
+            str: Ruta del PDF en el storage
+        """
+        ruta = cls.ruta_pdf_cita(cita)
+        if default_storage.exists(ruta):
+            return ruta
+        
+        guardada = default_storage.save(ruta, ContentFile(cls.generar_pdf_cita(cita).getvalue()))
+        if guardada != ruta:
+            # Otra petición lo generó al mismo tiempo: el storage renombró la copia
+            default_storage.delete(guardada)
+            return ruta
+        
+        logger.debug(f"PDF de la cita #{cita.id} generado en {ruta}")
+        cls.borrar_pdfs_cita(cita.id, conservar=ruta)
+        return ruta
+    
+    @classmethod
+    def leer_pdf_cita(cls, cita):
+        """
+        Returns:
+            bytes: Contenido del PDF de la cita (ver obtener_pdf_cita)
+        """
+        with default_storage.open(cls.obtener_pdf_cita(cita), 'rb') as archivo:
+            return archivo.read()
+    
+    @classmethod
+    def borrar_pdfs_cita(cls, cita_id, conservar=None):
+        """
+        Borra las versiones guardadas del PDF de una cita
+        
+        Args:
+            cita_id (int): ID de la cita
+            conservar (str, optional): Ruta que no se borra (la versión actual)
+        """
+        carpeta = f"{cls.CARPETA_PDFS}/{cita_id}"
+        try:
+            _, archivos = default_storage.listdir(carpeta)
+        except FileNotFoundError:
+            return
+        
+        for nombre in archivos:
+            ruta = f"{carpeta}/{nombre}"
+            if ruta != conservar:
+                default_storage.delete(ruta)
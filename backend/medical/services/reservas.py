@@ -0,0 +1,137 @@
+"""
+Reservas temporales de horarios en Redis
+Mientras un paciente completa el formulario o el asistente crea la cita, el horario
+queda apartado por unos minutos. Dos reservas del mismo horario no pueden coexistir
+(SET NX), así que bajo concurrencia solo uno de los pacientes llega a crear la cita
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from redis.exceptions import WatchError
+import uuid
+
+
+class ReservaHorario:
+    """
+    Estructura en Redis:
+        reserva_horario:{medico_id}:{fecha}:{HH:MM} -> STRING con el token de la
+            reserva (con TTL)
+    """
+
+    @staticmethod
+    def _redis():
+        return get_redis_connection('default')
+
+    @staticmethod
+    def ttl():
+        """Segundos que dura una reserva"""
+        return settings.CITAS_CONFIG.get('reserva_ttl', 300)
+
+    @staticmethod
+    def _clave(medico_id, fecha, hora):
+        return cache.make_key(f"reserva_horario:{medico_id}:{fecha.isoformat()}:{hora.strftime('%H:%M')}")
+
+    @classmethod
+    def tomar(cls, medico_id, fecha, hora, token=None, ttl=None):
+        """
+        Aparta el horario o confirma una reserva propia
+
+        Args:
+            medico_id (int): ID del médico
+            fecha (date): Fecha del horario
+            hora (time): Hora del horario
+            token (str, optional): Token de una reserva previa del mismo paciente
+            ttl (int, optional): Segundos que dura la reserva (por defecto ttl())
+
+        Returns:
+            str or None: Token de la reserva (con el TTL renovado) o None si otro la tiene
+        """
+        token = token or uuid.uuid4().hex
+        ttl = ttl or cls.ttl()
+        clave = cls._clave(medico_id, fecha, hora)
+
+        with cls._redis().pipeline() as pipe:
+            try:
+                # WATCH: si la reserva propia expira y otro la toma entre el GET y el SET,
+                # no se renueva la ajena
+                pipe.watch(clave)
+                actual = pipe.get(clave)
+                if actual is not None and actual.decode() != token:
+                    pipe.unwatch()
+                    return None
+                pipe.multi()
+                if actual is None:
+                    pipe.set(clave, token, nx=True, ex=ttl)
+                else:
+                    # Reserva propia: se renueva el TTL completo
+                    pipe.set(clave, token, xx=True, ex=ttl)
+                apartado, = pipe.execute()
+            except WatchError:
+                return None
+
+        return token if apartado else None
+
+    @classmethod
+    def tomar_varios(cls, horarios):
+        """
+        Aparta varios horarios con un mismo token, en un solo viaje a Redis
+
+        Args:
+            horarios (list): Tuplas (medico_id, fecha, hora)
+
+        Returns:
+            tuple: (token:str, lista de bool con los horarios que se apartaron)
+        """
+        token = uuid.uuid4().hex
+        pipe = cls._redis().pipeline(transaction=False)
+        for medico_id, fecha, hora in horarios:
+            pipe.set(cls._clave(medico_id, fecha, hora), token, nx=True, ex=cls.ttl())
+        return token, [bool(apartado) for apartado in pipe.execute()]
+
+    @classmethod
+    def liberar_varios(cls, horarios, token):
+        """Elimina las reservas de los horarios que siguen perteneciendo al token"""
+        claves = [cls._clave(medico_id, fecha, hora) for medico_id, fecha, hora in horarios]
+        if not claves:
+            return
+
+        with cls._redis().pipeline() as pipe:
+            try:
+                pipe.watch(*claves)
+                propias = [
+                    clave
+                    for clave, actual in zip(claves, pipe.mget(claves))
+                    if actual is not None and actual.decode() == token
+                ]
+                pipe.multi()
+                if propias:
+                    pipe.delete(*propias)
+                pipe.execute()
+            except WatchError:
+                # Alguna clave cambió de dueño: las propias expiran solas con el TTL
+                pass
+
+    @classmethod
+    def liberar(cls, medico_id, fecha, hora, token):
+        """
+        Elimina la reserva solo si sigue perteneciendo a ese token
+
+        Returns:
+            bool: True si se eliminó
+        """
+        clave = cls._clave(medico_id, fecha, hora)
+
+        with cls._redis().pipeline() as pipe:
+            try:
+                # WATCH: si otra reserva toma la clave entre el GET y el DEL, no se borra
+                pipe.watch(clave)
+                actual = pipe.get(clave)
+                if actual is None or actual.decode() != token:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.delete(clave)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
@@ -0,0 +1,39 @@
+"""
+Estimación local de tokens
+Aproximación sin llamadas a la API ni dependencias externas, suficiente para
+decidir cuánto historial cabe en el prompt del asistente
+"""
+import math
+
+
+# Promedio de caracteres por token en texto en español (los acentos y la ñ
+# suelen partir palabras en más tokens que en inglés)
+CARACTERES_POR_TOKEN = 3.5
+
+# Tokens que agrega la API por cada mensaje (rol y separadores)
+TOKENS_POR_MENSAJE = 4
+
+
+def estimar_tokens(texto):
+    """
+    Estima los tokens de un texto
+    
+    Args:
+        texto (str): Texto a medir
+    
+    Returns:
+        int: Número aproximado de tokens
+    """
+    if not texto:
+        return 0
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def estimar_tokens_mensaje(mensaje):
+    """Estima los tokens de un mensaje {'role', 'content'} incluyendo su overhead"""
+    return TOKENS_POR_MENSAJE + estimar_tokens(mensaje.get('content'))
+
+
+def estimar_tokens_mensajes(mensajes):
+    """Estima los tokens de una lista de mensajes"""
+    return sum(estimar_tokens_mensaje(m) for m in mensajes)
@@ -0,0 +1,72 @@
+"""
+Señales de la app medical
+Mantienen coherentes los datos derivados que se cachean en Redis
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Cita, HorarioMedico, Medico
+from .services.cache_disponibilidad import CacheDisponibilidad
+from .services.disponibilidad import BuscadorHorarios, PlantillaHorario
+from .services.lista_espera import ListaEsperaService
+from .services.pdf_service import PDFService
+
+
+@receiver([post_save, post_delete], sender=HorarioMedico)
+def invalidar_plantilla_por_horario(sender, instance, **kwargs):
+    """Un horario agregado, modificado o eliminado cambia la plantilla semanal del médico"""
+    PlantillaHorario.invalidar(instance.medico_id)
+    transaction.on_commit(lambda: CacheDisponibilidad.invalidar_medico(instance.medico_id))
+
+
+@receiver(post_save, sender=Medico)
+def invalidar_plantilla_por_medico(sender, instance, **kwargs):
+    """La duración de consulta del médico define el tamaño de los horarios"""
+    PlantillaHorario.invalidar(instance.id)
+    transaction.on_commit(lambda: CacheDisponibilidad.invalidar_medico(instance.id))
+
+
+@receiver([post_save, post_delete], sender=Medico)
+def invalidar_especialidades_por_medico(sender, instance, **kwargs):
+    """La especialidad o el estado (activo, acepta_nuevos_pacientes) pueden haber cambiado"""
+    BuscadorHorarios.invalidar_especialidades()
+
+
+@receiver(post_save, sender=Cita)
+def actualizar_disponibilidad_por_cita(sender, instance, created, **kwargs):
+    """
+    Al confirmarse la transacción, una cita nueva ocupa sus horarios en el cache;
+    cualquier otro cambio (cancelación, cambio de estado) recalcula el día
+    """
+    if created and instance.estado == 'AGENDADA':
+        transaction.on_commit(lambda: CacheDisponibilidad.ocupar(
+            instance.medico_id, instance.fecha, instance.hora, instance.duracion_minutos
+        ))
+    else:
+        transaction.on_commit(lambda: CacheDisponibilidad.recalcular(instance.medico_id, instance.fecha))
+
+
+@receiver(post_save, sender=Cita)
+def ofrecer_horario_cancelado(sender, instance, created, **kwargs):
+    """
+    Al confirmarse una cancelación, ofrecer a la lista de espera los horarios que
+    ocupaba la cita (ofrecer_horario revisa que sigan libres, así que repetir el
+    aviso no tiene efecto)
+    """
+    if not created and instance.estado == 'CANCELADA':
+        transaction.on_commit(lambda: ListaEsperaService.ofrecer_horarios_liberados(
+            instance.medico_id, instance.fecha, instance.hora, instance.duracion_minutos
+        ))
+
+
+@receiver(post_delete, sender=Cita)
+def actualizar_disponibilidad_por_cita_eliminada(sender, instance, **kwargs):
+    transaction.on_commit(lambda: CacheDisponibilidad.recalcular(instance.medico_id, instance.fecha))
+
+
+@receiver(post_delete, sender=Cita)
+def borrar_pdfs_por_cita(sender, instance, **kwargs):
+    """Los PDFs guardados de una cita eliminada ya no se van a servir"""
+    cita_id = instance.id
+    transaction.on_commit(lambda: PDFService.borrar_pdfs_cita(cita_id))
@@ -6,6 +6,7 @@ from django.urls import path
 from medical.views_api import (
     AsistenteIniciarView,
     AsistenteMensajeView,
+    AsistenteMensajeStreamView,
     AsistenteHistorialView,
     AsistenteFinalizarView,
     AsistenteCrearCitaView,
@@ -13,13 +14,27 @@ from medical.views_api import (
     MedicoListView,
     MedicoDetailView,
     MedicoHorariosView,
+    MedicoDisponibilidadView,
     CitaListView,
     CitaCreateView,
     CitaDetailView,
     CitaPDFView,
     CitaCancelarView,
+    CitaMasivaView,
+    CitaReservarView,
+    AgendasPDFView,
+    ListaEsperaView,
+    ListaEsperaDetailView,
+    ListaEsperaAceptarView,
+    ListaEsperaRechazarView,
     EstadisticasView,
 )
+from medical.views_async import (
+    AsistenteIniciarAsyncView,
+    AsistenteMensajeAsyncView,
+    AsistenteHistorialAsyncView,
+    AsistenteCrearCitaAsyncView,
+)
 
 app_name = 'medical'
 
@@ -29,10 +44,17 @@ urlpatterns = [
     # ======================
     path('api/asistente/iniciar/', AsistenteIniciarView.as_view(), name='asistente_iniciar'),
     path('api/asistente/mensaje/', AsistenteMensajeView.as_view(), name='asistente_mensaje'),
+    path('api/asistente/mensaje/stream/', AsistenteMensajeStreamView.as_view(), name='asistente_mensaje_stream'),
     path('api/asistente/historial/<str:conversacion_id>/', AsistenteHistorialView.as_view(), name='asistente_historial'),
     path('api/asistente/finalizar/<str:conversacion_id>/', AsistenteFinalizarView.as_view(), name='asistente_finalizar'),
     path('api/asistente/crear-cita/', AsistenteCrearCitaView.as_view(), name='asistente_crear_cita'),
     
+    # Variantes asíncronas (servidas por ASGI)
+    path('api/asistente/async/iniciar/', AsistenteIniciarAsyncView.as_view(), name='asistente_async_iniciar'),
+    path('api/asistente/async/mensaje/', AsistenteMensajeAsyncView.as_view(), name='asistente_async_mensaje'),
+    path('api/asistente/async/historial/<str:conversacion_id>/', AsistenteHistorialAsyncView.as_view(), name='asistente_async_historial'),
+    path('api/asistente/async/crear-cita/', AsistenteCrearCitaAsyncView.as_view(), name='asistente_async_crear_cita'),
+    
     # ======================
     # PACIENTES
     # ======================
@@ -44,14 +66,26 @@ urlpatterns = [
     path('api/medicos/', MedicoListView.as_view(), name='medico_list'),
     path('api/medicos/<int:pk>/', MedicoDetailView.as_view(), name='medico_detail'),
     path('api/medicos/<int:pk>/horarios/', MedicoHorariosView.as_view(), name='medico_horarios'),
+    path('api/medicos/<int:pk>/disponibilidad/', MedicoDisponibilidadView.as_view(), name='medico_disponibilidad'),
     
     # ======================
     # CITAS
     # ======================
     path('api/citas/', CitaListView.as_view(), name='cita_list'),
+    path('api/citas/masivas/', CitaMasivaView.as_view(), name='cita_masivas'),
+    path('api/citas/reservar/', CitaReservarView.as_view(), name='cita_reservar'),
     path('api/citas/<int:pk>/', CitaDetailView.as_view(), name='cita_detail'),
     path('api/citas/<int:pk>/pdf/', CitaPDFView.as_view(), name='cita_pdf'),
     path('api/citas/<int:pk>/cancelar/', CitaCancelarView.as_view(), name='cita_cancelar'),
+    path('api/agendas/pdf/', AgendasPDFView.as_view(), name='agendas_pdf'),
+    
+    # ======================
+    # LISTA DE ESPERA
+    # ======================
+    path('api/lista-espera/', ListaEsperaView.as_view(), name='lista_espera'),
+    path('api/lista-espera/<int:pk>/', ListaEsperaDetailView.as_view(), name='lista_espera_detail'),
+    path('api/lista-espera/<int:pk>/aceptar/', ListaEsperaAceptarView.as_view(), name='lista_espera_aceptar'),
+    path('api/lista-espera/<int:pk>/rechazar/', ListaEsperaRechazarView.as_view(), name='lista_espera_rechazar'),
     
     # ======================
     # ESTADÍSTICAS
@@ -4,22 +4,32 @@ Views API REST para el sistema médico
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+import json
 
-from .models import Paciente, Medico, Cita, HorarioMedico
+from .models import Paciente, Medico, Cita, HorarioMedico, ListaEspera
 from .serializers import (
     PacienteListSerializer,
     MedicoSerializer,
     CitaListSerializer,
     CitaDetailSerializer,
     CitaCreateSerializer,
+    CitaMasivaSerializer,
+    ListaEsperaSerializer,
+    ListaEsperaCreateSerializer,
     MensajeAsistenteSerializer
 )
+from .services.agendas_pdf import LoteAgendas
 from .services.asistente_virtual_redis import AsistenteVirtualService
-from .services.cita_service import CitaService
+from .services.cita_service import CitaService, HorarioNoDisponible
+from .services.lista_espera import ListaEsperaService
 from .services.pdf_service import PDFService
+from .services.analizador import normalizar
+from .services.reservas import ReservaHorario
 
 
 # ====================
@@ -87,6 +97,67 @@ class AsistenteMensajeView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class AsistenteMensajeStreamView(APIView):
+    """
+    POST /api/asistente/mensaje/stream/
+    Igual que /api/asistente/mensaje/ pero responde con Server-Sent Events,
+    reenviando los tokens a medida que llegan de OpenAI
+    
+    Body:
+        {
+            "conversacion_id": "uuid",
+            "mensaje": "string"
+        }
+    
+    Eventos:
+        event: token  -> data: {"texto": "..."}
+        event: fin    -> data: mismo cuerpo que /api/asistente/mensaje/
+        event: error  -> data: mismo cuerpo, con el mensaje de error en "respuesta"
+    """
+    
+    def post(self, request):
+        serializer = MensajeAsistenteSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response({
+                'exito': False,
+                'errores': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        conversacion_id = serializer.validated_data.get('conversacion_id')
+        mensaje = serializer.validated_data['mensaje']
+        
+        asistente = AsistenteVirtualService()
+        
+        # Si no hay conversacion_id, iniciar una nueva
+        if not conversacion_id:
+            resultado_inicio = asistente.iniciar_conversacion()
+            conversacion_id = resultado_inicio['conversacion_id']
+        
+        conversacion_id = str(conversacion_id)
+        
+        def eventos():
+            for tipo, datos in asistente.enviar_mensaje_stream(conversacion_id, mensaje):
+                if tipo == 'token':
+                    payload = {'texto': datos}
+                else:
+                    payload = {
+                        'exito': True,
+                        'conversacion_id': datos.get('conversacion_id', conversacion_id) if datos.get('nueva_conversacion') else conversacion_id,
+                        'respuesta': datos['respuesta'],
+                        'intencion': datos.get('intencion'),
+                        'requiere_datos': datos.get('requiere_datos', False),
+                        'especialidad_sugerida': datos.get('especialidad_sugerida'),
+                        'es_urgente': datos.get('es_urgente', False)
+                    }
+                yield f"event: {tipo}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        
+        response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Evitar buffering en nginx
+        return response
+
+
 class AsistenteHistorialView(APIView):
     """
     GET /api/asistente/historial/{conversacion_id}/
@@ -214,16 +285,18 @@ class MedicoListView(APIView):
     """
     GET /api/medicos/
     Lista todos los médicos disponibles
-    Filtros opcionales: ?especialidad=Cardiología
+    Filtros opcionales: ?especialidad=Cardiología (también 'cardiologia' o 'cardio')
     """
     
     def get(self, request):
         medicos = Medico.objects.filter(activo=True)
         
-        # Filtrar por especialidad si se proporciona
+        # Filtrar por especialidad si se proporciona: cualquier parte de la especialidad
+        # normalizada ('general' encuentra "Medicina General"), sin importar acentos;
+        # usa el índice de trigramas de especialidad_normalizada
         especialidad = request.query_params.get('especialidad')
         if especialidad:
-            medicos = medicos.filter(especialidad__icontains=especialidad)
+            medicos = medicos.filter(especialidad_normalizada__contains=normalizar(especialidad).strip())
         
         serializer = MedicoSerializer(medicos, many=True)
         
@@ -294,6 +367,66 @@ class MedicoHorariosView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class MedicoDisponibilidadView(APIView):
+    """
+    GET /api/medicos/{id}/disponibilidad/
+    Disponibilidad de un rango de días en formato compacto (vistas de calendario)
+    Query params opcionales:
+        ?desde=2025-11-01  (hoy por defecto)
+        ?hasta=2025-11-30  (desde + 30 días por defecto, máximo 92 días)
+    
+    Response:
+        {
+            "exito": true,
+            "medico": {...},
+            "desde": "2025-11-01",
+            "hasta": "2025-11-30",
+            "duracion": 30,
+            "plantilla": [["09:00", "09:30", ...], ...],  # Lunes a Domingo
+            "dias": {"2025-11-03": "1101...", ...}  # '1' libre, '0' ocupado
+        }
+    
+    El carácter i de cada día corresponde a la hora i de la plantilla de ese día de
+    la semana
+    """
+    
+    MAX_DIAS = 92
+    
+    def get(self, request, pk):
+        medico = get_object_or_404(Medico, pk=pk, activo=True)
+        
+        try:
+            desde_param = request.query_params.get('desde')
+            hasta_param = request.query_params.get('hasta')
+            desde = datetime.strptime(desde_param, '%Y-%m-%d').date() if desde_param else date.today()
+            hasta = datetime.strptime(hasta_param, '%Y-%m-%d').date() if hasta_param else desde + timedelta(days=30)
+        except ValueError:
+            return Response({
+                'exito': False,
+                'error': 'Formato de fecha inválido. Use YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if hasta < desde or (hasta - desde).days + 1 > self.MAX_DIAS:
+            return Response({
+                'exito': False,
+                'error': f'El rango debe ir de "desde" a "hasta" y tener como máximo {self.MAX_DIAS} días'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        disponibilidad = CitaService.disponibilidad_calendario(medico.id, desde, hasta)
+        
+        return Response({
+            'exito': True,
+            'medico': {
+                'id': medico.id,
+                'nombre': medico.nombre_completo(),
+                'especialidad': medico.especialidad
+            },
+            'desde': desde,
+            'hasta': hasta,
+            **disponibilidad
+        }, status=status.HTTP_200_OK)
+
+
 # ====================
 # CITAS
 # ====================
@@ -388,7 +521,8 @@ class CitaListView(APIView):
             'fecha': datos_validados['fecha'],
             'hora': datos_validados['hora'],
             'motivo': datos_validados['motivo'],
-            'sintomas_iniciales': datos_validados.get('sintomas_iniciales', '')
+            'sintomas_iniciales': datos_validados.get('sintomas_iniciales', ''),
+            'reserva': datos_validados.get('reserva')
         }
         
         try:
@@ -401,6 +535,11 @@ class CitaListView(APIView):
                 'cita': serializer_respuesta.data
             }, status=status.HTTP_201_CREATED)
             
+        except HorarioNoDisponible as e:
+            return Response({
+                'exito': False,
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
         except ValueError as e:
             return Response({
                 'exito': False,
@@ -466,6 +605,11 @@ class CitaCreateView(APIView):
                 'cita': serializer_respuesta.data
             }, status=status.HTTP_201_CREATED)
             
+        except HorarioNoDisponible as e:
+            return Response({
+                'exito': False,
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
         except ValueError as e:
             return Response({
                 'exito': False,
@@ -497,21 +641,39 @@ class CitaDetailView(APIView):
 class CitaPDFView(APIView):
     """
     GET /api/citas/{id}/pdf/
-    Genera y descarga el PDF de una cita
+    Descarga el PDF de una cita
+    
+    El PDF se genera una vez por versión de la cita y se sirve desde el storage. Con
+    CITAS_CONFIG['pdf_sendfile'] el archivo lo envía el servidor web:
+        'x-sendfile': Apache (mod_xsendfile) o lighttpd, con la ruta absoluta
+        'x-accel-redirect': nginx, con una location internal que apunta a MEDIA_ROOT
+            (CITAS_CONFIG['pdf_sendfile_prefijo'])
     """
     
     def get(self, request, pk):
-        cita = get_object_or_404(Cita, pk=pk)
+        cita = get_object_or_404(Cita.objects.select_related('paciente', 'medico'), pk=pk)
         
         try:
-            # Generar PDF
-            pdf_buffer = PDFService.generar_pdf_cita(cita)
+            ruta = PDFService.obtener_pdf_cita(cita)
             nombre_archivo = PDFService.obtener_nombre_archivo(cita)
             
-            # Crear respuesta HTTP con el PDF
-            response = HttpResponse(pdf_buffer, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+            modo = settings.CITAS_CONFIG.get('pdf_sendfile')
+            if modo == 'x-sendfile':
+                response = HttpResponse(content_type='application/pdf')
+                response['X-Sendfile'] = default_storage.path(ruta)
+            elif modo == 'x-accel-redirect':
+                response = HttpResponse(content_type='application/pdf')
+                prefijo = settings.CITAS_CONFIG.get('pdf_sendfile_prefijo', '/protegido/')
+                response['X-Accel-Redirect'] = f"{prefijo.rstrip('/')}/{ruta}"
+            else:
+                return FileResponse(
+                    default_storage.open(ruta, 'rb'),
+                    as_attachment=True,
+                    filename=nombre_archivo,
+                    content_type='application/pdf'
+                )
             
+            response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
             return response
             
         except Exception as e:
@@ -521,6 +683,57 @@ class CitaPDFView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AgendasPDFView(APIView):
+    """
+    GET /api/agendas/pdf/
+    Zip con las agendas diarias de los médicos (para imprimir en recepción)
+    Query params opcionales:
+        ?desde=2025-11-03  (hoy por defecto)
+        ?hasta=2025-11-07  (igual a desde por defecto, máximo 31 días)
+        ?medico=1,2,3  (todos los médicos con citas por defecto)
+        ?formato=agenda  (un PDF por médico y día) o confirmaciones (un PDF por cita)
+    
+    El zip se envía a medida que se generan los PDFs de cada médico
+    """
+    
+    MAX_DIAS = 31
+    
+    def get(self, request):
+        try:
+            desde_param = request.query_params.get('desde')
+            hasta_param = request.query_params.get('hasta')
+            desde = datetime.strptime(desde_param, '%Y-%m-%d').date() if desde_param else date.today()
+            hasta = datetime.strptime(hasta_param, '%Y-%m-%d').date() if hasta_param else desde
+            medico_param = request.query_params.get('medico')
+            medico_ids = [int(medico_id) for medico_id in medico_param.split(',')] if medico_param else None
+        except ValueError:
+            return Response({
+                'exito': False,
+                'error': 'Parámetros inválidos. Use fechas YYYY-MM-DD y médicos como 1,2,3'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if hasta < desde or (hasta - desde).days + 1 > self.MAX_DIAS:
+            return Response({
+                'exito': False,
+                'error': f'El rango debe ir de "desde" a "hasta" y tener como máximo {self.MAX_DIAS} días'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # En el servidor no se hace fork: pool de hilos acotado y compartido
+            lote = LoteAgendas(desde, hasta, request.query_params.get('formato', 'agenda'), medico_ids, ejecutor='hilos')
+        except ValueError as e:
+            return Response({
+                'exito': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        nombre_archivo = f"{lote.formato}_{desde.strftime('%Y%m%d')}_{hasta.strftime('%Y%m%d')}.zip"
+        response = StreamingHttpResponse(lote.zip_streaming(), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class CitaCancelarView(APIView):
     """
     POST /api/citas/{id}/cancelar/
@@ -549,6 +762,316 @@ class CitaCancelarView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CitaMasivaView(APIView):
+    """
+    POST /api/citas/masivas/
+    Crea varias citas en una sola petición (migraciones, campañas)
+    Los emails de confirmación se envían en segundo plano
+    
+    Body:
+        {
+            "citas": [
+                {
+                    "medico_id": 1, "fecha": "2025-10-20", "hora": "10:30",
+                    "motivo": "...", "sintomas_iniciales": "...",
+                    "paciente_nombre": "...", "paciente_apellido_paterno": "...",
+                    "paciente_apellido_materno": "...", "paciente_email": "...",
+                    "paciente_telefono": "...", "paciente_fecha_nacimiento": "1990-01-01",
+                    "paciente_sexo": "F"
+                },
+                ...
+            ]
+        }
+    
+    Response (201 si se crearon todas, 207 si solo algunas, 400 si ninguna):
+        {
+            "exito": true,
+            "creadas": 1,
+            "fallidas": 1,
+            "resultados": [
+                {"indice": 0, "exito": true, "cita": {...}},
+                {"indice": 1, "exito": false, "error": "Este horario ya está ocupado"}
+            ]
+        }
+    """
+    
+    def post(self, request):
+        citas = request.data.get('citas')
+        maximo = settings.CITAS_CONFIG.get('max_citas_masivas', 500)
+        
+        if not isinstance(citas, list) or not citas:
+            return Response({
+                'exito': False,
+                'error': 'Se requiere "citas" con una lista de citas'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(citas) > maximo:
+            return Response({
+                'exito': False,
+                'error': f'Máximo {maximo} citas por petición'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Validar cada item por separado: un item inválido no detiene a los demás
+        resultados = [None] * len(citas)
+        indices = []
+        items = []
+        
+        for indice, datos in enumerate(citas):
+            serializer = CitaMasivaSerializer(data=datos)
+            if not serializer.is_valid():
+                resultados[indice] = {'indice': indice, 'exito': False, 'errores': serializer.errors}
+                continue
+            
+            datos_validados = serializer.validated_data
+            indices.append(indice)
+            items.append((
+                {
+                    'nombre': datos_validados['paciente_nombre'],
+                    'apellido_paterno': datos_validados['paciente_apellido_paterno'],
+                    'apellido_materno': datos_validados['paciente_apellido_materno'],
+                    'fecha_nacimiento': datos_validados['paciente_fecha_nacimiento'],
+                    'sexo': datos_validados['paciente_sexo'],
+                    'email': datos_validados['paciente_email'],
+                    'telefono': datos_validados['paciente_telefono']
+                },
+                {
+                    'medico_id': datos_validados['medico_id'],
+                    'fecha': datos_validados['fecha'],
+                    'hora': datos_validados['hora'],
+                    'motivo': datos_validados['motivo'],
+                    'sintomas_iniciales': datos_validados['sintomas_iniciales']
+                }
+            ))
+        
+        if items:
+            for indice, resultado in zip(indices, CitaService.crear_citas_masivas(items)):
+                if resultado['exito']:
+                    resultados[indice] = {
+                        'indice': indice,
+                        'exito': True,
+                        'cita': CitaListSerializer(resultado['cita']).data
+                    }
+                else:
+                    resultados[indice] = {'indice': indice, 'exito': False, 'error': resultado['error']}
+        
+        creadas = sum(1 for resultado in resultados if resultado['exito'])
+        
+        if creadas == len(resultados):
+            codigo = status.HTTP_201_CREATED
+        elif creadas:
+            codigo = status.HTTP_207_MULTI_STATUS
+        else:
+            codigo = status.HTTP_400_BAD_REQUEST
+        
+        return Response({
+            'exito': creadas > 0,
+            'creadas': creadas,
+            'fallidas': len(resultados) - creadas,
+            'resultados': resultados
+        }, status=codigo)
+
+
+class CitaReservarView(APIView):
+    """
+    POST /api/citas/reservar/
+    Aparta un horario por unos minutos mientras el paciente completa sus datos
+    El token devuelto se envía como "reserva" en POST /api/citas/
+    
+    Body:
+        {
+            "medico_id": 1,
+            "fecha": "2025-10-20",
+            "hora": "10:30",
+            "reserva": "..."  (opcional, renueva una reserva propia)
+        }
+    
+    DELETE /api/citas/reservar/
+    Libera la reserva (mismo body, con "reserva" obligatorio)
+    """
+    
+    def _leer_horario(self, request):
+        medico_id = int(request.data['medico_id'])
+        fecha = datetime.strptime(request.data['fecha'], '%Y-%m-%d').date()
+        hora = datetime.strptime(request.data['hora'], '%H:%M').time()
+        return medico_id, fecha, hora
+    
+    def post(self, request):
+        try:
+            medico_id, fecha, hora = self._leer_horario(request)
+        except (KeyError, TypeError, ValueError):
+            return Response({
+                'exito': False,
+                'error': 'Se requieren medico_id, fecha (YYYY-MM-DD) y hora (HH:MM)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            token = CitaService.reservar_horario(medico_id, fecha, hora, request.data.get('reserva'))
+        except HorarioNoDisponible as e:
+            # El horario existe pero alguien más lo tiene apartado u ocupado
+            return Response({
+                'exito': False,
+                'error': str(e)
+            }, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({
+                'exito': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'exito': True,
+            'reserva': token,
+            'expira_en': ReservaHorario.ttl(),
+            'mensaje': "Horario reservado"
+        }, status=status.HTTP_201_CREATED)
+    
+    def delete(self, request):
+        try:
+            medico_id, fecha, hora = self._leer_horario(request)
+            token = request.data['reserva']
+        except (KeyError, TypeError, ValueError):
+            return Response({
+                'exito': False,
+                'error': 'Se requieren medico_id, fecha (YYYY-MM-DD), hora (HH:MM) y reserva'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not ReservaHorario.liberar(medico_id, fecha, hora, token):
+            return Response({
+                'exito': False,
+                'error': 'La reserva no existe o ya expiró'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'exito': True,
+            'mensaje': 'Reserva liberada'
+        }, status=status.HTTP_200_OK)
+
+
+# ====================
+# LISTA DE ESPERA
+# ====================
+
+class ListaEsperaView(APIView):
+    """
+    POST /api/lista-espera/
+    Inscribe a un paciente en la lista de espera de un médico o de una especialidad
+    Cuando se cancele una cita que le sirva, el horario se le aparta y se le avisa
+    por email
+    
+    Body:
+        {
+            "medico_id": 1,  (o "especialidad": "Cardiología")
+            "fecha_desde": "2025-11-01",
+            "fecha_hasta": "2025-11-15",
+            "motivo": "...",
+            "paciente_nombre": "...", "paciente_apellido_paterno": "...",
+            "paciente_email": "...", "paciente_telefono": "...",
+            "paciente_fecha_nacimiento": "1990-01-01", "paciente_sexo": "F"
+        }
+    """
+    
+    def post(self, request):
+        serializer = ListaEsperaCreateSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response({
+                'exito': False,
+                'errores': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        datos = serializer.validated_data
+        datos_paciente = {
+            'nombre': datos['paciente_nombre'],
+            'apellido_paterno': datos['paciente_apellido_paterno'],
+            'apellido_materno': datos['paciente_apellido_materno'],
+            'fecha_nacimiento': datos['paciente_fecha_nacimiento'],
+            'sexo': datos['paciente_sexo'],
+            'email': datos['paciente_email'],
+            'telefono': datos['paciente_telefono']
+        }
+        
+        try:
+            entrada = ListaEsperaService.inscribir(
+                datos_paciente,
+                datos['fecha_desde'],
+                datos['fecha_hasta'],
+                datos['motivo'],
+                medico_id=datos.get('medico_id'),
+                especialidad=datos.get('especialidad')
+            )
+        except ValueError as e:
+            return Response({
+                'exito': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'exito': True,
+            'mensaje': 'Te avisaremos por email cuando se libere un horario',
+            'lista_espera': ListaEsperaSerializer(entrada).data
+        }, status=status.HTTP_201_CREATED)
+
+
+class ListaEsperaDetailView(APIView):
+    """
+    GET /api/lista-espera/{id}/
+    Estado de una solicitud (y el horario ofrecido, si lo hay)
+    """
+    
+    def get(self, request, pk):
+        entrada = get_object_or_404(ListaEspera, pk=pk)
+        
+        return Response({
+            'exito': True,
+            'lista_espera': ListaEsperaSerializer(entrada).data
+        }, status=status.HTTP_200_OK)
+
+
+class ListaEsperaAceptarView(APIView):
+    """
+    POST /api/lista-espera/{id}/aceptar/
+    Acepta el horario ofrecido y crea la cita
+    """
+    
+    def post(self, request, pk):
+        get_object_or_404(ListaEspera, pk=pk)
+        cita, mensaje = ListaEsperaService.aceptar(pk)
+        
+        if not cita:
+            return Response({
+                'exito': False,
+                'error': mensaje
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response({
+            'exito': True,
+            'mensaje': mensaje,
+            'cita': CitaDetailSerializer(cita).data
+        }, status=status.HTTP_201_CREATED)
+
+
+class ListaEsperaRechazarView(APIView):
+    """
+    POST /api/lista-espera/{id}/rechazar/
+    Rechaza el horario ofrecido; la solicitud sigue en espera
+    """
+    
+    def post(self, request, pk):
+        get_object_or_404(ListaEspera, pk=pk)
+        exito, mensaje = ListaEsperaService.rechazar(pk)
+        
+        if exito:
+            return Response({
+                'exito': True,
+                'mensaje': mensaje
+            }, status=status.HTTP_200_OK)
+        else:
+            return Response({
+                'exito': False,
+                'error': mensaje
+            }, status=status.HTTP_409_CONFLICT)
+
+
 # ====================
 # ESTADÍSTICAS
 # ====================
@@ -564,13 +1087,15 @@ class EstadisticasView(APIView):
             "citas_hoy": 5,
             "citas_semana": 18,
             "total_pacientes": 247,
-            "doctores_activos": 12
+            "doctores_activos": 12,
+            "cache_asistente": {"aciertos": 30, "fallos": 70, "tasa_aciertos": 0.3, "entradas": 41}
         }
     """
     
     def get(self, request):
         from datetime import timedelta
         from .models import Paciente
+        from .services.cache_respuestas import CacheRespuestas
         
         hoy = date.today()
         fin_semana = hoy + timedelta(days=7)
@@ -599,6 +1124,7 @@ class EstadisticasView(APIView):
             'citas_hoy': citas_hoy,
             'citas_semana': citas_semana,
             'total_pacientes': total_pacientes,
-            'doctores_activos': doctores_activos
+            'doctores_activos': doctores_activos,
+            'cache_asistente': CacheRespuestas().estadisticas()
         }, status=status.HTTP_200_OK)
 
@@ -0,0 +1,156 @@
+"""
+Views asíncronas del asistente virtual
+Misma API que las vistas de views_api.py pero sin bloquear un hilo durante las
+llamadas a OpenAI y Redis. Requieren un servidor ASGI (backend/asgi.py), por ejemplo:
+    uvicorn backend.asgi:application --workers 2
+Bajo WSGI (runserver) cada petición corre en un event loop propio, y los clientes
+creados para ese loop se cierran al responder
+"""
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+import json
+
+from .serializers import MensajeAsistenteSerializer
+from .services.asistente_virtual_async import AsistenteVirtualAsyncService
+from .services.conversacion_store import cerrar_redis_async
+from .services.openai_cliente import cerrar_cliente_openai_async
+
+
+def _leer_json(request):
+    """Lee el body JSON de la petición (dict vacío si no es válido o no es un objeto)"""
+    try:
+        datos = json.loads(request.body or b'{}')
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {}
+    return datos if isinstance(datos, dict) else {}
+
+
+class VistaAsync(View):
+    """Vista asíncrona que, bajo WSGI, cierra los clientes del event loop de la petición"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        finally:
+            # async_to_sync crea un loop por petición: sus clientes no se reutilizarían
+            if isinstance(request, WSGIRequest):
+                await cerrar_cliente_openai_async()
+                await cerrar_redis_async()
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsistenteIniciarAsyncView(VistaAsync):
+    """
+    POST /api/asistente/async/iniciar/
+    Inicia una nueva conversación con el asistente virtual
+    """
+    
+    async def post(self, request):
+        asistente = AsistenteVirtualAsyncService()
+        resultado = await asistente.iniciar_conversacion()
+        
+        return JsonResponse({
+            'exito': True,
+            'conversacion_id': resultado['conversacion_id'],
+            'mensaje': resultado['mensaje_inicial']
+        }, status=201)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsistenteMensajeAsyncView(VistaAsync):
+    """
+    POST /api/asistente/async/mensaje/
+    Envía un mensaje al asistente y obtiene respuesta
+    
+    Body:
+        {
+            "conversacion_id": "uuid",
+            "mensaje": "string"
+        }
+    """
+    
+    async def post(self, request):
+        serializer = MensajeAsistenteSerializer(data=_leer_json(request))
+        
+        if not serializer.is_valid():
+            return JsonResponse({
+                'exito': False,
+                'errores': serializer.errors
+            }, status=400)
+        
+        conversacion_id = serializer.validated_data.get('conversacion_id')
+        mensaje = serializer.validated_data['mensaje']
+        
+        asistente = AsistenteVirtualAsyncService()
+        
+        # Si no hay conversacion_id, iniciar una nueva
+        if not conversacion_id:
+            resultado_inicio = await asistente.iniciar_conversacion()
+            conversacion_id = resultado_inicio['conversacion_id']
+        
+        conversacion_id = str(conversacion_id)
+        resultado = await asistente.enviar_mensaje(conversacion_id, mensaje)
+        
+        return JsonResponse({
+            'exito': True,
+            'conversacion_id': conversacion_id if not resultado.get('nueva_conversacion') else resultado.get('conversacion_id'),
+            'respuesta': resultado['respuesta'],
+            'intencion': resultado.get('intencion'),
+            'requiere_datos': resultado.get('requiere_datos', False),
+            'especialidad_sugerida': resultado.get('especialidad_sugerida'),
+            'es_urgente': resultado.get('es_urgente', False)
+        }, status=200)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsistenteHistorialAsyncView(VistaAsync):
+    """
+    GET /api/asistente/async/historial/{conversacion_id}/
+    Obtiene el historial de una conversación
+    """
+    
+    async def get(self, request, conversacion_id):
+        asistente = AsistenteVirtualAsyncService()
+        historial = await asistente.obtener_historial(conversacion_id)
+        
+        if not historial:
+            return JsonResponse({
+                'exito': False,
+                'error': 'Conversación no encontrada o expirada'
+            }, status=404)
+        
+        return JsonResponse({
+            'exito': True,
+            'conversacion_id': conversacion_id,
+            'mensajes': historial
+        }, status=200)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsistenteCrearCitaAsyncView(VistaAsync):
+    """
+    POST /api/asistente/async/crear-cita/
+    Crea una cita basándose en la conversación del asistente
+    
+    Body:
+        {
+            "conversacion_id": "uuid"
+        }
+    """
+    
+    async def post(self, request):
+        conversacion_id = _leer_json(request).get('conversacion_id')
+        
+        if not conversacion_id:
+            return JsonResponse({
+                'exito': False,
+                'error': 'Se requiere conversacion_id'
+            }, status=400)
+        
+        asistente = AsistenteVirtualAsyncService()
+        resultado = await asistente.crear_cita_desde_conversacion(conversacion_id)
+        
+        return JsonResponse(resultado, status=201 if resultado['exito'] else 400)
@@ -0,0 +1,173 @@
+"""
+Micro-benchmark del analizador de palabras clave
+Compara AnalizadorPalabrasClave (una expresión regular compilada por grupo de
+tablas) con las búsquedas 'palabra in texto' que usaban los servicios del asistente
+Ejecutar con: python manage.py shell < test/benchmark_analizador.py
+"""
+
+import timeit
+
+from medical.services.analizador import AnalizadorPalabrasClave
+
+print("=" * 70)
+print("BENCHMARK: ANALIZADOR DE PALABRAS CLAVE")
+print("=" * 70)
+
+
+# Implementación anterior (copiada de _analizar_respuesta, _analizar_mensaje y
+# _detecta_recomendacion_urgente) para comparar resultados y tiempos
+def analizar_anterior(mensaje_usuario, respuesta_asistente):
+    mensaje_lower = mensaje_usuario.lower()
+    respuesta_lower = respuesta_asistente.lower()
+    
+    sintomas_keywords = [
+        'dolor', 'duele', 'siento', 'tengo', 'fiebre', 'tos', 'mareo',
+        'náusea', 'vómito', 'malestar', 'cansancio', 'síntoma'
+    ]
+    cita_keywords = [
+        'cita', 'agendar', 'turno', 'consulta', 'hora', 'reservar',
+        'médico', 'doctor', 'especialista'
+    ]
+    sintomas_count = sum(1 for keyword in sintomas_keywords if keyword in mensaje_lower)
+    cita_count = sum(1 for keyword in cita_keywords if keyword in mensaje_lower)
+    
+    requiere_datos = any(keyword in respuesta_lower for keyword in [
+        'nombre', 'edad', 'email', 'teléfono', 'correo', 'datos'
+    ])
+    
+    especialidad_sugerida = None
+    especialidades = {
+        'medicina general': 'Medicina General',
+        'cardiología': 'Cardiología',
+        'cardiologia': 'Cardiología',
+        'dermatología': 'Dermatología',
+        'dermatologia': 'Dermatología',
+        'pediatría': 'Pediatría',
+        'pediatria': 'Pediatría',
+        'traumatología': 'Traumatología',
+        'traumatologia': 'Traumatología',
+        'psicología': 'Psicología',
+        'psicologia': 'Psicología'
+    }
+    for key, value in especialidades.items():
+        if key in respuesta_lower:
+            especialidad_sugerida = value
+            break
+    
+    urgencia_keywords = [
+        'urgente', 'inmediato', 'emergencia', 'grave', 'severo',
+        'hospital', 'ambulancia', 'atención inmediata'
+    ]
+    es_urgente = any(keyword in respuesta_lower for keyword in urgencia_keywords)
+    
+    sintomas_tabla = {
+        'dolor': ['dolor', 'duele', 'adolorido', 'molestia'],
+        'fiebre': ['fiebre', 'temperatura', 'calentura', 'febrícula'],
+        'tos': ['tos', 'tosiendo', 'toser'],
+        'mareo': ['mareo', 'mareado', 'vértigo', 'inestable'],
+        'nausea': ['náusea', 'náuseas', 'ganas de vomitar', 'asco'],
+        'vomito': ['vómito', 'vomitando', 'vomité'],
+        'diarrea': ['diarrea', 'evacuaciones', 'descomposición'],
+        'fatiga': ['cansancio', 'fatiga', 'cansado', 'agotado', 'débil'],
+        'respiracion': ['respirar', 'respiro', 'ahogo', 'falta de aire'],
+    }
+    urgencia_paciente = [
+        'dolor de pecho', 'no puedo respirar', 'sangre', 'sangrando',
+        'desmayo', 'inconsciente', 'confusión', 'convulsión',
+        'dolor intenso', 'no puedo moverme', 'parálisis',
+        'mucho dolor', 'insoportable', 'emergencia'
+    ]
+    sintomas_detectados = [
+        sintoma for sintoma, keywords in sintomas_tabla.items()
+        if any(keyword in mensaje_lower for keyword in keywords)
+    ]
+    contiene_urgencia = any(keyword in mensaje_lower for keyword in urgencia_paciente)
+    
+    keywords_urgentes = [
+        'atención inmediata', 'urgencia', 'emergencia',
+        'acude al médico de inmediato', 'consulta urgente',
+        'atención médica urgente', 'servicio de emergencias'
+    ]
+    recomendacion_urgente = any(keyword in respuesta_lower for keyword in keywords_urgentes)
+    
+    return (sintomas_count, cita_count, requiere_datos, especialidad_sugerida, es_urgente,
+            sintomas_detectados, contiene_urgencia, recomendacion_urgente)
+
+
+def analizar_nuevo(mensaje_usuario, respuesta_asistente):
+    usuario = AnalizadorPalabrasClave.analizar(mensaje_usuario, 'mensaje')
+    respuesta = AnalizadorPalabrasClave.analizar(respuesta_asistente, 'respuesta')
+    
+    return (usuario['conteo_sintomas'], usuario['conteo_cita'], respuesta['requiere_datos'],
+            respuesta['especialidad'], respuesta['urgencia'], usuario['sintomas'],
+            usuario['urgencia_paciente'], respuesta['recomendacion_urgente'])
+
+
+# Turnos cortos (primeros mensajes) y turnos con respuestas largas, como las que
+# genera el modelo al orientar al paciente (max_tokens=800)
+casos_cortos = [
+    ("Hola, quiero agendar una cita con un médico",
+     "¡Claro! ¿Para qué especialidad? Necesito tu nombre completo, edad, email y teléfono."),
+    ("Tengo dolor de cabeza y fiebre desde hace 3 días, me siento muy cansado",
+     "Lamento que te sientas así. Te recomiendo una consulta de Medicina General."),
+    ("Siento dolor de pecho muy fuerte y no puedo respirar bien",
+     "Esto puede ser grave. Acude al servicio de emergencias o llama a una ambulancia de inmediato."),
+    ("Mi hijo tiene tos y náuseas, ¿qué doctor me recomiendas?",
+     "Para tu hijo te recomiendo Pediatría. ¿Deseas reservar un turno?"),
+    ("Me salió una mancha en la piel que me pica mucho",
+     "Te sugiero una cita con Dermatología para evaluar la lesión."),
+]
+
+casos_largos = [
+    ("Me caí de la bicicleta ayer y me duele mucho la rodilla, está hinchada y no puedo apoyar el pie",
+     "Lamento mucho lo que te pasó. Por lo que describes, la inflamación y la dificultad para apoyar "
+     "el pie pueden deberse a un esguince, una lesión de ligamentos o, en algunos casos, una fractura. "
+     "Mientras tanto te recomiendo mantener la pierna en reposo y elevada, aplicar frío local durante "
+     "15 a 20 minutos varias veces al día y evitar cargar peso. Si notas deformidad, adormecimiento o "
+     "el dolor se vuelve insoportable, busca atención inmediata en un servicio de emergencias. "
+     "Para una evaluación adecuada te sugiero una consulta con Traumatología, donde podrán indicarte "
+     "una radiografía y el tratamiento más conveniente. Si deseas, puedo ayudarte a agendar la cita; "
+     "para ello necesitaré tu nombre completo, tu edad, un correo electrónico y un número de teléfono "
+     "de contacto. ¿Te gustaría que lo hagamos ahora?"),
+    ("Últimamente me siento muy ansioso, no duermo bien y tengo palpitaciones por las noches",
+     "Gracias por contarme cómo te sientes. Las palpitaciones nocturnas junto con ansiedad y problemas "
+     "para dormir pueden tener distintas causas: estrés sostenido, consumo de cafeína, alteraciones "
+     "del ritmo cardíaco o de la tiroides, entre otras. Es importante descartar primero un origen "
+     "cardíaco, por lo que te recomiendo una evaluación en Cardiología con un electrocardiograma. "
+     "Si las palpitaciones vienen acompañadas de dolor en el pecho, desmayo o falta de aire, acude de "
+     "inmediato a un hospital. Además, un acompañamiento en Psicología puede ayudarte con el manejo "
+     "de la ansiedad y la higiene del sueño. Mientras tanto intenta reducir el café y las pantallas "
+     "antes de dormir. ¿Quieres que te ayude a reservar una cita? Para agendarla necesito algunos datos."),
+]
+
+casos = casos_cortos + casos_largos
+
+print("\n1. Comparando resultados...")
+diferencias = 0
+for mensaje, respuesta in casos:
+    anterior = analizar_anterior(mensaje, respuesta)
+    nuevo = analizar_nuevo(mensaje, respuesta)
+    if anterior != nuevo:
+        diferencias += 1
+        print(f"   ❌ Diferencia en: {mensaje[:50]}")
+        print(f"      anterior: {anterior}")
+        print(f"      nuevo:    {nuevo}")
+
+if not diferencias:
+    print(f"   ✅ Mismos resultados en los {len(casos)} casos")
+
+print("\n2. Midiendo tiempos (mejor de 5 repeticiones)...")
+repeticiones = 2000
+
+for grupo, lista in [('turnos cortos', casos_cortos), ('respuestas largas', casos_largos)]:
+    print(f"\n   {grupo}:")
+    for nombre, funcion in [('anterior (palabra in texto)', analizar_anterior),
+                            ('nuevo (regex compilada)', analizar_nuevo)]:
+        segundos = min(timeit.repeat(
+            lambda: [funcion(m, r) for m, r in lista],
+            number=repeticiones, repeat=5
+        ))
+        por_turno = segundos / (repeticiones * len(lista)) * 1e6
+        print(f"   {nombre:30s} {por_turno:8.2f} µs por turno")
+
+print("\n" + "=" * 70)
@@ -0,0 +1,84 @@
+"""
+Benchmark de los renderers del PDF de confirmación de cita
+Compara PDFs por segundo de PlantillaPDFCita (canvas sobre una plantilla fija) con
+el renderer de platypus, y revisa que las citas que no caben en la plantilla usen
+platypus. Las citas se construyen en memoria: no escribe en la base de datos
+Ejecutar con: python manage.py shell < test/benchmark_pdf_citas.py
+"""
+
+import timeit
+from datetime import date, time
+from decimal import Decimal
+
+from medical.models import Cita, Medico, Paciente
+from medical.services.pdf_plantilla import PlantillaPDFCita
+from medical.services.pdf_service import PDFService
+
+print("=" * 70)
+print("BENCHMARK: RENDERERS DEL PDF DE CITAS")
+print("=" * 70)
+
+
+def crear_cita(indice, motivo="Dolor de cabeza frecuente", sintomas="Mareo y cansancio por las tardes", email=None):
+    medico = Medico(
+        nombre='Ana', apellido_paterno='Torres', apellido_materno='Ríos', sexo='F',
+        fecha_nacimiento=date(1980, 1, 1), telefono='5550000000',
+        email='ana.torres@clinica.example.com', especialidad='Medicina General',
+        sub_especialidad='Geriatría' if indice % 2 else '',
+        cedula_profesional=f'CED-{indice:05d}', anos_experiencia=10,
+        costo_consulta=Decimal('500.00')
+    )
+    paciente = Paciente(
+        nombre='Luis', apellido_paterno='Pérez', apellido_materno='Gómez',
+        fecha_nacimiento=date(1990, 5, 17), sexo='M',
+        email=email or f'paciente{indice}@example.com', telefono='5551111111'
+    )
+    return Cita(
+        id=indice, medico=medico, paciente=paciente,
+        fecha=date(2026, 3, 2), hora=time(9, 30), duracion_minutos=30,
+        consultorio='Consultorio 3', motivo=motivo, sintomas_iniciales=sintomas
+    )
+
+
+citas = [crear_cita(i) for i in range(1, 21)]
+errores = []
+
+print("\n1. Revisando los PDFs generados...")
+for cita in citas[:2]:
+    contenido = PlantillaPDFCita.generar(cita).getvalue()
+    if not contenido.startswith(b'%PDF-') or contenido.count(b'/Type /Page\n') != 1:
+        errores.append(f"La plantilla no generó un PDF de una página para la cita #{cita.id}")
+
+largas = [
+    ('motivo largo', crear_cita(100, motivo="Dolor persistente. " * 40)),
+    ('email largo', crear_cita(101, email='un.correo.electronico.extremadamente.largo.para.la.columna@example.com')),
+]
+for descripcion, cita in largas:
+    if PlantillaPDFCita.generar(cita) is not None:
+        errores.append(f"La plantilla aceptó una cita con {descripcion}")
+    elif not PDFService.generar_pdf_cita(cita).getvalue().startswith(b'%PDF-'):
+        errores.append(f"PDFService no generó el PDF de la cita con {descripcion}")
+
+if not errores:
+    print("   ✅ Una página por cita; las citas que no caben se generan con platypus")
+
+print("\n2. Midiendo PDFs por segundo (mejor de 3 repeticiones)...")
+resultados = {}
+for nombre, funcion in [('platypus', PDFService.generar_pdf_cita_platypus),
+                        ('plantilla', PlantillaPDFCita.generar)]:
+    segundos = min(timeit.repeat(
+        lambda: [funcion(cita) for cita in citas],
+        number=5, repeat=3
+    ))
+    resultados[nombre] = 5 * len(citas) / segundos
+    print(f"   {nombre:10s} {resultados[nombre]:8.1f} PDFs/s   {segundos / (5 * len(citas)) * 1000:6.2f} ms por PDF")
+
+print(f"\n   La plantilla es {resultados['plantilla'] / resultados['platypus']:.1f}x más rápida")
+
+print("\n" + "=" * 70)
+if errores:
+    for error in errores:
+        print(f"❌ {error}")
+else:
+    print("✅ BENCHMARK COMPLETADO")
+print("=" * 70)
@@ -0,0 +1,121 @@
+"""
+Prueba de la cantidad de consultas del motor de disponibilidad
+Verifica que obtener_horarios_alternativos use un número constante de consultas
+sin importar cuántas citas ocupen la semana ni cuántos horarios se pidan (y solo
+la del médico cuando la disponibilidad está en el cache de Redis), que
+los horarios salgan de la plantilla de HorarioMedico y que sus resultados
+coincidan con validar_disponibilidad horario por horario
+Los datos de prueba se crean dentro de una transacción que se revierte al final
+Ejecutar con: python manage.py shell < test/test_disponibilidad_consultas.py
+"""
+
+print("=" * 70)
+print("PRUEBA: CONSULTAS DEL MOTOR DE DISPONIBILIDAD")
+print("=" * 70)
+
+from datetime import date, time, timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from medical.models import Medico, Paciente, Cita, HorarioMedico
+from medical.services.cita_service import CitaService
+from medical.services.cache_disponibilidad import CacheDisponibilidad
+from medical.services.disponibilidad import PlantillaHorario
+
+
+def contar_consultas(funcion):
+    """Ejecuta la función y retorna (resultado, cantidad de consultas)"""
+    with CaptureQueriesContext(connection) as contexto:
+        resultado = funcion()
+    return resultado, len(contexto.captured_queries)
+
+
+errores = []
+
+with transaction.atomic():
+    medico = Medico.objects.create(
+        nombre='Prueba', apellido_paterno='Disponibilidad', sexo='F',
+        fecha_nacimiento=date(1980, 1, 1), telefono='5550000000',
+        email='prueba.disponibilidad@example.com', especialidad='Medicina General',
+        cedula_profesional='PRUEBA-DISPONIBILIDAD', anos_experiencia=10,
+        costo_consulta=Decimal('500.00')
+    )
+    paciente = Paciente.objects.create(
+        nombre='Paciente', apellido_paterno='Prueba', apellido_materno='',
+        fecha_nacimiento=date(1990, 1, 1), sexo='M',
+        email='paciente.disponibilidad@example.com', telefono='5551111111'
+    )
+    # Lunes a viernes de 9:00 a 17:00 con consultas de 30 minutos: 16 horarios por día
+    for dia in range(5):
+        HorarioMedico.objects.create(medico=medico, dia_semana=dia, hora_inicio=time(9, 0), hora_fin=time(17, 0))
+
+    plantilla, consultas = contar_consultas(lambda: PlantillaHorario.obtener(medico.id))
+    horarios_dia = plantilla['dias'][0]
+    print(f"\n📋 Plantilla compilada en {consultas} consulta(s): {len(horarios_dia)} horarios por día hábil")
+
+    if consultas != 1 or len(horarios_dia) != 16 or plantilla['dias'][5]:
+        errores.append(f"Plantilla inesperada: {plantilla}")
+
+    manana = date.today() + timedelta(days=1)
+    dias_habiles = sum(1 for dia in range(7) if (manana + timedelta(days=dia)).weekday() < 5)
+    horas_dia = [time(minutos // 60, minutos % 60) for minutos in horarios_dia]
+
+    for citas_por_dia in [0, 4, 12, 16]:
+        # Ocupar los primeros horarios de cada día de la semana
+        Cita.objects.filter(medico=medico).delete()
+        Cita.objects.bulk_create([
+            Cita(paciente=paciente, medico=medico, fecha=manana + timedelta(days=dia),
+                 hora=hora, motivo='Prueba', estado='AGENDADA',
+                 horario=Cita.rango_horario(manana + timedelta(days=dia), hora, 30))
+            for dia in range(7)
+            for hora in horas_dia[:citas_por_dia]
+        ])
+
+        for cantidad in [1, 10, 50]:
+            # bulk_create no emite señales: descartar a mano el cache de disponibilidad
+            CacheDisponibilidad.invalidar_medico(medico.id)
+
+            horarios, consultas = contar_consultas(
+                lambda: CitaService.obtener_horarios_alternativos(medico.id, manana, cantidad=cantidad)
+            )
+            horarios_cache, consultas_cache = contar_consultas(
+                lambda: CitaService.obtener_horarios_alternativos(medico.id, manana, cantidad=cantidad)
+            )
+            print(f"\n📋 {citas_por_dia:2d} citas/día, cantidad={cantidad:2d}: {len(horarios):3d} horarios en "
+                  f"{consultas} consultas sin cache y {consultas_cache} con cache")
+
+            if consultas != 2 or consultas_cache != 1:
+                errores.append(f"{citas_por_dia} citas/día, cantidad={cantidad}: "
+                               f"{consultas} consultas sin cache, {consultas_cache} con cache")
+            if horarios_cache != horarios:
+                errores.append(f"{citas_por_dia} citas/día, cantidad={cantidad}: el cache no coincide con la base de datos")
+
+            # Cada horario sugerido debe estar libre según la validación por horario
+            for horario in horarios:
+                disponible, _ = CitaService.validar_disponibilidad(medico.id, horario['fecha'], horario['hora'])
+                if not disponible:
+                    errores.append(f"Horario ocupado sugerido: {horario['fecha_str']} {horario['hora_str']}")
+
+            esperados = min(cantidad, dias_habiles * (len(horas_dia) - citas_por_dia))
+            if len(horarios) != esperados:
+                errores.append(f"{citas_por_dia} citas/día, cantidad={cantidad}: "
+                               f"{len(horarios)} horarios, se esperaban {esperados}")
+
+    # Los horarios fuera de la plantilla no se pueden agendar
+    lunes = manana + timedelta(days=(7 - manana.weekday()) % 7)
+    domingo = lunes + timedelta(days=6)
+    for fecha, hora in [(lunes, time(8, 0)), (lunes, time(9, 15)), (lunes, time(17, 0)), (domingo, time(10, 0))]:
+        disponible, _ = CitaService.validar_disponibilidad(medico.id, fecha, hora)
+        if disponible:
+            errores.append(f"Horario fuera de la plantilla aceptado: {fecha} {hora}")
+
+    transaction.set_rollback(True)
+
+print("\n" + "=" * 70)
+if errores:
+    print("❌ PRUEBA FALLIDA")
+    for error in errores:
+        print(f"   - {error}")
+else:
+    print("✅ PRUEBA EXITOSA: 2 consultas por búsqueda sin cache (médico + citas del rango) y 1 con cache")
+print("=" * 70)
@@ -0,0 +1,91 @@
+"""
+Prueba del extractor local de datos del paciente
+Verifica que las duraciones, las edades de otras personas, las fechas y las frases
+como "soy yo" no se capturen como datos del paciente, que una captura posterior no
+reemplace un dato ya guardado salvo un nombre explícito, y que la extracción de la IA
+prevalezca si no coincide
+No usa la base de datos ni OpenAI
+Ejecutar con: python manage.py shell < test/test_extractor_datos.py
+"""
+
+print("=" * 70)
+print("PRUEBA: EXTRACTOR DE DATOS DEL PACIENTE")
+print("=" * 70)
+
+from medical.services.asistente_virtual_redis import AsistenteVirtualService
+from medical.services.extractor_datos import ExtractorDatosPaciente
+
+errores = []
+
+
+def revisar(descripcion, obtenido, esperado):
+    if obtenido != esperado:
+        errores.append(f"{descripcion}: se esperaba {esperado!r} y se obtuvo {obtenido!r}")
+
+
+print("\n1. Mensajes que no contienen datos del paciente...")
+for mensaje in [
+    'desde hace 2 años tengo dolor',
+    'hace 3 años me operaron de la rodilla',
+    'Mi hijo tiene 5 años',
+    'mi cita es el 2024-05-10',
+    'la consulta fue el 10/05/2024',
+    'Soy mujer',
+    'Soy yo',
+    'soy hombre y tengo dolor de espalda',
+    'soy profesora y me duele la espalda',
+    'soy operado de la rodilla',
+    'Soy Ana Torres',
+    'Tengo 2 años con este dolor',
+    'tengo 3 hijos de 5, 7 y 10 años',
+    'mi DNI es 45678912',
+]:
+    revisar(f"'{mensaje}'", ExtractorDatosPaciente.extraer(mensaje), {})
+
+print("\n2. Mensajes con datos del paciente...")
+revisar("edad", ExtractorDatosPaciente.extraer('Tengo 34 años y me duele la cabeza desde hace 2 años'), {'edad': 34})
+revisar("edad con hijo en otra oración", ExtractorDatosPaciente.extraer('Mi hijo tiene 5 años. Yo tengo 31 años'), {'edad': 31})
+revisar("teléfono", ExtractorDatosPaciente.extraer('mi teléfono es 987 654 321')['telefono'], '987 654 321')
+revisar("teléfono junto a una fecha",
+        ExtractorDatosPaciente.extraer('el 2024-05-10 me llaman al +51 987654321').get('telefono'), '+51 987654321')
+revisar("nombre", ExtractorDatosPaciente.extraer('Me llamo Ana Torres Ríos'),
+        {'nombre': 'Ana', 'apellido_paterno': 'Torres', 'apellido_materno': 'Ríos'})
+revisar("teléfono junto a un DNI",
+        ExtractorDatosPaciente.extraer('mi dni es 45678912 y mi celular 987654321').get('telefono'), '987654321')
+
+pregunta = '¿Cuál es tu nombre completo?'
+revisar("'soy' tras preguntar el nombre", ExtractorDatosPaciente.extraer('Soy María de la Cruz', pregunta),
+        {'nombre': 'María', 'apellido_paterno': 'de la Cruz', 'apellido_materno': '', 'inciertos': ['nombre']})
+revisar("'soy' con algo que no es un nombre",
+        ExtractorDatosPaciente.extraer('soy profesora y me duele la espalda', pregunta), {})
+
+print("\n3. Combinación de datos...")
+guardados = {'nombre': 'Ana', 'apellido_paterno': 'Torres', 'apellido_materno': '', 'edad': 34,
+             'telefono': '987654321'}
+combinados = ExtractorDatosPaciente.combinar(guardados, {'edad': 2, 'telefono': '2024 0510', 'nombre': 'Yo',
+                                                         'inciertos': ['nombre'], 'email': 'ana@example.com'})
+revisar("una captura posterior no reemplaza datos", {campo: combinados[campo] for campo in guardados}, guardados)
+revisar("una captura posterior completa los faltantes", combinados.get('email'), 'ana@example.com')
+
+datos = ExtractorDatosPaciente.combinar({}, ExtractorDatosPaciente.extraer('Soy Profesora Ruiz', '¿Cuál es tu nombre?'))
+datos = ExtractorDatosPaciente.combinar(datos, {'edad': 30, 'email': 'ana@example.com', 'telefono': '987654321'})
+revisar("un nombre dicho con 'soy' queda por confirmar", ExtractorDatosPaciente.completos(datos), False)
+datos = ExtractorDatosPaciente.combinar(datos, ExtractorDatosPaciente.extraer('perdón, me llamo Ana Torres'))
+revisar("un nombre explícito reemplaza al anterior",
+        [datos.get(campo) for campo in ('nombre', 'apellido_paterno', 'apellido_materno')], ['Ana', 'Torres', ''])
+revisar("con el nombre explícito los datos están completos", ExtractorDatosPaciente.completos(datos), True)
+
+datos = AsistenteVirtualService._combinar_extraccion(
+    {**guardados, 'email': 'ana@example.com'},
+    {'edad': 43, 'apellido_materno': '', 'email': None}
+)
+revisar("la IA prevalece si no coincide", datos['edad'], 43)
+revisar("los campos vacíos de la IA no borran datos", datos['email'], 'ana@example.com')
+
+print("\n" + "=" * 70)
+if errores:
+    for error in errores:
+        print(f"❌ {error}")
+else:
+    print("✅ PRUEBA EXITOSA: el extractor no captura duraciones, fechas ni datos de terceros")
+print("=" * 70)
@@ -104,16 +104,32 @@ const AsistenteVirtualPage = () => {
     setCargando(true);
     setError(null);
 
+    // Mensaje del asistente que se va completando con los tokens recibidos
+    const mensajeAsistente: MensajeChat = {
+      role: 'assistant',
+      content: '',
+      timestamp: new Date().toISOString()
+    };
+    let mensajeAgregado = false;
+    const actualizarMensajeAsistente = (contenido: string) => {
+      mensajeAsistente.content = contenido;
+      if (!mensajeAgregado) {
+        mensajeAgregado = true;
+        setMensajes(prev => [...prev, { ...mensajeAsistente }]);
+      } else {
+        setMensajes(prev => [...prev.slice(0, -1), { ...mensajeAsistente }]);
+      }
+    };
+
     try {
-      const response = await asistenteService.enviarMensaje(conversacionId, inputMensaje);
+      const response = await asistenteService.enviarMensajeStream(
+        conversacionId,
+        inputMensaje,
+        (texto) => actualizarMensajeAsistente(mensajeAsistente.content + texto)
+      );
       
       if (response.exito) {
-        const mensajeAsistente: MensajeChat = {
-          role: 'assistant',
-          content: response.respuesta,
-          timestamp: new Date().toISOString()
-        };
-        setMensajes(prev => [...prev, mensajeAsistente]);
+        actualizarMensajeAsistente(response.respuesta);
 
         // Mostrar alerta si es urgente
         if (response.es_urgente) {
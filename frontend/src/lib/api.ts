@@ -291,6 +291,60 @@ export const asistenteService = {
     });
   },
 
+  /**
+   * Envía un mensaje al asistente recibiendo la respuesta por streaming (SSE).
+   * Llama a onToken con cada fragmento y resuelve con el resultado final.
+   */
+  enviarMensajeStream: async (
+    conversacionId: string,
+    mensaje: string,
+    onToken: (texto: string) => void
+  ): Promise<EnviarMensajeResponse> => {
+    const response = await fetch(`${API_BASE_URL}/api/asistente/mensaje/stream/`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        conversacion_id: conversacionId,
+        mensaje: mensaje,
+      }),
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Cada evento SSE termina con una línea en blanco
+      let separador = buffer.indexOf('\n\n');
+      while (separador !== -1) {
+        const bloque = buffer.slice(0, separador);
+        buffer = buffer.slice(separador + 2);
+        separador = buffer.indexOf('\n\n');
+
+        const evento = bloque.match(/^event: (.*)$/m)?.[1];
+        const datos = bloque.match(/^data: (.*)$/m)?.[1];
+        if (!evento || !datos) continue;
+
+        const payload = JSON.parse(datos);
+        if (evento === 'token') {
+          onToken(payload.texto);
+        } else {
+          return payload as EnviarMensajeResponse;
+        }
+      }
+    }
+
+    throw new Error('El stream terminó sin respuesta final');
+  },
+
   /**
    * Obtiene el historial de una conversación
    */